@@ -0,0 +1,73 @@
+"""
+User import throughput: looping POST /api/users versus POST /api/users/bulk,
+against a scratch SQLite database (or --database-url).
+
+    python -m benchmarks.bulk_import --single 2000 --bulk 200000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_users(prefix, count):
+    return [{'username': f'{prefix}{i:08d}', 'email': f'{prefix}{i:08d}@example.com'} for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare single-row and bulk user import throughput')
+    parser.add_argument('--single', type=int, default=2000, help='users created one request at a time')
+    parser.add_argument('--bulk', type=int, default=100000, help='users created through the bulk endpoint')
+    parser.add_argument('--database-url', help='benchmark this database instead of a scratch SQLite file')
+    args = parser.parse_args()
+
+    scratch_dir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        scratch_dir = tempfile.mkdtemp(prefix='activity-finder-db-')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch_dir, 'bench.db')}"
+    # Every request comes from one client; the per-client rate limit would refuse most of them
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+
+    from src.main import create_app, init_database
+
+    app = create_app()
+    init_database(app)
+    client = app.test_client()
+    try:
+        started = time.perf_counter()
+        for user in make_users('single', args.single):
+            client.post('/api/users', json=user)
+        single_seconds = time.perf_counter() - started
+
+        users = make_users('bulk', args.bulk)
+        ndjson = '\n'.join(json.dumps(user) for user in users)
+        started = time.perf_counter()
+        response = client.post('/api/users/bulk', data=ndjson, content_type='application/x-ndjson')
+        bulk_seconds = time.perf_counter() - started
+        summary = response.get_json()['summary']
+
+        # Re-sending the same payload exercises the upsert path (all rows unchanged)
+        started = time.perf_counter()
+        client.post('/api/users/bulk', data=ndjson, content_type='application/x-ndjson')
+        upsert_seconds = time.perf_counter() - started
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    single_rate = args.single / single_seconds
+    bulk_rate = args.bulk / bulk_seconds
+    print(f"POST /api/users x{args.single:<8} {single_seconds:8.2f} s {single_rate:>12.0f} users/s")
+    print(f"POST /api/users/bulk [{args.bulk}] {bulk_seconds:8.2f} s {bulk_rate:>12.0f} users/s  {summary}")
+    print(f"  re-import (unchanged)    {upsert_seconds:8.2f} s {args.bulk / upsert_seconds:>12.0f} users/s")
+    print(f"speed-up {bulk_rate / single_rate:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
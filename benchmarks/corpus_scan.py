@@ -0,0 +1,124 @@
+"""
+Filter-scan benchmark for the columnar activity corpus.
+
+    python -m benchmarks.corpus_scan                     # 1M synthetic events
+    python -m benchmarks.corpus_scan --events 5000000 --workers 4
+
+Writes a synthetic snapshot (or reuses --path), times the browse filters
+(date window, category, radius, and all three combined) in this process, then
+forks --workers processes that each map the same file and scan it, and reports
+how much of each worker's corpus memory is shared rather than private.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+AUSTIN = (30.2672, -97.7431)
+
+
+def filters(today):
+    return {
+        'date window (30 days)': {'start_day': today + 7, 'end_day': today + 37},
+        'category (music)': {'categories': ['music']},
+        'radius (25 km of Austin)': {'lat': AUSTIN[0], 'lon': AUSTIN[1], 'radius_km': 25},
+        'combined': {'start_day': today, 'end_day': today + 30, 'categories': ['music', 'food'],
+                     'lat': AUSTIN[0], 'lon': AUSTIN[1], 'radius_km': 50},
+    }
+
+
+def time_filter(snapshot, options, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        indices = snapshot.filter(limit=50, **options)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(indices)
+
+
+def mapping_memory(path):
+    """(shared kB, private kB) of this process's mappings of path, from /proc/self/smaps"""
+    shared = private = 0
+    inside = False
+    with open('/proc/self/smaps') as f:
+        for line in f:
+            if '-' in line.split(' ', 1)[0] and ':' not in line.split(' ', 1)[0]:
+                inside = line.rstrip().endswith(path)
+            elif inside and line.startswith(('Shared_Clean:', 'Shared_Dirty:')):
+                shared += int(line.split()[1])
+            elif inside and line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                private += int(line.split()[1])
+    return shared, private
+
+
+def worker(path, today, ready_fd, report_fd):
+    from src.services.corpus import ColumnarSnapshot
+
+    snapshot = ColumnarSnapshot(path)
+    for options in filters(today).values():
+        snapshot.filter(limit=50, **options)
+    os.write(report_fd, b'x')
+    os.read(ready_fd, 1)   # hold the mapping until every worker has scanned
+    shared, private = mapping_memory(os.path.realpath(path))
+    os.write(report_fd, f'{shared} {private}\n'.encode())
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark columnar corpus filter scans')
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--path', default=None, help='existing snapshot to scan instead of a synthetic one')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    from datetime import date
+    import numpy  # noqa: F401 - imported up front so it isn't counted as mapping time
+    from src.services.corpus import ColumnarSnapshot, day_number, write_synthetic
+
+    path = args.path
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix='corpus-bench-'), 'corpus.bin')
+        started = time.perf_counter()
+        write_synthetic(path, args.events)
+        print(f"Wrote {args.events} synthetic events in {time.perf_counter() - started:.1f} s "
+              f"({os.path.getsize(path) / 1e6:.0f} MB)")
+
+    today = day_number(date.today().isoformat())
+    started = time.perf_counter()
+    snapshot = ColumnarSnapshot(path)
+    print(f"Mapped {len(snapshot)} events in {(time.perf_counter() - started) * 1000:.2f} ms\n")
+    print(f"{'filter':<28} {'median ms':>10} {'returned':>9}")
+    for name, options in filters(today).items():
+        median, returned = time_filter(snapshot, options, args.repeat)
+        print(f"{name:<28} {median:>10.2f} {returned:>9}")
+
+    if args.workers and sys.platform.startswith('linux'):
+        ready_read, ready_write = os.pipe()
+        report_read, report_write = os.pipe()
+        children = []
+        for _ in range(args.workers):
+            pid = os.fork()
+            if pid == 0:
+                worker(path, today, ready_read, report_write)
+            children.append(pid)
+        for _ in children:
+            os.read(report_read, 1)
+        os.write(ready_write, b'x' * len(children))
+        with os.fdopen(report_read) as reports:
+            os.close(report_write)
+            lines = [reports.readline().split() for _ in children]
+        for pid in children:
+            os.waitpid(pid, 0)
+        shared = sum(int(line[0]) for line in lines) / len(lines)
+        private = sum(int(line[1]) for line in lines) / len(lines)
+        print(f"\n{args.workers} workers mapping the corpus: {shared / 1024:.1f} MB shared, "
+              f"{private / 1024:.1f} MB private per worker")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Concurrent read/write benchmark for the User API against a scratch database.
+
+    python -m benchmarks.db_concurrency                        # tuned SQLite (WAL, pooled)
+    python -m benchmarks.db_concurrency --untuned              # rollback journal, synchronous=FULL, no busy timeout
+    python -m benchmarks.db_concurrency --database-url postgresql://...   # any server database
+
+Each worker thread issues POST /api/users (writes) and GET /api/users/<id>
+(reads) in the ratio given by --write-ratio, through the Flask test client so
+the numbers reflect the database layer rather than HTTP overhead.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+UNTUNED_ENV = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_BUSY_TIMEOUT_MS': '0',
+    'SQLITE_CACHE_MB': '2',
+    'SQLITE_MMAP_MB': '0',
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(app, concurrency, total_requests, write_ratio, seed_users):
+    from src.models.user import User, db
+
+    with app.app_context():
+        db.create_all()
+        db.session.query(User).delete()
+        db.session.add_all([User(username=f'seed{i:06d}', email=f'seed{i:06d}@example.com') for i in range(seed_users)])
+        db.session.commit()
+        user_ids = [user_id for (user_id,) in db.session.query(User.id)]
+
+    local = threading.local()
+    lock = threading.Lock()
+    results = {'read': [], 'write': []}
+    errors = {}
+    counter = iter(range(total_requests))
+
+    def one_request(index):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        rng = random.Random(index)
+        kind = 'write' if rng.random() < write_ratio else 'read'
+        started = time.perf_counter()
+        if kind == 'write':
+            response = client.post('/api/users', json={
+                'username': f'bench{index:08d}',
+                'email': f'bench{index:08d}@example.com',
+            })
+            ok = response.status_code == 201
+        else:
+            response = client.get(f'/api/users/{rng.choice(user_ids)}')
+            ok = response.status_code == 200
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            if ok:
+                results[kind].append(elapsed_ms)
+            else:
+                key = f'{kind} {response.status_code}'
+                errors[key] = errors.get(key, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, counter))
+    wall_seconds = time.perf_counter() - started
+
+    report = {'wall_seconds': round(wall_seconds, 3), 'errors': errors}
+    for kind, latencies in results.items():
+        latencies.sort()
+        report[kind] = {
+            'ok': len(latencies),
+            'per_second': round(len(latencies) / wall_seconds, 1),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+        }
+    return report
+
+
+def print_report(label, report):
+    print(label)
+    print(f"  wall time  {report['wall_seconds']:.2f} s")
+    for kind in ('read', 'write'):
+        row = report[kind]
+        print(f"  {kind:<6} ok={row['ok']:<6} {row['per_second']:>8.1f}/s  "
+              f"p50={row['p50_ms']:.2f} ms  p95={row['p95_ms']:.2f} ms  p99={row['p99_ms']:.2f} ms")
+    errors = report['errors']
+    print('  errors     ' + (', '.join(f'{key}: {count}' for key, count in sorted(errors.items())) or 'none'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent read/write benchmark for the User API')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--seed-users', type=int, default=1000)
+    parser.add_argument('--database-url', help='benchmark this database instead of a scratch SQLite file')
+    parser.add_argument('--untuned', action='store_true', help='run SQLite with its default journal and sync settings')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    scratch_dir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        scratch_dir = tempfile.mkdtemp(prefix='activity-finder-db-')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch_dir, 'bench.db')}"
+    if args.untuned:
+        os.environ.update(UNTUNED_ENV)
+    # Every request comes from one client; the per-client rate limit would refuse most of them
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+
+    # Settings are read at import time, so the app is built after the env is in place
+    from src.main import create_app
+
+    try:
+        report = run(create_app(), args.concurrency, args.requests, args.write_ratio, args.seed_users)
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report('untuned' if args.untuned else 'tuned', report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Local stand-in for the Eventbrite and Ticketmaster APIs.
+
+Replays the recorded payloads in benchmarks/payloads/ with configurable latency
+and error injection, so the search path can be load tested without API keys.
+
+    python -m benchmarks.fake_provider --port 8089 --latency-ms 120 --error-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(__file__), 'payloads')
+
+# Request path -> recorded payload file
+ROUTES = {
+    '/v3/events/search/': 'eventbrite.json',
+    '/discovery/v2/events.json': 'ticketmaster.json',
+}
+
+
+def load_payloads():
+    payloads = {}
+    for path, filename in ROUTES.items():
+        with open(os.path.join(PAYLOAD_DIR, filename), 'rb') as f:
+            payloads[path] = json.dumps(json.load(f)).encode('utf-8')
+    return payloads
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.split('?', 1)[0]
+        body = server.payloads.get(path)
+        if body is None:
+            self._reply(404, b'{"error": "not found"}')
+            return
+
+        # Latency is normal around the mean, never negative
+        delay = max(0.0, random.gauss(server.latency_ms, server.jitter_ms)) / 1000
+        roll = random.random()
+        if roll < server.timeout_rate:
+            time.sleep(server.hang_seconds)
+            delay = 0
+        elif roll < server.timeout_rate + server.error_rate:
+            time.sleep(delay)
+            self._reply(503, b'{"error": "injected failure"}')
+            return
+
+        time.sleep(delay)
+        self._reply(200, body)
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=100.0, jitter_ms=20.0,
+                 error_rate=0.0, timeout_rate=0.0, hang_seconds=15.0):
+        super().__init__((host, port), FakeProviderHandler)
+        self.payloads = load_payloads()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def provider_env(self):
+        """Environment variables pointing the app's providers at this server"""
+        return {
+            'EVENTBRITE_API_KEY': 'benchmark',
+            'TICKETMASTER_API_KEY': 'benchmark',
+            'EVENTBRITE_API_URL': self.base_url + '/v3/events/search/',
+            'TICKETMASTER_API_URL': self.base_url + '/discovery/v2/events.json',
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-provider', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded provider payloads over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=100.0)
+    parser.add_argument('--jitter-ms', type=float, default=20.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeProviderServer(args.host, args.port, args.latency_ms, args.jitter_ms,
+                                args.error_rate, args.timeout_rate)
+    print(f'Fake provider listening on {server.base_url}')
+    for key, value in server.provider_env().items():
+        print(f'  export {key}={value}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
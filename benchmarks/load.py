@@ -0,0 +1,162 @@
+"""
+Load benchmark for POST /api/activities/search.
+
+Starts the fake provider server and the Flask app (threaded WSGI server) in this
+process, drives the search endpoint at the requested concurrency and reports
+throughput, latency percentiles, the search result cache hit rate and the
+per-stage breakdown from src.services.metrics. The queries repeat, so the
+result cache is turned off unless --cache is given; otherwise nearly every
+request would be a cache hit and the providers would hardly be called.
+
+    python -m benchmarks.load --concurrency 16 --requests 2000 --latency-ms 80
+    python -m benchmarks.load --target http://127.0.0.1:8000   # an already running server
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_provider import FakeProviderServer
+
+DEFAULT_QUERIES = ['jazz', 'food festival', 'tech meetup', 'art gallery', 'yoga', 'comedy', 'rock concert', 'wine tasting']
+DEFAULT_LOCATIONS = ['Boston', 'New York', 'Chicago', 'San Francisco']
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def start_app_server():
+    """Import the app after the provider env is set and serve it on an ephemeral port"""
+    from werkzeug.serving import make_server
+    from src.main import create_app, startup
+
+    app = startup(create_app())
+
+    # Per-request access logging would dominate the measurement
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='app-server', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def run_load(base_url, concurrency, total_requests, queries, locations):
+    import requests
+
+    local = threading.local()
+    url = base_url.rstrip('/') + '/api/activities/search'
+
+    def one_request(index):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        payload = {'query': queries[index % len(queries)], 'location': locations[index % len(locations)]}
+        started = time.perf_counter()
+        try:
+            response = session.post(url, json=payload, timeout=30)
+            ok = response.status_code == 200
+            cached = response.headers.get('X-Cache') == 'HIT'
+        except requests.RequestException:
+            ok = cached = False
+        return time.perf_counter() - started, ok, cached
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _, _ in results)
+    failures = sum(1 for _, ok, _ in results if not ok)
+    cache_hits = sum(1 for _, _, cached in results if cached)
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'failures': failures,
+        'cache_hit_rate': cache_hits / total_requests if total_requests else 0.0,
+        'elapsed_s': elapsed,
+        'throughput_rps': total_requests / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def print_report(report, stages):
+    print(f"requests={report['requests']} concurrency={report['concurrency']} failures={report['failures']} "
+          f"cache_hit_rate={report['cache_hit_rate']:.1%}")
+    print(f"throughput={report['throughput_rps']:.1f} req/s elapsed={report['elapsed_s']:.2f}s")
+    print(f"latency p50={report['p50_ms']:.1f}ms p95={report['p95_ms']:.1f}ms "
+          f"p99={report['p99_ms']:.1f}ms max={report['max_ms']:.1f}ms")
+    if stages:
+        print()
+        print(f"{'stage':<32}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, stage in sorted(stages.items(), key=lambda item: -item[1]['mean_ms'] * item[1]['count']):
+            print(f"{name:<32}{stage['count']:>8}{stage['mean_ms']:>10.2f}{stage['p50_ms']:>10.1f}"
+                  f"{stage['p95_ms']:>10.1f}{stage['p99_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test /api/activities/search against a fake provider')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='mean fake provider latency')
+    parser.add_argument('--jitter-ms', type=float, default=20.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of provider calls answered with 503')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='fraction of provider calls that hang')
+    parser.add_argument('--provider-timeout', type=float, default=2.0, help='PROVIDER_TIMEOUT_SECONDS for the app')
+    parser.add_argument('--target', help='base URL of an already running server instead of the in-process app')
+    parser.add_argument('--cache', action='store_true', help='keep the search result cache on')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    fake = FakeProviderServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                              timeout_rate=args.timeout_rate, hang_seconds=args.provider_timeout + 1).start()
+    app_server = None
+    try:
+        if args.target:
+            base_url = args.target
+            print('Point the target server at the fake provider with:', file=sys.stderr)
+            for key, value in fake.provider_env().items():
+                print(f'  export {key}={value}', file=sys.stderr)
+            print('  export RATE_LIMIT_ENABLED=0', file=sys.stderr)
+            if not args.cache:
+                print('  export SEARCH_CACHE_TTL_SECONDS=0', file=sys.stderr)
+        else:
+            os.environ.update(fake.provider_env())
+            os.environ['PROVIDER_TIMEOUT_SECONDS'] = str(args.provider_timeout)
+            # Every request comes from one client; the per-client rate limit would refuse most of them
+            os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+            if not args.cache:
+                os.environ['SEARCH_CACHE_TTL_SECONDS'] = '0'
+            app_server, base_url = start_app_server()
+
+        report = run_load(base_url, args.concurrency, args.requests, DEFAULT_QUERIES, DEFAULT_LOCATIONS)
+
+        # Stage timings are only visible when the app runs in this process
+        stages = {}
+        if app_server is not None:
+            from src.services.metrics import stage_summary
+            stages = stage_summary()
+
+        if args.json:
+            print(json.dumps({'report': report, 'stages': stages}, indent=2))
+        else:
+            print_report(report, stages)
+    finally:
+        if app_server is not None:
+            app_server.shutdown()
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
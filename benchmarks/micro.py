@@ -0,0 +1,75 @@
+"""
+Micro-benchmarks for the CPU-bound parts of the search path.
+
+    python -m benchmarks.micro            # all benchmarks
+    python -m benchmarks.micro clean_text # only names containing "clean_text"
+"""
+import itertools
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.routes.activities import (
+    clean_text,
+    normalize_activity_data,
+    normalize_date,
+    normalize_time,
+    parse_eventbrite_events,
+    parse_ticketmaster_events,
+)
+from src.services.rate_limit import SlidingWindowStore
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(__file__), 'payloads')
+
+
+def load_activities():
+    with open(os.path.join(PAYLOAD_DIR, 'eventbrite.json')) as f:
+        eventbrite = json.load(f)['events']
+    with open(os.path.join(PAYLOAD_DIR, 'ticketmaster.json')) as f:
+        ticketmaster = json.load(f)['_embedded']['events']
+    return eventbrite, ticketmaster, parse_eventbrite_events(eventbrite) + parse_ticketmaster_events(ticketmaster)
+
+
+def build_benchmarks():
+    eventbrite, ticketmaster, activities = load_activities()
+    html_text = '<p>Join us for an <em>evening</em> of   live music,\n food and <b>drinks</b>.</p> ' * 12
+    plain_text = 'Doors open one hour before the show. All ages.'
+    rate_limits = SlidingWindowStore(os.path.join(tempfile.mkdtemp(prefix='micro-'), 'ratelimit.bin'))
+    clients = itertools.cycle([f'activities|ip:10.0.{i // 256}.{i % 256}' for i in range(20000)])
+
+    return [
+        ('normalize_activity_data[40 records]', lambda: normalize_activity_data(activities), 40),
+        ('parse_eventbrite_events[20 records]', lambda: parse_eventbrite_events(eventbrite), 20),
+        ('parse_ticketmaster_events[20 records]', lambda: parse_ticketmaster_events(ticketmaster), 20),
+        ('clean_text[html 900 chars]', lambda: clean_text(html_text), 1),
+        ('clean_text[plain]', lambda: clean_text(plain_text), 1),
+        ('normalize_date[iso date]', lambda: normalize_date('2025-06-14'), 1),
+        ('normalize_date[iso datetime]', lambda: normalize_date('2025-06-14T19:30:00'), 1),
+        ('normalize_date[us format]', lambda: normalize_date('06/14/2025'), 1),
+        ('normalize_date[unparseable]', lambda: normalize_date('next friday'), 1),
+        ('normalize_time[24h]', lambda: normalize_time('19:30'), 1),
+        ('normalize_time[24h seconds]', lambda: normalize_time('19:30:00'), 1),
+        ('normalize_time[12h]', lambda: normalize_time('7:30 PM'), 1),
+        ('rate_limit hit[one client]', lambda: rate_limits.hit('activities|ip:203.0.113.7', 10 ** 9, 60), 1),
+        ('rate_limit hit[20k clients]', lambda: rate_limits.hit(next(clients), 10 ** 9, 60), 1),
+    ]
+
+
+def run(name_filter=None, repeat=5, min_time=0.2):
+    print(f"{'benchmark':<42}{'us/call':>12}{'us/record':>12}{'calls/s':>14}")
+    for name, func, records in build_benchmarks():
+        if name_filter and name_filter not in name:
+            continue
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        number = max(number, int(number * min_time / 0.2))
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        print(f"{name:<42}{best * 1e6:>12.2f}{best * 1e6 / records:>12.2f}{1 / best:>14.0f}")
+
+
+if __name__ == '__main__':
+    run(sys.argv[1] if len(sys.argv) > 1 else None)
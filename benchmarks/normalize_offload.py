@@ -0,0 +1,78 @@
+"""
+Large-batch normalization inline versus in the CPU process pool.
+
+    python -m benchmarks.normalize_offload --records 20000
+
+For each mode, one thread normalizes --records activities (the fixture
+payloads repeated) while a probe thread keeps normalizing a 40-record search
+result, the size of an interactive search. Reports the batch's wall time and
+the probe's latency percentiles: inline, the batch holds the GIL and the probe
+waits behind it; offloaded, the batch thread mostly sleeps on the pool.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_mode(name, batch, sample, normalize_batch, normalize_sample):
+    latencies = []
+    done = threading.Event()
+
+    def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            normalize_sample(sample)
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.002)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    started = time.perf_counter()
+    normalized = normalize_batch(batch)
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+    latencies.sort()
+    print(f"{name:<10} {elapsed:>8.2f} s {len(normalized):>9} {statistics.median(latencies):>9.2f} "
+          f"{percentile(latencies, 0.99):>9.2f} {latencies[-1]:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark process-pool normalization of large batches')
+    parser.add_argument('--records', type=int, default=20000)
+    args = parser.parse_args()
+
+    import src.routes.activities as activities
+    from benchmarks.micro import load_activities
+    from src.services.cpu_pool import CPU_POOL_ENABLED, CPU_POOL_WORKERS, get_process_pool
+
+    _, _, sample = load_activities()
+    batch = [dict(activity, id=f'{activity["id"]}-{i}') for i in range(args.records // len(sample) + 1)
+             for activity in sample][:args.records]
+
+    # Start the workers up front so the offloaded run doesn't pay their import time
+    get_process_pool().map(int, range(CPU_POOL_WORKERS))
+    activities.normalize_activity_data(batch[:activities.NORMALIZE_OFFLOAD_THRESHOLD])
+
+    print(f"{len(batch)} records, {CPU_POOL_WORKERS} pool workers, offload threshold "
+          f"{activities.NORMALIZE_OFFLOAD_THRESHOLD}"
+          f"{'' if CPU_POOL_ENABLED else ' (offload off on this host; set CPU_POOL_WORKERS to force it)'}\n")
+    print(f"{'mode':<10} {'batch':>10} {'records':>9} {'probe p50':>9} {'p99 ms':>9} {'max ms':>9}")
+    run_mode('inline', batch, sample,
+             lambda records: [row for row in activities.normalize_activity_rows(records) if row is not None],
+             activities.normalize_activity_data)
+    run_mode('offloaded', batch, sample, activities.normalize_activity_data, activities.normalize_activity_data)
+
+
+if __name__ == '__main__':
+    main()
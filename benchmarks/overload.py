@@ -0,0 +1,124 @@
+"""
+Search behaviour when providers slow down and clients keep arriving.
+
+    python -m benchmarks.overload --clients 64 --latency-ms 800 --seconds 20
+    python -m benchmarks.overload --no-admission        # the same load without admission control
+
+Starts the fake provider with slow responses and the app in this process,
+then runs --clients closed-loop clients (honouring Retry-After), in a separate process so they don't
+compete with the server for the GIL, posting searches (most of them never
+seen before, so they miss the result cache) while a probe polls the typeahead
+endpoint. Reports how searches were answered (full results, degraded cached or
+mock results, 503) with their latencies, and the typeahead latency meanwhile.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_provider import FakeProviderServer
+from benchmarks.load import DEFAULT_LOCATIONS, DEFAULT_QUERIES, percentile, start_app_server
+
+
+def client(base_url, deadline, repeat_share, seed, outcomes):
+    import requests
+
+    rng = random.Random(seed)
+    session = requests.Session()
+    url = base_url + '/api/activities/search'
+    while time.monotonic() < deadline:
+        query = rng.choice(DEFAULT_QUERIES)
+        if rng.random() >= repeat_share:
+            query = f'{query} {rng.randrange(10 ** 9)}'
+        started = time.perf_counter()
+        try:
+            response = session.post(url, json={'query': query, 'location': rng.choice(DEFAULT_LOCATIONS)}, timeout=60)
+            if response.status_code == 200:
+                outcome = response.json().get('degraded') or ('cache hit' if response.headers.get('X-Cache') else 'full')
+            else:
+                outcome = str(response.status_code)
+        except requests.RequestException:
+            outcome = 'connection error'
+        outcomes[outcome].append(time.perf_counter() - started)
+        if outcome == '503':
+            # Well-behaved clients back off as told
+            time.sleep(float(response.headers.get('Retry-After', 1)))
+
+
+def probe(base_url, deadline, latencies):
+    import requests
+
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            session.get(base_url + '/api/activities/suggest?q=mu', timeout=60)
+        except requests.RequestException:
+            pass
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.05)
+
+
+def drive(base_url, clients, seconds, repeat_share, results):
+    """Client process: run the clients and the probe, then send back their latencies"""
+    outcomes = defaultdict(list)
+    probe_latencies = []
+    deadline = time.monotonic() + seconds
+    threads = [threading.Thread(target=client, args=(base_url, deadline, repeat_share, seed, outcomes))
+               for seed in range(clients)]
+    threads.append(threading.Thread(target=probe, args=(base_url, deadline, probe_latencies)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((dict(outcomes), probe_latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Overload /api/activities/search with slow providers')
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--latency-ms', type=float, default=800.0, help='mean fake provider latency')
+    parser.add_argument('--repeat-share', type=float, default=0.2, help='fraction of searches repeating a common one')
+    parser.add_argument('--no-admission', action='store_true')
+    args = parser.parse_args()
+
+    fake = FakeProviderServer(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 5).start()
+    os.environ.update(fake.provider_env())
+    os.environ['ADMISSION_ENABLED'] = '0' if args.no_admission else '1'
+    os.environ.setdefault('SEARCH_LOG_ENABLED', '0')
+    # Every request comes from one client; the per-client rate limit would refuse most of them
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+    app_server, base_url = start_app_server()
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    driver = context.Process(target=drive, args=(base_url, args.clients, args.seconds, args.repeat_share, results))
+    try:
+        driver.start()
+        outcomes, probe_latencies = results.get()
+        driver.join()
+    finally:
+        app_server.shutdown()
+        fake.stop()
+
+    print(f"{args.clients} clients for {args.seconds:g} s, providers ~{args.latency_ms:g} ms, "
+          f"admission {'off' if args.no_admission else 'on'}\n")
+    print(f"{'answered as':<18} {'count':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for outcome, latencies in sorted(outcomes.items(), key=lambda item: -len(item[1])):
+        latencies.sort()
+        print(f"{outcome:<18} {len(latencies):>7} {percentile(latencies, 0.5) * 1000:>8.0f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.0f} {latencies[-1] * 1000:>8.0f}")
+    probe_latencies.sort()
+    print(f"\ntypeahead during the run: p50 {percentile(probe_latencies, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(probe_latencies, 0.99) * 1000:.1f} ms, max {probe_latencies[-1] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
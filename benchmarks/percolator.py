@@ -0,0 +1,94 @@
+"""
+Subscription matching cost per event as the number of subscriptions grows.
+
+    python -m benchmarks.percolator --sizes 1000,10000,100000,300000
+
+Builds a percolator index of synthetic subscriptions (a query word from a
+fixed vocabulary, or a category, around random gazetteer cities) and times
+matching the fixture events placed in random cities. A scan of every
+subscription is timed at the smallest size for comparison.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VOCABULARY_SIZE = 5000
+CATEGORY_SHARE = 0.1
+
+
+def synthetic_subscriptions(count, places, vocabulary, categories, rng):
+    for subscription_id in range(1, count + 1):
+        place = rng.choice(places)
+        category = rng.random() < CATEGORY_SHARE
+        yield {
+            'id': subscription_id,
+            'query': '' if category else f'{rng.choice(vocabulary)} {rng.choice(vocabulary)}',
+            'categories': [rng.choice(categories)] if category else [],
+            'location_key': place['key'],
+            'lat': place['lat'],
+            'lon': place['lon'],
+            'radius_km': rng.choice((10, 25, 50)),
+        }
+
+
+def synthetic_events(count, places, vocabulary, sample, rng):
+    events = []
+    for _ in range(count):
+        place = rng.choice(places)
+        activity = dict(rng.choice(sample))
+        activity['title'] = f"{activity['title']} {rng.choice(vocabulary)} {rng.choice(vocabulary)}"
+        activity['lat'] = place['lat'] + rng.uniform(-0.1, 0.1)
+        activity['lon'] = place['lon'] + rng.uniform(-0.1, 0.1)
+        events.append((activity, place))
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark percolator matching per event')
+    parser.add_argument('--sizes', default='1000,10000,100000,300000')
+    parser.add_argument('--events', type=int, default=2000)
+    args = parser.parse_args()
+
+    from benchmarks.micro import load_activities
+    from src.routes.activities import normalize_activity_data
+    from src.services.classifier import CATEGORIES
+    from src.services.locations import get_gazetteer
+    from src.services.percolator import PercolatorIndex
+
+    rng = random.Random(11)
+    places = get_gazetteer().places
+    vocabulary = [f'word{i}' for i in range(VOCABULARY_SIZE)]
+    categories = [category['id'] for category in CATEGORIES]
+    sample = normalize_activity_data(load_activities()[2])
+    events = synthetic_events(args.events, places, vocabulary, sample, rng)
+
+    sizes = [int(value) for value in args.sizes.split(',')]
+    smallest = min(sizes)
+    print(f"{'subscriptions':>13} {'build s':>8} {'us/event':>9} {'matches/event':>14}")
+    for size in sizes:
+        index = PercolatorIndex()
+        started = time.perf_counter()
+        for subscription in synthetic_subscriptions(size, places, vocabulary, categories, random.Random(size)):
+            index.add(subscription)
+        built = time.perf_counter() - started
+
+        started = time.perf_counter()
+        matches = sum(len(index.match(activity, place)) for activity, place in events)
+        per_event = (time.perf_counter() - started) / len(events) * 1e6
+        print(f"{size:>13} {built:>8.1f} {per_event:>9.1f} {matches / len(events):>14.2f}")
+
+        if size == smallest:
+            # Baseline: verify every subscription against each event, as re-running saved searches would
+            everything = list(index._subscriptions)
+            started = time.perf_counter()
+            for activity, place in events[:200]:
+                index.match(activity, place, candidates=everything)
+            print(f"{'':>13} full scan of {size} subscriptions: {(time.perf_counter() - started) / 200 * 1e6:.0f} us/event")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+"Similar activities" lookup latency over the corpus snapshot.
+
+    python -m benchmarks.similar                          # 300k synthetic events
+    python -m benchmarks.similar --events 1000000 --probes 4,8,16
+
+Writes a synthetic snapshot (or reuses --path), builds the per-worker index,
+then times single and batched lookups for random events at each probe count.
+Recall is the share of returned events scoring at least as well as the
+exact limit-th best (from a scan of every vector); synthetic titles repeat
+words, so many events tie and comparing ids would undercount.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def exact_cutoff(snapshot, query, row, limit):
+    """Score of the limit-th most similar event by exhaustive scan"""
+    import numpy as np
+    from src.services.similar import VECTOR_SCALE
+
+    scores = snapshot.vectors.astype(np.float32) @ (query / np.linalg.norm(query)) / VECTOR_SCALE
+    scores[row] = -np.inf
+    return -float(np.partition(-scores, limit - 1)[limit - 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark similar-activity lookups')
+    parser.add_argument('--events', type=int, default=300000)
+    parser.add_argument('--path', default=None, help='existing snapshot instead of a synthetic one')
+    parser.add_argument('--probes', default='4,8,16')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--batch', type=int, default=16)
+    args = parser.parse_args()
+
+    import numpy as np
+    from src.services.corpus import ColumnarSnapshot, write_synthetic
+    from src.services.similar import SimilarityIndex
+
+    path = args.path
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix='similar-bench-'), 'corpus.bin')
+        started = time.perf_counter()
+        write_synthetic(path, args.events)
+        print(f"Wrote {args.events} synthetic events in {time.perf_counter() - started:.1f} s "
+              f"({os.path.getsize(path) / 1e6:.0f} MB)")
+
+    snapshot = ColumnarSnapshot(path)
+    started = time.perf_counter()
+    index = SimilarityIndex(snapshot)
+    print(f"Indexed {len(snapshot)} events in {len(snapshot.centroids)} clusters "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+    rows = np.random.default_rng(3).choice(len(snapshot), args.queries, replace=False)
+    queries = np.asarray(snapshot.vectors[rows], dtype=np.float32)
+    truth = [exact_cutoff(snapshot, queries[i], int(row), args.limit) for i, row in enumerate(rows)]
+
+    started = time.perf_counter()
+    for i, row in enumerate(rows[:20]):
+        exact_cutoff(snapshot, queries[i], int(row), args.limit)
+    print(f"exact scan of every vector: {(time.perf_counter() - started) / 20 * 1000:.2f} ms/query\n")
+
+    print(f"{'probes':>6} {'p50 ms':>8} {'p99 ms':>8} {f'batch {args.batch} ms/query':>20} {'recall':>7}")
+    for probes in [int(value) for value in args.probes.split(',')]:
+        timings = []
+        found = 0
+        for i, row in enumerate(rows):
+            started = time.perf_counter()
+            result = index.neighbors(queries[i], args.limit, exclude=[{int(row)}], probes=probes)[0]
+            timings.append((time.perf_counter() - started) * 1000)
+            found += sum(score >= truth[i] - 1e-3 for _, score in result)
+        timings.sort()
+
+        started = time.perf_counter()
+        for start in range(0, len(rows), args.batch):
+            batch = rows[start:start + args.batch]
+            index.neighbors(queries[start:start + args.batch], args.limit,
+                            exclude=[{int(row)} for row in batch], probes=probes)
+        batched = (time.perf_counter() - started) / len(rows) * 1000
+
+        print(f"{probes:>6} {statistics.median(timings):>8.2f} {timings[int(len(timings) * 0.99) - 1]:>8.2f} "
+              f"{batched:>20.2f} {found / (len(rows) * args.limit):>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
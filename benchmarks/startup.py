@@ -0,0 +1,80 @@
+"""
+Startup-time report: how long a fresh interpreter takes to import the app,
+build it with create_app() and run the startup hooks, plus the slowest imports.
+
+    python -m benchmarks.startup                 # report
+    python -m benchmarks.startup --budget-ms 400 # exit 1 if create_app() exceeds the budget
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, sys, time
+sys.path.insert(0, %r)
+timings = {}
+started = time.perf_counter()
+import src.main
+timings['import_ms'] = (time.perf_counter() - started) * 1000
+mark = time.perf_counter()
+app = src.main.create_app()
+timings['create_app_ms'] = (time.perf_counter() - mark) * 1000
+mark = time.perf_counter()
+src.main.startup(app)
+timings['startup_hooks_ms'] = (time.perf_counter() - mark) * 1000
+timings['modules'] = len(sys.modules)
+timings['requests_imported'] = 'requests' in sys.modules
+timings['pil_imported'] = 'PIL.Image' in sys.modules
+print(json.dumps(timings))
+''' % ROOT
+
+
+def parse_importtime(stderr, top):
+    """Return the top self-time imports from -X importtime output as (module, self_ms, cumulative_ms)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((module.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import and startup time')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', '0')),
+                        help='fail when import + create_app() takes longer than this (0 disables)')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports to list')
+    args = parser.parse_args()
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE],
+                            capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        sys.exit(result.returncode)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+    boot_ms = timings['import_ms'] + timings['create_app_ms']
+    print(f"import src.main     {timings['import_ms']:8.1f} ms")
+    print(f"create_app()        {timings['create_app_ms']:8.1f} ms")
+    print(f"startup hooks       {timings['startup_hooks_ms']:8.1f} ms")
+    print(f"modules loaded      {timings['modules']:8d}")
+    print(f"requests imported   {str(timings['requests_imported']):>8}")
+    print(f"Pillow imported     {str(timings['pil_imported']):>8}")
+    print()
+    print(f"{'slowest imports (self)':<48}{'self ms':>10}{'cum ms':>10}")
+    for module, self_ms, cumulative_ms in parse_importtime(result.stderr, args.top):
+        print(f"{module:<48}{self_ms:>10.1f}{cumulative_ms:>10.1f}")
+
+    if args.budget_ms and boot_ms > args.budget_ms:
+        print(f"\nFAIL: import + create_app() took {boot_ms:.1f} ms, budget is {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
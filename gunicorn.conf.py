@@ -0,0 +1,58 @@
+# Gunicorn settings for Activity Finder, tuned for I/O-bound provider fan-out.
+#
+# A search spends most of its time waiting on Eventbrite/Ticketmaster, so each
+# worker runs many threads (gthread) and the process count stays near the core
+# count. Every value can be overridden from the environment.
+#
+# Measured with benchmarks/load.py (--target, 32 concurrent clients, fake
+# provider at 100 ms, search result cache off) on one core: 1 worker x 1
+# thread served 6 req/s at p50 5.0 s; 1 x 16 threads 83 req/s at p50 372 ms;
+# 1 x 32 threads 98 req/s at p50 300 ms, where the core saturates. Scale
+# workers with cores and keep 16-32 threads per worker.
+#
+#   gunicorn -c gunicorn.conf.py src.wsgi:app
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:' + os.getenv('PORT', '5000'))
+
+# The hooks below migrate in the master and warm up each worker, so src.wsgi
+# must not do it again when workers import it
+os.environ.setdefault('WSGI_STARTUP_HOOKS', '0')
+
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(4, multiprocessing.cpu_count() + 1))))
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+
+# Each worker also starts a pool for CPU-bound normalization (src/services/cpu_pool.py)
+# of CPU_POOL_WORKERS processes, by default cpu_count // WEB_CONCURRENCY (at least
+# one), so all the pools together stay near one process per core. When that
+# comes to a single pool process per worker (fewer than two cores per worker)
+# normalization runs inline instead, as a lone pool process only adds IPC.
+
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '20'))
+
+# Recycle workers periodically; jitter keeps them from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+
+# Guard against oversized request lines/headers
+limit_request_line = 4094
+limit_request_fields = 100
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def on_starting(server):
+    # Migrate the schema once in the master so workers never race on CREATE TABLE
+    from src.main import create_app, init_database
+    init_database(create_app())
+
+
+def post_worker_init(worker):
+    # Connection pools must not be shared across a fork
+    from src.main import warm_up
+    warm_up(worker.wsgi)
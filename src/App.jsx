@@ -426,6 +426,7 @@ function App() {
         activity={selectedActivity}
         isOpen={isModalOpen}
         onClose={() => setIsModalOpen(false)}
+        onSelectActivity={setSelectedActivity}
       />
     </div>
   )
@@ -1,3 +1,4 @@
+import { useState, useEffect } from 'react'
 import { 
   Dialog, 
   DialogContent, 
@@ -18,7 +19,22 @@ import {
   Users
 } from 'lucide-react'
 
-export function ActivityModal({ activity, isOpen, onClose }) {
+export function ActivityModal({ activity, isOpen, onClose, onSelectActivity }) {
+  const [similar, setSimilar] = useState([])
+
+  useEffect(() => {
+    setSimilar([])
+    if (!activity?.id || !isOpen) return
+    const controller = new AbortController()
+    fetch(`/api/activities/${encodeURIComponent(activity.id)}/similar?limit=4`, { signal: controller.signal })
+      .then((response) => (response.ok ? response.json() : null))
+      .then((data) => {
+        if (data?.similar) setSimilar(data.similar)
+      })
+      .catch(() => {})
+    return () => controller.abort()
+  }, [activity?.id, isOpen])
+
   if (!activity) return null
 
   const formatDate = (dateString) => {
@@ -165,6 +181,28 @@ export function ActivityModal({ activity, isOpen, onClose }) {
             </div>
           </div>
 
+          {/* Similar events */}
+          {similar.length > 0 && (
+            <div>
+              <h3 className="text-lg font-semibold mb-3">Similar events</h3>
+              <div className="grid grid-cols-1 sm:grid-cols-2 gap-3">
+                {similar.map((item) => (
+                  <button
+                    key={item.id}
+                    type="button"
+                    className="text-left rounded-lg border p-3 hover:bg-muted/50 transition-colors"
+                    onClick={() => onSelectActivity?.(item)}
+                  >
+                    <p className="text-sm font-medium text-foreground line-clamp-2">{item.title}</p>
+                    <p className="text-xs text-muted-foreground mt-1">
+                      {formatDate(item.date)}{item.location ? ` · ${item.location}` : ''}
+                    </p>
+                  </button>
+                ))}
+              </div>
+            </div>
+          )}
+
           <Separator />
 
           {/* Action Buttons */}
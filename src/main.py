@@ -1,48 +1,129 @@
 import os
 import sys
 import secrets
-from flask import Flask, send_from_directory
-from flask_cors import CORS
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from flask import Flask, Response
 
 # DON\'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.activities import activities_bp
+STATIC_FOLDER = os.path.join(os.path.dirname(__file__), 'static')
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
-# Generate a secure random secret key if not provided
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY') or secrets.token_hex(32)
+def create_app():
+    """
+    Application factory. Importing this module and building the app does no
+    schema work and opens no provider connections; see startup() for that.
+    """
+    # Load environment variables from .env file before the blueprints read them
+    from dotenv import load_dotenv
+    load_dotenv()
 
-# Configure CORS with specific origins for security
-allowed_origins = os.getenv('ALLOWED_ORIGINS', 'http://localhost:5173,http://localhost:3000').split(',')
-CORS(app, origins=allowed_origins, supports_credentials=True)
+    from flask_cors import CORS
+    from src.models.user import db
+    from src.routes.user import user_bp
+    from src.routes.activities import activities_bp
+    from src.routes.images import images_bp
+    from src.routes.subscriptions import subscriptions_bp
+    from src.services.database import configure_database
+    from src.services.metrics import render_prometheus
 
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(activities_bp, url_prefix='/api/activities')
+    app = Flask(__name__, static_folder=STATIC_FOLDER)
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
+    # Generate a secure random secret key if not provided
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY') or secrets.token_hex(32)
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    else:
-        return send_from_directory(app.static_folder, 'index.html')
+    # Configure CORS with specific origins for security
+    allowed_origins = os.getenv('ALLOWED_ORIGINS', 'http://localhost:5173,http://localhost:3000').split(',')
+    CORS(app, origins=allowed_origins, supports_credentials=True)
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(activities_bp, url_prefix='/api/activities')
+    app.register_blueprint(images_bp, url_prefix='/api/images')
+    app.register_blueprint(subscriptions_bp, url_prefix='/api')
+
+    # Database configuration (DATABASE_URL, pool and SQLite pragmas)
+    configure_database(app)
+    db.init_app(app)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        return get_static_manifest(app).serve(path)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create any missing database tables."""
+        init_database(app)
+        print('Database initialized')
+
+    return app
+
+
+def get_static_manifest(app):
+    """
+    Static files are indexed once (at startup, or on the first static request) and
+    then answered from the manifest without touching the disk metadata
+    """
+    manifest = app.extensions.get('static_manifest')
+    if manifest is None:
+        from src.services.static_files import StaticManifest
+        manifest = app.extensions['static_manifest'] = StaticManifest(app.static_folder)
+    return manifest
 
 
+def init_database(app):
+    """Schema migration hook: create any missing tables"""
+    import src.models.search_log  # registers the search log tables with db.metadata
+    import src.models.subscription  # and the subscription tables
+    from src.models.user import db
+    with app.app_context():
+        db.create_all()
+
+
+def warm_up(app):
+    """
+    Per-process warm-up hook: a fresh provider connection pool, the static
+    manifest, classifier memo, image cache index, gazetteer, typeahead index,
+    corpus mapping with its similarity index, and subscription index, so the
+    first request pays nothing extra
+    """
+    from src.routes.images import get_image_cache
+    from src.services.classifier import classify_query
+    from src.services.corpus import get_snapshot
+    from src.services.http import get_http_session, prewarm_connections, reset_http_session
+    from src.services.locations import get_gazetteer
+    from src.services.percolator import PERCOLATOR_ENABLED, get_percolator
+    from src.services.providers import get_enabled_providers
+    from src.services.similar import get_similarity_index
+    from src.services import suggest
+
+    reset_http_session()
+    get_http_session()
+    get_static_manifest(app)
+    classify_query('live music')
+    get_image_cache()
+    get_gazetteer()
+    suggest.rebuild(app)
+    snapshot = get_snapshot()
+    if snapshot is not None and snapshot.vectors is not None and len(snapshot):
+        get_similarity_index(snapshot)
+    if PERCOLATOR_ENABLED:
+        get_percolator(app)
+    if os.getenv('PREWARM_CONNECTIONS', '0') == '1':
+        prewarm_connections([provider.endpoint for provider in get_enabled_providers() if provider.endpoint])
+
+
+def startup(app):
+    """Run every startup hook; used by single-process servers"""
+    init_database(app)
+    warm_up(app)
+    return app
+
+
+if __name__ == '__main__':
+    app = startup(create_app())
+    app.run(host='0.0.0.0', port=5000, debug=True)
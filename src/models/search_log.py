@@ -0,0 +1,51 @@
+from datetime import datetime
+from src.models.user import db
+
+
+class SearchLog(db.Model):
+    """One /api/activities/search request"""
+    __tablename__ = 'search_log'
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    # Lower-cased search text ("query" would shadow Model.query)
+    query_text = db.Column(db.String(200), nullable=False)
+    # Lower-cased, whitespace/punctuation-normalized form used for grouping
+    location = db.Column(db.String(200), nullable=False)
+    # Canonical JSON of the filter set, e.g. {"categories":["music"],"timeFilter":"week"}
+    filters = db.Column(db.String(500), nullable=False, default='{}')
+    result_count = db.Column(db.Integer, nullable=False, default=0)
+    latency_ms = db.Column(db.Float, nullable=False, default=0.0)
+    used_mock = db.Column(db.Boolean, nullable=False, default=False)
+
+    __table_args__ = (db.Index('ix_search_log_query_location', 'query_text', 'location'),)
+
+    def __repr__(self):
+        return f'<SearchLog {self.query_text!r} in {self.location!r}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'query': self.query_text,
+            'location': self.location,
+            'filters': self.filters,
+            'result_count': self.result_count,
+            'latency_ms': self.latency_ms,
+            'used_mock': self.used_mock,
+        }
+
+
+class SearchProviderCall(db.Model):
+    """One provider call made while serving a search"""
+    __tablename__ = 'search_provider_call'
+
+    id = db.Column(db.Integer, primary_key=True)
+    search_id = db.Column(db.Integer, db.ForeignKey('search_log.id', ondelete='CASCADE'), nullable=False, index=True)
+    provider = db.Column(db.String(40), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False)
+    latency_ms = db.Column(db.Float, nullable=False, default=0.0)
+    result_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SearchProviderCall {self.provider} {self.status}>'
@@ -0,0 +1,73 @@
+from datetime import datetime
+from src.models.user import db
+
+
+class Subscription(db.Model):
+    """A saved search whose new matching events are recorded for its user"""
+    __tablename__ = 'subscription'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Lower-cased search text; may be empty when only categories are given
+    query_text = db.Column(db.String(200), nullable=False, default='')
+    # Comma-separated classifier category ids, e.g. "music,food"
+    categories = db.Column(db.String(200), nullable=False, default='')
+    location = db.Column(db.String(200), nullable=False)
+    # Gazetteer place key; unresolved places only match events found for the same key
+    location_key = db.Column(db.String(200), nullable=False)
+    lat = db.Column(db.Float)
+    lon = db.Column(db.Float)
+    radius_km = db.Column(db.Float, nullable=False, default=25.0)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Bumped on every change so other workers can refresh their index incrementally
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<Subscription {self.query_text!r} in {self.location!r}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'query': self.query_text,
+            'categories': [name for name in self.categories.split(',') if name],
+            'location': self.location,
+            'location_key': self.location_key,
+            'lat': self.lat,
+            'lon': self.lon,
+            'radius_km': self.radius_km,
+            'active': self.active,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class SubscriptionMatch(db.Model):
+    """An event that matched a subscription; the notification outbox"""
+    __tablename__ = 'subscription_match'
+
+    id = db.Column(db.Integer, primary_key=True)
+    subscription_id = db.Column(db.Integer, db.ForeignKey('subscription.id', ondelete='CASCADE'), nullable=False)
+    activity_id = db.Column(db.String(200), nullable=False)
+    title = db.Column(db.String(500), nullable=False, default='')
+    date = db.Column(db.String(20), nullable=False, default='')
+    link = db.Column(db.String(500), nullable=False, default='')
+    source = db.Column(db.String(40), nullable=False, default='')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('subscription_id', 'activity_id', name='uq_subscription_match_activity'),)
+
+    def __repr__(self):
+        return f'<SubscriptionMatch {self.subscription_id} {self.activity_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'subscription_id': self.subscription_id,
+            'activity_id': self.activity_id,
+            'title': self.title,
+            'date': self.date,
+            'link': self.link,
+            'source': self.source,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
@@ -1,12 +1,43 @@
 import os
-import requests
 import json
+import math
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, g, request, jsonify
 from flask_cors import cross_origin
+from src.routes.images import CARD_IMAGE_HEIGHT, CARD_IMAGE_WIDTH, proxy_image_url
+from src.services.admission import QUEUE_TIMEOUT, cache_results, cached_results, install_admission
+from src.services.classifier import classify_query, classify_text, primary_category, ticketmaster_classification, yelp_categories
+from src.services.corpus import NO_DATE, day_number, get_snapshot, ingest_activities, pending_activity
+from src.services.cpu_pool import map_chunks
+from src.services.http import get_http_session, is_timeout
+from src.services.locations import resolve_location
+from src.services.metrics import timed
+from src.services.percolator import percolate
+from src.services.profiling import install_profiler
+from src.services.rate_limit import install_rate_limit
+from src.services.providers import (
+    SEARCH_TARGET_RESULTS,
+    Provider,
+    ProviderError,
+    ProviderTimeout,
+    register_provider,
+    search_providers,
+    search_providers_broad,
+)
+from src.services.search_log import normalize_filters, record_search
+from src.services.similar import activity_vectors, get_similarity_index
+from src.services.suggest import note_categories, suggest
+from src.services.sync import compute_delta
 
 activities_bp = Blueprint('activities', __name__)
+install_profiler(activities_bp)
+# Searches call paid upstream APIs, so they use up more of a client's budget than browsing; typeahead
+# runs on every keystroke and has a budget of its own, so typing can't use up a client's searches
+install_rate_limit(activities_bp, costs={'activities.search_activities': 5, 'activities.batch_search_activities': 20},
+                   buckets={'activities.suggest_activities': 'activities.suggest'})
 
 # API keys from environment variables - set these in production
 YELP_API_KEY = os.getenv('YELP_API_KEY')
@@ -14,6 +45,21 @@ MEETUP_API_KEY = os.getenv('MEETUP_API_KEY')
 EVENTBRITE_API_KEY = os.getenv('EVENTBRITE_API_KEY')
 TICKETMASTER_API_KEY = os.getenv('TICKETMASTER_API_KEY')
 
+# Provider endpoints, overridable to point at a local stand-in (see benchmarks/)
+EVENTBRITE_API_URL = os.getenv('EVENTBRITE_API_URL', 'https://www.eventbriteapi.com/v3/events/search/')
+TICKETMASTER_API_URL = os.getenv('TICKETMASTER_API_URL', 'https://app.ticketmaster.com/discovery/v2/events.json')
+PROVIDER_TIMEOUT_SECONDS = float(os.getenv('PROVIDER_TIMEOUT_SECONDS', '10'))
+
+# /batch limits: searches per request, concurrent upstream calls, events per shared pool call
+BATCH_MAX_SEARCHES = int(os.getenv('BATCH_MAX_SEARCHES', '50'))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '8'))
+BROAD_RESULT_LIMIT = 100
+BROWSE_MAX_RESULTS = int(os.getenv('BROWSE_MAX_RESULTS', '500'))
+SIMILAR_MAX_RESULTS = 50
+# Normalizing at least this many records at once goes to the CPU process pool, in chunks of this size
+NORMALIZE_OFFLOAD_THRESHOLD = int(os.getenv('NORMALIZE_OFFLOAD_THRESHOLD', '1000'))
+NORMALIZE_CHUNK_SIZE = int(os.getenv('NORMALIZE_CHUNK_SIZE', '250'))
+
 @activities_bp.route('/search', methods=['POST'])
 @cross_origin()
 def search_activities():
@@ -21,223 +67,532 @@ def search_activities():
     Search for activities based on query and location
     """
     try:
-        data = request.get_json()
-        query = data.get('query', '')
-        location = data.get('location', '')
-        
-        if not query or not location:
+        search = search_request()
+        if search is None:
             return jsonify({'error': 'Query and location are required'}), 400
+        data, query, place, scope = search
+        location = place['display']
         
-        activities = []
-        
-        # Try Eventbrite API first (most reliable free tier)
-        eventbrite_activities = search_eventbrite_events(query, location)
-        if eventbrite_activities:
-            activities.extend(eventbrite_activities)
-        
-        # Try Ticketmaster API for entertainment events
-        if len(activities) < 10:
-            ticketmaster_activities = search_ticketmaster_events(query, location)
-            if ticketmaster_activities:
-                activities.extend(ticketmaster_activities)
+        started = time.perf_counter()
         
-        # Try Yelp API
-        if len(activities) < 15:
-            yelp_activities = search_yelp_events(query, location)
-            if yelp_activities:
-                activities.extend(yelp_activities)
-        
-        # Try Meetup API as fallback
-        if len(activities) < 20:
-            meetup_activities = search_meetup_events(query, location)
-            if meetup_activities:
-                activities.extend(meetup_activities)
+        # Call the registered providers in order of their live latency/yield stats
+        with timed('providers'):
+            activities, report = search_providers(query, location, place=place)
         
         # If still no results, return enhanced mock data for demonstration
-        if not activities:
-            activities = get_enhanced_mock_activities(query, location)
+        used_mock = not activities
+        if used_mock:
+            with timed('mock_fallback'):
+                activities = get_enhanced_mock_activities(query, location)
         
         # Normalize all activity data for consistent formatting
-        activities = normalize_activity_data(activities)
+        with timed('normalize'):
+            activities = normalize_activity_data(activities)
+        if not used_mock:
+            note_categories(activities)
+            cache_results(scope, activities)
+            ingest_activities(activities, place)
+            percolate(current_app._get_current_object(), activities, place)
         
-        return jsonify({
-            'success': True,
-            'activities': activities,
-            'total': len(activities)
-        })
+        return search_response(search, activities, report, started, used_mock)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def search_eventbrite_events(query, location):
+def search_request():
     """
-    Search Eventbrite API for events
+    (data, query, place, scope) for the current search request, or None when
+    the query or location is missing. Parsed once per request; the admission
+    hooks and the route share it.
     """
-    try:
-        if not EVENTBRITE_API_KEY:
-            return []
-            
-        headers = {
-            'Authorization': f'Bearer {EVENTBRITE_API_KEY}',
-        }
-        
-        params = {
-            'q': query,
-            'location.address': location,
-            'location.within': '25mi',
-            'start_date.range_start': '2025-01-01T00:00:00',
-            'start_date.range_end': '2025-12-31T23:59:59',
-            'sort_by': 'date',
-            'expand': 'venue,organizer',
-            'page_size': 20
+    if 'search_request' not in g:
+        data = request.get_json(silent=True) or {}
+        query = data.get('query', '')
+        location = data.get('location', '')
+        if not query or not location:
+            g.search_request = None
+        else:
+            # Canonical place first, so "NYC" and "new york, ny" make the same upstream calls
+            with timed('resolve_location'):
+                place = resolve_location(location)
+            scope = f"{query.strip().lower()}|{place['key']}|{normalize_filters(data.get('filters'))}"
+            g.search_request = (data, query, place, scope)
+    return g.search_request
+
+def search_response(search, activities, report, started, used_mock, degraded=None):
+    """The search response body, with a sync delta when the client sent a token, and its search log entry"""
+    data, query, place, scope = search
+    # Clients polling with the sync_token from their last response only get what changed
+    with timed('sync_delta'):
+        sync_token, delta = compute_delta(scope, data.get('sync_token'), activities)
+    
+    with timed('serialize'):
+        body = {
+            'success': True,
+            'total': len(activities),
+            'location': {key: place[key] for key in ('key', 'display', 'lat', 'lon')},
+            'sync_token': sync_token,
+            'delta': delta is not None,
         }
-        
-        response = requests.get('https://www.eventbriteapi.com/v3/events/search/', 
-                              headers=headers, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            return parse_eventbrite_events(data.get('events', []))
+        if degraded:
+            body['degraded'] = degraded
+        if delta is None:
+            body['activities'] = activities
         else:
-            print(f"Eventbrite API error: {response.status_code}")
-            return []
-        
-    except Exception as e:
-        print(f"Eventbrite API error: {e}")
-        return []
+            body.update(delta)
+        response = jsonify(body)
+    
+    # Queued for the background writer; no database work on the request path
+    record_search(current_app._get_current_object(), query, place['display'], data.get('filters'), report,
+                  len(activities), (time.perf_counter() - started) * 1000, used_mock)
+    return response
 
-def search_ticketmaster_events(query, location):
+def cached_search_response(endpoint):
+    """Repeat searches within SEARCH_CACHE_TTL_SECONDS are answered without taking an admission slot"""
+    if endpoint != 'activities.search_activities':
+        return None
+    started = time.perf_counter()
+    search = search_request()
+    activities = cached_results(search[3]) if search else None
+    if activities is None:
+        return None
+    response = search_response(search, activities, [], started, False)
+    response.headers['X-Cache'] = 'HIT'
+    return response
+
+def degraded_search_response(endpoint, reason):
+    """
+    A search turned away by admission control gets recent results for the
+    same search however old (up to SEARCH_CACHE_STALE_SECONDS), or mock
+    results if it waited its turn in the queue. A search that found the queue
+    full gets neither, and admission answers 503.
     """
-    Search Ticketmaster Discovery API for events
+    if endpoint != 'activities.search_activities':
+        return None
+    started = time.perf_counter()
+    search = search_request()
+    if search is None:
+        return jsonify({'error': 'Query and location are required'}), 400
+    activities = cached_results(search[3], stale=True)
+    if activities is not None:
+        return search_response(search, activities, [], started, False, degraded='cached')
+    if reason == QUEUE_TIMEOUT:
+        with timed('mock_fallback'):
+            activities = normalize_activity_data(get_enhanced_mock_activities(search[1], search[2]['display']))
+        return search_response(search, activities, [], started, True, degraded='mock')
+    return None
+
+install_admission(
+    activities_bp,
+    cheap_endpoints={'activities.suggest_activities', 'activities.browse_activities', 'activities.similar_activities'},
+    cached_response=cached_search_response,
+    degraded_response=degraded_search_response,
+)
+
+@activities_bp.route('/suggest', methods=['GET'])
+@cross_origin()
+def suggest_activities():
     """
+    Typeahead suggestions for the search box: ?q=<prefix>&type=query|location&limit=8
+    """
+    prefix = request.args.get('q', '')
+    kind = request.args.get('type', 'query')
+    if kind not in ('query', 'location'):
+        return jsonify({'error': 'type must be query or location'}), 400
     try:
-        if not TICKETMASTER_API_KEY:
-            return []
-            
-        params = {
-            'apikey': TICKETMASTER_API_KEY,
-            'keyword': query,
-            'city': location,
-            'radius': '25',
-            'unit': 'miles',
-            'size': 20,
-            'sort': 'date,asc'
-        }
-        
-        response = requests.get('https://app.ticketmaster.com/discovery/v2/events.json', 
-                              params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            events = data.get('_embedded', {}).get('events', [])
-            return parse_ticketmaster_events(events)
-        else:
-            print(f"Ticketmaster API error: {response.status_code}")
-            return []
-        
-    except Exception as e:
-        print(f"Ticketmaster API error: {e}")
-        return []
+        limit = max(1, int(request.args.get('limit', 8)))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    with timed('suggest'):
+        suggestions = suggest(kind, prefix[:100], limit, current_app._get_current_object())
+    response = jsonify({
+        'suggestions': [{'text': text, 'weight': round(weight, 2)} for text, weight in suggestions]
+    })
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
+@activities_bp.route('/browse', methods=['GET'])
+@cross_origin()
+def browse_activities():
+    """
+    Filter the shared activity corpus without calling any provider:
+    ?category=music,sports&from=2025-06-01&to=2025-06-30&lat=..&lon=..|location=..&radius_km=25&source=..&limit=50
+    """
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return jsonify({'error': 'Activity corpus is not available'}), 503
+
+    args = request.args
+    try:
+        start_day = day_number(args['from']) if args.get('from') else None
+        end_day = day_number(args['to']) if args.get('to') else None
+        lat = float(args['lat']) if args.get('lat') else None
+        lon = float(args['lon']) if args.get('lon') else None
+        radius_km = float(args.get('radius_km', 50))
+        limit = min(max(1, int(args.get('limit', 50))), BROWSE_MAX_RESULTS)
+    except ValueError:
+        return jsonify({'error': 'lat, lon, radius_km and limit must be numbers'}), 400
+    if NO_DATE in (start_day, end_day):
+        return jsonify({'error': 'from and to must be YYYY-MM-DD dates'}), 400
+
+    place = None
+    if lat is None and args.get('location'):
+        place = resolve_location(args['location'])
+        if place['lat'] is None:
+            return jsonify({'error': f"Unknown location: {args['location']}"}), 400
+        lat, lon = place['lat'], place['lon']
+    categories = [name.strip().lower() for name in args.get('category', '').split(',') if name.strip()]
+    sources = [name.strip() for name in args.get('source', '').split(',') if name.strip()]
+
+    with timed('corpus_filter'):
+        indices = snapshot.filter(start_day, end_day, categories, sources, lat, lon,
+                                  radius_km if lat is not None else None, limit)
+    with timed('serialize'):
+        response = jsonify({
+            'success': True,
+            'total': len(indices),
+            'corpus_size': len(snapshot),
+            'location': {key: place[key] for key in ('key', 'display', 'lat', 'lon')} if place else None,
+            'activities': [snapshot.record(index) for index in indices],
+        })
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
 
-def search_yelp_events(query, location):
+@activities_bp.route('/<activity_id>/similar', methods=['GET'])
+@cross_origin()
+def similar_activities(activity_id):
     """
-    Search Yelp Events API
+    Events in the shared corpus most like one activity (by title, category and
+    description): ?limit=10. The activity itself must be in the corpus or in
+    this worker's not-yet-exported search results.
     """
+    snapshot = get_snapshot()
+    if snapshot is None or snapshot.vectors is None or not len(snapshot):
+        return jsonify({'error': 'Activity corpus is not available'}), 503
     try:
-        # Note: Yelp Events API requires authentication
-        # This is a placeholder implementation
-        headers = {
-            'Authorization': f'Bearer {YELP_API_KEY}',
+        limit = min(max(1, int(request.args.get('limit', 10))), SIMILAR_MAX_RESULTS)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    with timed('similar'):
+        index = get_similarity_index(snapshot)
+        row = index.row_for(activity_id)
+        if row is not None:
+            activity = snapshot.record(row)
+            query = snapshot.vectors[row]
+        else:
+            activity = pending_activity(activity_id)
+            if activity is None:
+                return jsonify({'error': 'Activity not found'}), 404
+            query = activity_vectors([activity], snapshot.vectors.shape[1])[0]
+        neighbors = index.neighbors(query, limit, exclude=[{row}])[0]
+    with timed('serialize'):
+        similar = []
+        for neighbor, score in neighbors:
+            record = snapshot.record(neighbor)
+            record['score'] = round(score, 3)
+            similar.append(record)
+        response = jsonify({'success': True, 'activity': activity, 'similar': similar})
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
+def select_from_pool(query, pool, pool_categories, limit):
+    """
+    Answer a category search from a location's shared pool: events mentioning
+    the query text first, then events classified into the query's categories
+    """
+    wanted = set(classify_query(query))
+    needle = query.lower()
+    direct, related = [], []
+    for activity, categories in zip(pool, pool_categories):
+        text = f"{activity.get('title', '')} {activity.get('category', '')}".lower()
+        if needle in text:
+            direct.append(activity)
+        elif wanted.intersection(categories):
+            related.append(activity)
+    return (direct + related)[:limit]
+
+
+@activities_bp.route('/batch', methods=['POST'])
+@cross_origin()
+def batch_search_activities():
+    """
+    Run many searches in one request: {"searches": [{"query": ..., "location": ...}, ...]}.
+    Searches are grouped by resolved location. Category searches in a group share one
+    broad keyword-less call per provider, classified locally, and the remaining
+    searches run concurrently, as do category searches the shared pool had
+    nothing for. Results come back in request order.
+    """
+    data = request.get_json(silent=True) or {}
+    searches = data.get('searches')
+    if not isinstance(searches, list) or not searches:
+        return jsonify({'error': 'searches must be a non-empty list'}), 400
+    if len(searches) > BATCH_MAX_SEARCHES:
+        return jsonify({'error': f'At most {BATCH_MAX_SEARCHES} searches per batch'}), 400
+
+    started = time.perf_counter()
+    results = [None] * len(searches)
+    pooled = {}   # place key -> (place, [(index, query)])
+    direct = {}   # (query, place key) -> (place, [index])
+    for index, search in enumerate(searches):
+        query = search.get('query', '') if isinstance(search, dict) else ''
+        location = search.get('location', '') if isinstance(search, dict) else ''
+        if not isinstance(query, str) or not isinstance(location, str) or not query.strip() or not location.strip():
+            results[index] = {'error': 'Query and location are required'}
+            continue
+        query = query.strip()
+        place = resolve_location(location)
+        if primary_category(query):
+            pooled.setdefault(place['key'], (place, []))[1].append((index, query))
+        else:
+            direct.setdefault((query.lower(), place['key']), (place, []))[1].append(index)
+
+    with timed('batch_providers'), ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as executor:
+        pool_futures = {
+            key: executor.submit(search_providers_broad, place['display'], BROAD_RESULT_LIMIT, place=place)
+            for key, (place, _) in pooled.items()
         }
-        
-        params = {
-            'location': location,
-            'categories': map_query_to_yelp_categories(query),
-            'limit': 10
+        direct_futures = {
+            key: executor.submit(search_providers, searches[indexes[0]]['query'].strip(), place['display'], place=place)
+            for key, (place, indexes) in direct.items()
         }
-        
-        # Uncomment when you have a valid API key
-        # response = requests.get('https://api.yelp.com/v3/events', headers=headers, params=params)
-        # if response.status_code == 200:
-        #     data = response.json()
-        #     return parse_yelp_events(data.get('events', []))
-        
-        return []
-        
+        pools = {key: future.result() for key, future in pool_futures.items()}
+        direct_results = {key: future.result() for key, future in direct_futures.items()}
+
+    upstream_calls = sum(len(report) for _, report in list(pools.values()) + list(direct_results.values()))
+
+    def search_filters(index):
+        return searches[index].get('filters') if isinstance(searches[index], dict) else None
+
+    def finish(index, query, place, activities, report, source):
+        if not activities:
+            activities = normalize_activity_data(get_enhanced_mock_activities(query, place['display']))
+            source = 'mock'
+        else:
+            ingest_activities(activities, place)
+            percolate(current_app._get_current_object(), activities, place)
+        results[index] = {
+            'query': query,
+            'location': {key: place[key] for key in ('key', 'display', 'lat', 'lon')},
+            'activities': activities,
+            'total': len(activities),
+            'source': source,
+        }
+        record_search(current_app._get_current_object(), query, place['display'], search_filters(index), report,
+                      len(activities), (time.perf_counter() - started) * 1000, source == 'mock')
+
+    # Every pool and direct result normalized in one call, so large batches reach the process pool
+    with timed('normalize'):
+        normalized = normalize_activity_groups(
+            [pools[key][0] for key in pooled] + [direct_results[key][0] for key in direct]
+        )
+    pools = {key: (activities, pools[key][1]) for key, activities in zip(pooled, normalized)}
+    direct_results = {
+        key: (activities, direct_results[key][1]) for key, activities in zip(direct, normalized[len(pooled):])
+    }
+
+    with timed('batch_assemble'):
+        missed = {}   # (query, place key) -> (place, [index]): pooled searches the shared pool had nothing for
+        for key, (place, members) in pooled.items():
+            pool, report = pools[key]
+            pool_categories = [classify_text(f"{a.get('category', '')} {a.get('title', '')}") for a in pool]
+            for index, query in members:
+                selected = select_from_pool(query, pool, pool_categories, SEARCH_TARGET_RESULTS)
+                if selected:
+                    finish(index, query, place, selected, report, 'shared')
+                else:
+                    missed.setdefault((query.lower(), key), (place, []))[1].append(index)
+
+    # A search of its own before settling for mock results
+    if missed:
+        with timed('batch_providers'), ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as executor:
+            missed_futures = {
+                key: executor.submit(search_providers, searches[indexes[0]]['query'].strip(), place['display'], place=place)
+                for key, (place, indexes) in missed.items()
+            }
+            missed_results = {key: future.result() for key, future in missed_futures.items()}
+        upstream_calls += sum(len(report) for _, report in missed_results.values())
+        with timed('normalize'):
+            normalized = normalize_activity_groups([missed_results[key][0] for key in missed])
+        for key, activities in zip(missed, normalized):
+            missed_results[key] = (activities, missed_results[key][1])
+        direct.update(missed)
+        direct_results.update(missed_results)
+
+    with timed('batch_assemble'):
+        for key, (place, indexes) in direct.items():
+            activities, report = direct_results[key]
+            for index in indexes:
+                finish(index, searches[index]['query'].strip(), place, list(activities), report, 'direct')
+
+    return jsonify({
+        'success': True,
+        'results': results,
+        'total': len(results),
+        'upstream_calls': upstream_calls,
+    })
+
+def search_eventbrite_events(query, location, place=None, limit=20):
+    """
+    Search Eventbrite API for events, returning the raw event list
+    """
+    headers = {
+        'Authorization': f'Bearer {EVENTBRITE_API_KEY}',
+    }
+    
+    params = {
+        'location.within': '25mi',
+        'start_date.range_start': '2025-01-01T00:00:00',
+        'start_date.range_end': '2025-12-31T23:59:59',
+        'sort_by': 'date',
+        'expand': 'venue,organizer',
+        'page_size': min(limit, 50)
+    }
+    # An empty query is a broad "everything near here" call (see /batch)
+    if query:
+        params['q'] = query
+    
+    # Coordinates from the gazetteer skip Eventbrite's own address geocoding
+    if place and place.get('lat') is not None:
+        params['location.latitude'] = place['lat']
+        params['location.longitude'] = place['lon']
+    else:
+        params['location.address'] = location
+    
+    try:
+        with timed('provider_http', 'eventbrite'):
+            response = get_http_session().get(EVENTBRITE_API_URL, headers=headers, params=params, timeout=PROVIDER_TIMEOUT_SECONDS)
     except Exception as e:
-        print(f"Yelp API error: {e}")
-        return []
+        if is_timeout(e):
+            raise ProviderTimeout(f"Eventbrite API timeout: {e}") from e
+        raise
+    
+    if response.status_code != 200:
+        raise ProviderError(f"Eventbrite API error: {response.status_code}")
+    
+    with timed('json_decode', 'eventbrite'):
+        data = response.json()
+    return data.get('events', [])
 
-def search_meetup_events(query, location):
+def search_ticketmaster_events(query, location, place=None, limit=20):
     """
-    Search Meetup API using GraphQL
+    Search Ticketmaster Discovery API for events, returning the raw event list
     """
+    params = {
+        'apikey': TICKETMASTER_API_KEY,
+        'city': location,
+        'radius': '25',
+        'unit': 'miles',
+        'size': min(limit, 200),
+        'sort': 'date,asc'
+    }
+    if query:
+        params['keyword'] = query
+    
+    # Ticketmaster matches the bare city name; the state/country disambiguate it
+    if place and place.get('resolved'):
+        params['city'] = place['name']
+        params['countryCode'] = place['country']
+        if place['region'] and place['country'] in ('US', 'CA'):
+            params['stateCode'] = place['region']
+    
+    # Push the query category down so Ticketmaster filters before paging
+    classification = ticketmaster_classification(query)
+    if classification:
+        params['classificationName'] = classification
+    
     try:
-        # Note: Meetup API requires OAuth authentication
-        # This is a placeholder implementation
-        
-        # Uncomment when you have valid authentication
-        # graphql_query = """
-        # query {
-        #   keywordSearch(filter: {
-        #     query: "%s",
-        #     location: "%s"
-        #   }) {
-        #     edges {
-        #       node {
-        #         ... on Event {
-        #           title
-        #           description
-        #           dateTime
-        #           venue {
-        #             name
-        #             address
-        #           }
-        #           eventUrl
-        #         }
-        #       }
-        #     }
-        #   }
-        # }
-        # """ % (query, location)
-        
-        # headers = {
-        #     'Authorization': f'Bearer {MEETUP_API_KEY}',
-        #     'Content-Type': 'application/json'
-        # }
-        
-        # response = requests.post('https://api.meetup.com/gql', 
-        #                         headers=headers, 
-        #                         json={'query': graphql_query})
-        
-        # if response.status_code == 200:
-        #     data = response.json()
-        #     return parse_meetup_events(data)
-        
-        return []
-        
+        with timed('provider_http', 'ticketmaster'):
+            response = get_http_session().get(TICKETMASTER_API_URL, params=params, timeout=PROVIDER_TIMEOUT_SECONDS)
     except Exception as e:
-        print(f"Meetup API error: {e}")
-        return []
+        if is_timeout(e):
+            raise ProviderTimeout(f"Ticketmaster API timeout: {e}") from e
+        raise
+    
+    if response.status_code != 200:
+        raise ProviderError(f"Ticketmaster API error: {response.status_code}")
+    
+    with timed('json_decode', 'ticketmaster'):
+        data = response.json()
+    return data.get('_embedded', {}).get('events', [])
+
+def search_yelp_events(query, location, place=None, limit=20):
+    """
+    Search Yelp Events API, returning the raw event list
+    """
+    # Note: Yelp Events API requires authentication
+    # This is a placeholder implementation, registered as a stub so it is never called
+    headers = {
+        'Authorization': f'Bearer {YELP_API_KEY}',
+    }
+    
+    params = {
+        'location': location,
+        'categories': map_query_to_yelp_categories(query),
+        'limit': 10
+    }
+    
+    # Uncomment when you have a valid API key
+    # response = requests.get('https://api.yelp.com/v3/events', headers=headers, params=params)
+    # if response.status_code == 200:
+    #     data = response.json()
+    #     return data.get('events', [])
+    
+    return []
+
+def search_meetup_events(query, location, place=None, limit=20):
+    """
+    Search Meetup API using GraphQL, returning the raw response data
+    """
+    # Note: Meetup API requires OAuth authentication
+    # This is a placeholder implementation, registered as a stub so it is never called
+    
+    # Uncomment when you have valid authentication
+    # graphql_query = """
+    # query {
+    #   keywordSearch(filter: {
+    #     query: "%s",
+    #     location: "%s"
+    #   }) {
+    #     edges {
+    #       node {
+    #         ... on Event {
+    #           title
+    #           description
+    #           dateTime
+    #           venue {
+    #             name
+    #             address
+    #           }
+    #           eventUrl
+    #         }
+    #       }
+    #     }
+    #   }
+    # }
+    # """ % (query, location)
+    
+    # headers = {
+    #     'Authorization': f'Bearer {MEETUP_API_KEY}',
+    #     'Content-Type': 'application/json'
+    # }
+    
+    # response = requests.post('https://api.meetup.com/gql', 
+    #                         headers=headers, 
+    #                         json={'query': graphql_query})
+    
+    # if response.status_code == 200:
+    #     data = response.json()
+    #     return data
+    
+    return []
 
 def map_query_to_yelp_categories(query):
     """
     Map search query to Yelp event categories
     """
-    query_lower = query.lower()
-    
-    if any(word in query_lower for word in ['music', 'concert', 'festival', 'band']):
-        return 'music'
-    elif any(word in query_lower for word in ['food', 'restaurant', 'dining', 'wine', 'beer']):
-        return 'food-and-drink'
-    elif any(word in query_lower for word in ['tech', 'technology', 'programming', 'coding']):
-        return 'business'
-    elif any(word in query_lower for word in ['art', 'gallery', 'exhibition']):
-        return 'visual-arts'
-    elif any(word in query_lower for word in ['sport', 'fitness', 'running', 'yoga']):
-        return 'sports-and-fitness'
-    else:
-        return 'other'
+    return yelp_categories(query)
 
 def parse_yelp_events(events):
     """
@@ -307,7 +662,9 @@ def parse_eventbrite_events(events):
             'category': event.get('category', {}).get('name', '') if event.get('category') else 'Event',
             'image': event.get('logo', {}).get('url', '') if event.get('logo') else '',
             'source': 'Eventbrite',
-            'link': event.get('url', '')
+            'link': event.get('url', ''),
+            'lat': venue.get('latitude'),
+            'lon': venue.get('longitude')
         }
         activities.append(activity)
     
@@ -332,34 +689,71 @@ def parse_ticketmaster_events(events):
             'date': start.get('localDate', ''),
             'time': start.get('localTime', ''),
             'category': event.get('classifications', [{}])[0].get('segment', {}).get('name', '') if event.get('classifications') else 'Entertainment',
-            'image': event.get('images', [{}])[0].get('url', '') if event.get('images') else '',
+            'image': pick_ticketmaster_image(event.get('images') or []),
             'source': 'Ticketmaster',
-            'link': event.get('url', '')
+            'link': event.get('url', ''),
+            'lat': (venue.get('location') or {}).get('latitude'),
+            'lon': (venue.get('location') or {}).get('longitude')
         }
         activities.append(activity)
     
     return activities
 
+# Provider registry: order is decided at request time from live latency/yield stats,
+# the hints below only seed those stats until real calls have been measured
+register_provider(Provider(
+    'eventbrite', search_eventbrite_events, parse_eventbrite_events,
+    api_key_env='EVENTBRITE_API_KEY', endpoint=EVENTBRITE_API_URL,
+    capabilities=('keyword', 'location', 'date_range', 'broad'),
+    latency_hint_ms=700, yield_hint=20
+))
+register_provider(Provider(
+    'ticketmaster', search_ticketmaster_events, parse_ticketmaster_events,
+    api_key_env='TICKETMASTER_API_KEY', endpoint=TICKETMASTER_API_URL,
+    capabilities=('keyword', 'location', 'classification', 'broad'),
+    latency_hint_ms=800, yield_hint=20
+))
+register_provider(Provider(
+    'yelp', search_yelp_events, parse_yelp_events,
+    api_key_env='YELP_API_KEY',
+    capabilities=('location', 'category'),
+    latency_hint_ms=800, yield_hint=10, stub=True
+))
+register_provider(Provider(
+    'meetup', search_meetup_events, parse_meetup_events,
+    api_key_env='MEETUP_API_KEY',
+    capabilities=('keyword', 'location'),
+    cost=0.5, latency_hint_ms=1200, yield_hint=10, stub=True
+))
+
+def pick_ticketmaster_image(images, width=CARD_IMAGE_WIDTH, height=CARD_IMAGE_HEIGHT):
+    """
+    Pick the smallest Ticketmaster rendition that still covers the card, preferring
+    the closest aspect ratio; fall back to the largest one available
+    """
+    target_ratio = width / height
+    candidates = [image for image in images if image.get('url') and image.get('width') and image.get('height')]
+    if not candidates:
+        return images[0].get('url', '') if images else ''
+    
+    covering = [image for image in candidates if image['width'] >= width and image['height'] >= height]
+    if not covering:
+        return max(candidates, key=lambda image: image['width'] * image['height'])['url']
+    
+    best = min(covering, key=lambda image: (
+        round(abs(image['width'] / image['height'] - target_ratio), 1),
+        image['width'] * image['height']
+    ))
+    return best['url']
+
 def get_enhanced_mock_activities(query, location):
     """
     Return enhanced mock activities with category-specific templates and realistic venues
     """
     
-    query_lower = query.lower()
-    
     # Category-specific mock data templates
-    if any(word in query_lower for word in ['music', 'concert', 'festival', 'band', 'jazz', 'rock']):
-        return get_music_mock_activities(query, location)
-    elif any(word in query_lower for word in ['food', 'restaurant', 'dining', 'wine', 'beer', 'cooking']):
-        return get_food_mock_activities(query, location)
-    elif any(word in query_lower for word in ['tech', 'technology', 'programming', 'coding', 'startup']):
-        return get_tech_mock_activities(query, location)
-    elif any(word in query_lower for word in ['art', 'gallery', 'exhibition', 'painting', 'sculpture']):
-        return get_art_mock_activities(query, location)
-    elif any(word in query_lower for word in ['sport', 'fitness', 'running', 'yoga', 'gym']):
-        return get_fitness_mock_activities(query, location)
-    else:
-        return get_general_mock_activities(query, location)
+    generator = MOCK_GENERATORS.get(primary_category(query), get_general_mock_activities)
+    return generator(query, location)
 
 def get_music_mock_activities(query, location):
     """Music-specific mock activities"""
@@ -541,32 +935,82 @@ def get_general_mock_activities(query, location):
         }
     ]
 
-def normalize_activity_data(activities):
+# Mock templates keyed by the classifier's category ids
+MOCK_GENERATORS = {
+    'music': get_music_mock_activities,
+    'food': get_food_mock_activities,
+    'tech': get_tech_mock_activities,
+    'art': get_art_mock_activities,
+    'fitness': get_fitness_mock_activities,
+}
+
+# Fields of a normalized activity, in the order normalize_activity_rows returns them
+NORMALIZED_FIELDS = ('id', 'title', 'description', 'location', 'date', 'time', 'category', 'image', 'source',
+                     'link', 'lat', 'lon')
+
+def normalize_activity_rows(activities):
     """
-    Normalize activity data to ensure consistent format across all sources
+    Normalized field tuples (NORMALIZED_FIELDS order), None for activities
+    missing a title or location. Tuples keep results compact when this runs
+    in a worker process.
     """
-    normalized = []
-    
+    rows = []
     for activity in activities:
-        normalized_activity = {
-            'id': str(activity.get('id', '')),
-            'title': clean_text(activity.get('title', '')),
-            'description': clean_text(activity.get('description', '')),
-            'location': clean_text(activity.get('location', '')),
-            'date': normalize_date(activity.get('date', '')),
-            'time': normalize_time(activity.get('time', '')),
-            'category': clean_text(activity.get('category', 'Event')),
-            'image': activity.get('image', ''),
-            'source': activity.get('source', 'Unknown'),
-            'link': activity.get('link', '#')
-        }
-        
-        # Only add activities with required fields
-        if normalized_activity['title'] and normalized_activity['location']:
-            normalized.append(normalized_activity)
-    
+        title = clean_text(activity.get('title', ''))
+        location = clean_text(activity.get('location', ''))
+        # Only keep activities with required fields
+        if not title or not location:
+            rows.append(None)
+            continue
+        rows.append((
+            str(activity.get('id', '')),
+            title,
+            clean_text(activity.get('description', '')),
+            location,
+            normalize_date(activity.get('date', '')),
+            normalize_time(activity.get('time', '')),
+            clean_text(activity.get('category', 'Event')),
+            proxy_image_url(activity.get('image', '')),
+            activity.get('source', 'Unknown'),
+            activity.get('link', '#'),
+            parse_coordinate(activity.get('lat')),
+            parse_coordinate(activity.get('lon')),
+        ))
+    return rows
+
+def normalize_activity_groups(groups):
+    """
+    Normalize several activity lists in one pass. Above NORMALIZE_OFFLOAD_THRESHOLD
+    records the work is spread over the CPU process pool in chunks, so it doesn't
+    hold this worker's GIL while other requests wait.
+    """
+    flat = [activity for group in groups for activity in group]
+    if len(flat) >= NORMALIZE_OFFLOAD_THRESHOLD:
+        with timed('normalize_offload'):
+            rows = map_chunks(normalize_activity_rows, flat, NORMALIZE_CHUNK_SIZE)
+    else:
+        rows = normalize_activity_rows(flat)
+    normalized = []
+    start = 0
+    for group in groups:
+        normalized.append([dict(zip(NORMALIZED_FIELDS, row)) for row in rows[start:start + len(group)] if row is not None])
+        start += len(group)
     return normalized
 
+def normalize_activity_data(activities):
+    """
+    Normalize activity data to ensure consistent format across all sources
+    """
+    return normalize_activity_groups([activities])[0]
+
+def parse_coordinate(value):
+    """Providers send coordinates as strings or numbers; None when missing or malformed"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return round(value, 6) if math.isfinite(value) else None
+
 def clean_text(text):
     """Clean and standardize text fields"""
     if not text:
@@ -0,0 +1,174 @@
+import hashlib
+import importlib.util
+import io
+import os
+import tempfile
+from urllib.parse import parse_qs, quote, urljoin, urlparse
+from flask import Blueprint, Response, jsonify, redirect, request
+from src.services.http import get_http_session
+from src.services.image_cache import DiskLRUCache
+from src.services.metrics import register_counter, register_gauge, timed
+
+# Pillow is optional and only imported when an image is actually resized
+PILLOW_AVAILABLE = importlib.util.find_spec('PIL') is not None
+
+images_bp = Blueprint('images', __name__)
+
+# Size the activity cards render images at
+CARD_IMAGE_WIDTH = int(os.getenv('CARD_IMAGE_WIDTH', '400'))
+CARD_IMAGE_HEIGHT = int(os.getenv('CARD_IMAGE_HEIGHT', '300'))
+
+# Only images from these hosts are proxied, so the endpoint can't be used as an open relay
+IMAGE_PROXY_HOSTS = {
+    host.strip().lower()
+    for host in os.getenv('IMAGE_PROXY_HOSTS', 's1.ticketm.net,img.evbuc.com,cdn.evbuc.com,images.unsplash.com').split(',')
+    if host.strip()
+}
+IMAGE_PROXY_ENABLED = PILLOW_AVAILABLE and os.getenv('IMAGE_PROXY_ENABLED', '1') == '1'
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'activity-finder-images'))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_MB', '256')) * 1024 * 1024
+# How often a worker rescans the shared cache directory for files written by other workers
+IMAGE_CACHE_RESCAN_SECONDS = float(os.getenv('IMAGE_CACHE_RESCAN_SECONDS', '60'))
+IMAGE_MAX_SOURCE_BYTES = 20 * 1024 * 1024
+# Redirects followed per fetch, each to an allowed host
+IMAGE_MAX_REDIRECTS = 3
+# Query parameters with which an image CDN already serves the size we ask for
+PRESIZED_PARAMS = (('w', 'h'), ('width', 'height'))
+IMAGE_MAX_DIMENSION = 1600
+IMAGE_QUALITY = 80
+
+_cache = None
+
+
+def get_image_cache():
+    global _cache
+    if _cache is None:
+        _cache = DiskLRUCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES, IMAGE_CACHE_RESCAN_SECONDS)
+    return _cache
+
+
+def is_proxyable(url):
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return False
+    return parsed.scheme in ('http', 'https') and (parsed.hostname or '').lower() in IMAGE_PROXY_HOSTS
+
+
+def is_presized(url):
+    """True for CDN URLs that already ask for a width and height, e.g. Unsplash's ?w=400&h=300"""
+    params = parse_qs(urlparse(url).query)
+    return any(width in params and height in params for width, height in PRESIZED_PARAMS)
+
+
+def proxy_image_url(url, width=CARD_IMAGE_WIDTH, height=CARD_IMAGE_HEIGHT):
+    """
+    Rewrite a provider image URL to the resizing proxy; other URLs, and those
+    the CDN already sizes, pass through unchanged
+    """
+    if not url or not IMAGE_PROXY_ENABLED or not is_proxyable(url) or is_presized(url):
+        return url
+    return f"/api/images/proxy?url={quote(url, safe='')}&w={width}&h={height}"
+
+
+def _fetch_source(url):
+    """
+    The source image bytes, or None. Redirects are followed by hand so that
+    every hop is checked against IMAGE_PROXY_HOSTS; an open redirect on an
+    allowed host must not reach anything else.
+    """
+    with timed('image_fetch'):
+        for _ in range(IMAGE_MAX_REDIRECTS + 1):
+            response = get_http_session().get(url, timeout=10, stream=True, allow_redirects=False)
+            if not response.is_redirect:
+                break
+            url = urljoin(url, response.headers.get('Location', ''))
+            response.close()
+            if not is_proxyable(url):
+                return None
+        else:
+            return None
+        if response.status_code != 200:
+            response.close()
+            return None
+        data = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            data.extend(chunk)
+            if len(data) > IMAGE_MAX_SOURCE_BYTES:
+                response.close()
+                return None
+    return bytes(data)
+
+
+def _render(source, width, height, image_format):
+    from PIL import Image, ImageOps
+
+    with timed('image_resize'):
+        image = Image.open(io.BytesIO(source))
+        image.draft('RGB', (width * 2, height * 2))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        # Crop to fill, like object-fit: cover on the card
+        image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        output = io.BytesIO()
+        if image_format == 'WEBP':
+            image.save(output, 'WEBP', quality=IMAGE_QUALITY, method=4)
+        else:
+            image.save(output, 'JPEG', quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+@images_bp.route('/proxy', methods=['GET'])
+def proxy_image():
+    """
+    Fetch a provider image, resize it to the requested card size and re-encode it
+    """
+    url = request.args.get('url', '')
+    if not is_proxyable(url):
+        return jsonify({'error': 'Image host not allowed'}), 400
+
+    if not IMAGE_PROXY_ENABLED:
+        return redirect(url, code=302)
+
+    try:
+        width = min(max(int(request.args.get('w', CARD_IMAGE_WIDTH)), 16), IMAGE_MAX_DIMENSION)
+        height = min(max(int(request.args.get('h', CARD_IMAGE_HEIGHT)), 16), IMAGE_MAX_DIMENSION)
+    except ValueError:
+        return jsonify({'error': 'Width and height must be integers'}), 400
+
+    image_format = 'WEBP' if 'image/webp' in request.headers.get('Accept', '') else 'JPEG'
+    key = hashlib.sha256(f'{url}|{width}x{height}|{image_format}'.encode('utf-8')).hexdigest()
+    headers = {
+        'Cache-Control': 'public, max-age=604800',
+        'Vary': 'Accept',
+        'ETag': f'"{key[:24]}"',
+    }
+    if request.if_none_match.contains(key[:24]):
+        return Response(status=304, headers=headers)
+
+    cache = get_image_cache()
+
+    with timed('image_cache_lookup'):
+        body = cache.get(key)
+    if body is None:
+        try:
+            source = _fetch_source(url)
+            if source is None:
+                return redirect(url, code=302)
+            body = _render(source, width, height, image_format)
+            cache.put(key, body)
+        except Exception as e:
+            print(f"Image proxy error: {e}")
+            return redirect(url, code=302)
+
+    return Response(body, content_type='image/webp' if image_format == 'WEBP' else 'image/jpeg', headers=headers)
+
+
+def _cache_gauge(field):
+    def collect():
+        return get_image_cache().stats()[field] if _cache is not None else 0
+    return collect
+
+
+register_gauge('activity_image_cache_bytes', 'Bytes held in the on-disk image cache', _cache_gauge('bytes'))
+register_counter('activity_image_cache_hits_total', 'Image cache hits since startup', _cache_gauge('hits'))
+register_counter('activity_image_cache_misses_total', 'Image cache misses since startup', _cache_gauge('misses'))
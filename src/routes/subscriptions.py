@@ -0,0 +1,146 @@
+from datetime import datetime
+from flask import Blueprint, current_app, jsonify, request
+from src.models.subscription import Subscription, SubscriptionMatch
+from src.models.user import User, db
+from src.services.classifier import CATEGORIES
+from src.services.locations import resolve_location
+from src.services.percolator import MAX_RADIUS_KM, get_percolator, terms
+
+subscriptions_bp = Blueprint('subscriptions', __name__)
+
+CATEGORY_IDS = {category['id'] for category in CATEGORIES}
+DEFAULT_RADIUS_KM = 25.0
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def validate_subscription(data):
+    """
+    Returns (fields, error): the Subscription column values for a create
+    request, or an error message
+    """
+    query = data.get('query') or ''
+    location = data.get('location') or ''
+    categories = data.get('categories') or []
+    if not isinstance(query, str) or not isinstance(location, str) or not isinstance(categories, list):
+        return None, 'query and location must be strings and categories a list'
+    query = ' '.join(query.lower().split())[:200]
+    categories = sorted({str(name).strip().lower() for name in categories if str(name).strip()})
+    unknown = [name for name in categories if name not in CATEGORY_IDS]
+    if unknown:
+        return None, f"Unknown categories: {', '.join(unknown)}"
+    if not location.strip():
+        return None, 'location is required'
+    if not terms(query) and not categories:
+        return None, 'A query or at least one category is required'
+    try:
+        radius_km = float(data.get('radius_km', DEFAULT_RADIUS_KM))
+    except (TypeError, ValueError):
+        return None, 'radius_km must be a number'
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        return None, f'radius_km must be between 0 and {MAX_RADIUS_KM:g}'
+
+    place = resolve_location(location)
+    return {
+        'query_text': query,
+        'categories': ','.join(categories),
+        'location': place['display'][:200],
+        'location_key': place['key'][:200],
+        'lat': place['lat'],
+        'lon': place['lon'],
+        'radius_km': radius_km,
+    }, None
+
+
+@subscriptions_bp.route('/subscriptions', methods=['POST'])
+def create_subscription():
+    """
+    Save a search: {"user_id", "query", "location", "categories": [...], "radius_km"}.
+    New events matching it are recorded as they are seen in search results.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        try:
+            user_id = int(data.get('user_id'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'user_id is required'}), 400
+        fields, error = validate_subscription(data)
+        if error:
+            return jsonify({'error': error}), 400
+        if db.session.get(User, user_id) is None:
+            return jsonify({'error': 'User not found'}), 404
+
+        subscription = Subscription(user_id=user_id, **fields)
+        db.session.add(subscription)
+        db.session.flush()
+        body = subscription.to_dict()
+        db.session.commit()
+        # Other workers pick it up on their next refresh
+        get_percolator(current_app._get_current_object()).index.add(body)
+        return jsonify(body), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to create subscription'}), 500
+
+
+@subscriptions_bp.route('/subscriptions', methods=['GET'])
+def list_subscriptions():
+    """Active subscriptions of one user: ?user_id="""
+    try:
+        user_id = int(request.args.get('user_id', ''))
+    except ValueError:
+        return jsonify({'error': 'user_id is required'}), 400
+    subscriptions = db.session.scalars(
+        db.select(Subscription)
+        .where(Subscription.user_id == user_id, Subscription.active.is_(True))
+        .order_by(Subscription.id)
+    )
+    return jsonify([subscription.to_dict() for subscription in subscriptions])
+
+
+@subscriptions_bp.route('/subscriptions/<int:subscription_id>', methods=['DELETE'])
+def delete_subscription(subscription_id):
+    """Cancel a subscription; the row stays (inactive) so other workers' refresh sees the change"""
+    try:
+        subscription = db.session.get(Subscription, subscription_id)
+        if subscription is None or not subscription.active:
+            return jsonify({'error': 'Subscription not found'}), 404
+        subscription.active = False
+        subscription.updated_at = datetime.utcnow()
+        db.session.commit()
+        get_percolator(current_app._get_current_object()).index.remove(subscription_id)
+        return '', 204
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to delete subscription'}), 500
+
+
+@subscriptions_bp.route('/subscriptions/<int:subscription_id>/matches', methods=['GET'])
+def get_subscription_matches(subscription_id):
+    """
+    Events matched by a subscription, oldest first, one keyset page at a time:
+    ?after=<last match id>&limit=. The next cursor is in X-Next-Cursor.
+    """
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        after_id = int(request.args.get('after', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and after must be integers'}), 400
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+    if db.session.get(Subscription, subscription_id) is None:
+        return jsonify({'error': 'Subscription not found'}), 404
+
+    matches = db.session.scalars(
+        db.select(SubscriptionMatch)
+        .where(SubscriptionMatch.subscription_id == subscription_id, SubscriptionMatch.id > after_id)
+        .order_by(SubscriptionMatch.id)
+        .limit(limit)
+    ).all()
+    response = jsonify([match.to_dict() for match in matches])
+    if len(matches) == limit:
+        response.headers['X-Next-Cursor'] = str(matches[-1].id)
+    return response
@@ -1,12 +1,168 @@
-from flask import Blueprint, jsonify, request
+import json
+import os
+import re
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from src.models.user import User, db
+from src.services.metrics import timed
+from src.services.rate_limit import install_rate_limit
+from src.services.user_cache import cached_user_body, invalidate_users
 
 user_bp = Blueprint('user', __name__)
+install_rate_limit(user_bp)
+
+USER_FIELDS = ('id', 'username', 'email')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+
+# Bulk import: rows per transaction and per request
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', '1000'))
+BULK_MAX_ROWS = int(os.getenv('BULK_MAX_ROWS', '500000'))
+
+
+def parse_fields(value):
+    """Validate a comma-separated ?fields= projection; id is always included for the cursor"""
+    if not value:
+        return USER_FIELDS
+    requested = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in USER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return tuple(field for field in USER_FIELDS if field == 'id' or field in requested)
+
+
+def validate_username(username):
+    if len(username) < 3 or len(username) > 80:
+        return 'Username must be between 3 and 80 characters'
+    return None
+
+
+def validate_email(email):
+    if '@' not in email or len(email) > 120:
+        return 'Invalid email format or too long'
+    return None
+
+
+def validate_user(data):
+    """
+    Shared create/import validation. Returns (username, email, error) with the
+    values stripped; error is None when the record is valid.
+    """
+    username = data.get('username') or ''
+    email = data.get('email') or ''
+    if not isinstance(username, str) or not isinstance(email, str):
+        return None, None, 'Username and email must be strings'
+    username = username.strip()
+    email = email.strip()
+
+    if not username:
+        return username, email, 'Username is required'
+    if not email:
+        return username, email, 'Email is required'
+    return username, email, validate_username(username) or validate_email(email)
+
+
+UNIQUE_COLUMNS = ('username', 'email')
+_CONFLICT_MESSAGES = {'username': 'Username already exists', 'email': 'Email already exists'}
+
+
+def conflicting_columns(orig):
+    """
+    Unique columns named by a driver's IntegrityError: the constraint name on
+    psycopg/psycopg2 ("user_email_key"), the column list on SQLite ("UNIQUE
+    constraint failed: user.email") or the key on MySQL ("for key 'user.email'").
+    Only that name is parsed, never the whole message, whose DETAIL or duplicate
+    value can mention any column.
+    """
+    diag = getattr(orig, 'diag', None)
+    name = getattr(diag, 'constraint_name', None) if diag is not None else None
+    if not name:
+        message = str(orig)
+        if 'constraint failed:' in message:
+            name = message.split('constraint failed:', 1)[1].splitlines()[0]
+        elif 'for key' in message:
+            name = message.rsplit('for key', 1)[1]
+        elif 'unique constraint "' in message:
+            name = message.split('unique constraint "', 1)[1].split('"', 1)[0]
+        else:
+            return set()
+    words = set(re.split(r'[^a-z0-9]+', name.lower()))
+    return {column for column in UNIQUE_COLUMNS if column in words}
+
+
+def unique_conflict_error(exc):
+    """Map an IntegrityError from the unique constraints to the 409 message for the column that collided"""
+    columns = conflicting_columns(getattr(exc, 'orig', exc))
+    if len(columns) == 1:
+        return _CONFLICT_MESSAGES[columns.pop()]
+    return 'Username or email already exists'
+
+
+def fetch_user_page(fields, after_id, limit):
+    """One keyset page: rows with id > after_id in id order, selecting only the projected columns"""
+    columns = [getattr(User, field) for field in fields]
+    rows = (db.session.query(*columns)
+            .filter(User.id > after_id)
+            .order_by(User.id)
+            .limit(limit)
+            .all())
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def stream_users(fields):
+    """Yield the whole table as one JSON array, a keyset batch at a time"""
+    yield '['
+    after_id = 0
+    first = True
+    while True:
+        page = fetch_user_page(fields, after_id, EXPORT_BATCH_SIZE)
+        if not page:
+            break
+        for user in page:
+            yield ('' if first else ',') + json.dumps(user, separators=(',', ':'))
+            first = False
+        after_id = page[-1]['id']
+        if len(page) < EXPORT_BATCH_SIZE:
+            break
+    yield ']'
+
 
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """
+    Users in id order, one keyset page at a time: ?limit=&after=<last id>&fields=id,username.
+    The next page's cursor is returned in the Link and X-Next-Cursor headers.
+    ?export=1 streams every user as a single JSON array instead.
+    """
+    try:
+        fields = parse_fields(request.args.get('fields', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if request.args.get('export') == '1':
+        return Response(stream_with_context(stream_users(fields)), content_type='application/json')
+
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        after_id = int(request.args.get('after', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and after must be integers'}), 400
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    page = fetch_user_page(fields, after_id, limit)
+    response = jsonify(page)
+    if len(page) == limit:
+        next_cursor = page[-1]['id']
+        args = {'after': next_cursor, 'limit': limit}
+        if request.args.get('fields'):
+            args['fields'] = ','.join(fields)
+        query = '&'.join(f'{key}={value}' for key, value in args.items())
+        response.headers['Link'] = f'<{request.base_url}?{query}>; rel="next"'
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -16,72 +172,249 @@ def create_user():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        username = data.get('username', '').strip()
-        email = data.get('email', '').strip()
-        
-        if not username:
-            return jsonify({'error': 'Username is required'}), 400
-        
-        if not email:
-            return jsonify({'error': 'Email is required'}), 400
-        
-        if len(username) < 3 or len(username) > 80:
-            return jsonify({'error': 'Username must be between 3 and 80 characters'}), 400
-        
-        if '@' not in email or len(email) > 120:
-            return jsonify({'error': 'Invalid email format or too long'}), 400
-            
-        existing_user = User.query.filter((User.username == username) | (User.email == email)).first()
-        if existing_user:
-            return jsonify({'error': 'Username or email already exists'}), 409
-        
+        username, email, error = validate_user(data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        # The unique constraints decide conflicts, so there is no check-then-insert race
         user = User(username=username, email=email)
         db.session.add(user)
+        db.session.flush()
+        # Serialize before commit expires the instance, which would cost a SELECT to reload it
+        body = user.to_dict()
         db.session.commit()
-        return jsonify(user.to_dict()), 201
-        
+        return jsonify(body), 201
+
+    except IntegrityError as e:
+        db.session.rollback()
+        return jsonify({'error': unique_conflict_error(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to create user'}), 500
 
+def iter_lines(stream, block_size=1024 * 1024):
+    """Split a request stream into lines, reading it in large blocks rather than line by line"""
+    remainder = b''
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        lines = (remainder + block).split(b'\n')
+        remainder = lines.pop()
+        yield from lines
+    if remainder:
+        yield remainder
+
+
+def read_bulk_records():
+    """
+    Records from a JSON array body, or from NDJSON (one object per line) when the
+    request is sent as application/x-ndjson; NDJSON is read line by line.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        for line in iter_lines(request.stream):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+        return
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of users or an NDJSON body')
+    yield from data
+
+
+def import_user_chunk(rows, results):
+    """
+    Upsert one chunk of validated (index, username, email) rows keyed by username,
+    using one set-based lookup per unique column and a single transaction
+    """
+    usernames = [username for _, username, _ in rows]
+    emails = [email for _, _, email in rows]
+    by_username = {
+        username: (user_id, email)
+        for user_id, username, email in db.session.query(User.id, User.username, User.email)
+        .filter(User.username.in_(usernames))
+    }
+    email_owner = {
+        email: user_id
+        for user_id, email in db.session.query(User.id, User.email).filter(User.email.in_(emails))
+    }
+
+    inserts, insert_indexes, updates = [], [], []
+    for index, username, email in rows:
+        existing = by_username.get(username)
+        owner = email_owner.get(email)
+        if existing is not None:
+            user_id, current_email = existing
+            if current_email == email:
+                results[index] = {'index': index, 'status': 'unchanged', 'id': user_id}
+            elif owner is not None and owner != user_id:
+                results[index] = {'index': index, 'status': 'error', 'error': 'Email already exists'}
+            else:
+                updates.append({'id': user_id, 'email': email})
+                results[index] = {'index': index, 'status': 'updated', 'id': user_id}
+        elif owner is not None:
+            results[index] = {'index': index, 'status': 'error', 'error': 'Email already exists'}
+        else:
+            inserts.append({'username': username, 'email': email})
+            insert_indexes.append(index)
+
+    # Core statements: executemany / multi-row INSERT ... RETURNING (where supported) without ORM bookkeeping
+    table = User.__table__
+    if updates:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('user_id')).values(email=bindparam('new_email')),
+            [{'user_id': row['id'], 'new_email': row['email']} for row in updates],
+        )
+    if inserts:
+        if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+            new_ids = db.session.scalars(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True), inserts
+            ).all()
+        else:
+            # e.g. MySQL, which has no INSERT ... RETURNING: look the new rows up by their unique username
+            db.session.execute(insert(table), inserts)
+            created = dict(db.session.execute(
+                select(table.c.username, table.c.id).where(table.c.username.in_([row['username'] for row in inserts]))
+            ).all())
+            new_ids = [created[row['username']] for row in inserts]
+        for index, user_id in zip(insert_indexes, new_ids):
+            results[index] = {'index': index, 'status': 'created', 'id': user_id}
+    db.session.commit()
+    if updates:
+        invalidate_users([row['id'] for row in updates])
+
+
+@user_bp.route('/users/bulk', methods=['POST'])
+def bulk_import_users():
+    """
+    Create or update many users in one request, upserting by username. Rows are
+    validated up front and written in chunked transactions; the response has
+    one result per input row, in input order.
+    """
+    results = []
+    pending = []
+    seen_usernames = set()
+    seen_emails = set()
+    try:
+        for index, data in enumerate(read_bulk_records()):
+            if index >= BULK_MAX_ROWS:
+                return jsonify({'error': f'At most {BULK_MAX_ROWS} users per request'}), 413
+            results.append(None)
+            if not isinstance(data, dict):
+                results[index] = {'index': index, 'status': 'error', 'error': 'Invalid record'}
+                continue
+            username, email, error = validate_user(data)
+            if not error and username in seen_usernames:
+                error = 'Duplicate username in request'
+            elif not error and email in seen_emails:
+                error = 'Duplicate email in request'
+            if error:
+                results[index] = {'index': index, 'status': 'error', 'error': error}
+                continue
+            seen_usernames.add(username)
+            seen_emails.add(email)
+            pending.append((index, username, email))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not results:
+        return jsonify({'error': 'No data provided'}), 400
+
+    for start in range(0, len(pending), BULK_CHUNK_SIZE):
+        chunk = pending[start:start + BULK_CHUNK_SIZE]
+        try:
+            try:
+                import_user_chunk(chunk, results)
+            except IntegrityError:
+                # A concurrent writer took one of the names; retry the chunk once against fresh state
+                db.session.rollback()
+                import_user_chunk(chunk, results)
+        except Exception as e:
+            # Earlier chunks are already committed, so report this one's rows and carry on
+            db.session.rollback()
+            print(f"Bulk user import error: {e}")
+            for index, _, _ in chunk:
+                results[index] = {'index': index, 'status': 'error', 'error': 'Failed to import user'}
+
+    summary = {status: 0 for status in ('created', 'updated', 'unchanged', 'error')}
+    for result in results:
+        summary[result['status']] += 1
+    return jsonify({'summary': summary, 'results': results})
+
+def load_user_body(user_id):
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    return current_app.json.dumps(user.to_dict()).encode('utf-8') + b'\n'
+
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict())
+    """Profile reads are served from the serialized-user cache, falling back to the database"""
+    with timed('user_cache_lookup'):
+        body = cached_user_body(user_id, load_user_body)
+    if body is None:
+        return jsonify({'error': 'User not found'}), 404
+    return Response(body, content_type='application/json')
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
+    """
+    Partial update of username and/or email as a single UPDATE ... RETURNING;
+    uniqueness is enforced by the constraints and surfaced as a 409
+    """
     try:
-        user = User.query.get_or_404(user_id)
         data = request.get_json()
-        
+
         if not data:
             return jsonify({'error': 'No data provided'}), 400
-        
-        username = data.get('username', '').strip() if data.get('username') else user.username
-        email = data.get('email', '').strip() if data.get('email') else user.email
-        
-        if username != user.username:
-            if len(username) < 3 or len(username) > 80:
-                return jsonify({'error': 'Username must be between 3 and 80 characters'}), 400
-                
-            existing_user = User.query.filter(User.username == username, User.id != user_id).first()
-            if existing_user:
-                return jsonify({'error': 'Username already exists'}), 409
-        
-        if email != user.email:
-            if '@' not in email or len(email) > 120:
-                return jsonify({'error': 'Invalid email format or too long'}), 400
-                
-            existing_user = User.query.filter(User.email == email, User.id != user_id).first()
-            if existing_user:
-                return jsonify({'error': 'Email already exists'}), 409
-        
-        user.username = username
-        user.email = email
+
+        changes = {}
+        for field, validate in (('username', validate_username), ('email', validate_email)):
+            value = data.get(field)
+            if not value:
+                continue
+            if not isinstance(value, str):
+                return jsonify({'error': 'Username and email must be strings'}), 400
+            value = value.strip()
+            error = validate(value)
+            if error:
+                return jsonify({'error': error}), 400
+            changes[field] = value
+
+        table = User.__table__
+        if not changes:
+            row = db.session.execute(
+                select(table.c.id, table.c.username, table.c.email).where(table.c.id == user_id)
+            ).first()
+        elif db.engine.dialect.update_returning:
+            row = db.session.execute(
+                update(table).where(table.c.id == user_id).values(**changes)
+                .returning(table.c.id, table.c.username, table.c.email)
+            ).first()
+        else:
+            # e.g. MySQL, which has no UPDATE ... RETURNING
+            db.session.execute(update(table).where(table.c.id == user_id).values(**changes))
+            row = db.session.execute(
+                select(table.c.id, table.c.username, table.c.email).where(table.c.id == user_id)
+            ).first()
         db.session.commit()
-        return jsonify(user.to_dict())
-        
+
+        if row is None:
+            return jsonify({'error': 'User not found'}), 404
+        if changes:
+            invalidate_users([user_id])
+        return jsonify(dict(row._mapping))
+
+    except IntegrityError as e:
+        db.session.rollback()
+        return jsonify({'error': unique_conflict_error(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to update user'}), 500
@@ -89,9 +422,12 @@ def update_user(user_id):
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
     try:
-        user = User.query.get_or_404(user_id)
+        user = db.session.get(User, user_id)
+        if user is None:
+            return jsonify({'error': 'User not found'}), 404
         db.session.delete(user)
         db.session.commit()
+        invalidate_users([user_id])
         return '', 204
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,206 @@
+"""
+Admission control for a blueprint. A bounded number of requests run at once
+per worker; the rest wait briefly in a short queue, cheap endpoints ahead of
+expensive ones, and are turned away when the queue is full or the wait runs
+out. Turned-away requests get the blueprint's degraded response when it has
+one, otherwise a fast 503 with Retry-After. Recent search results are kept
+so repeat searches skip admission and overloaded ones can still be answered.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from flask import g, jsonify, request
+from src.services.metrics import describe, get_counter, observe_stage, register_gauge
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', '1') == '1'
+# Requests running at once per worker; ADMISSION_RESERVED of them can only be used by cheap endpoints
+ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', '16'))
+ADMISSION_RESERVED = int(os.getenv('ADMISSION_RESERVED', '4'))
+# Requests waiting for a slot, and how long each may wait
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', '16'))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_MS', '250'))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv('ADMISSION_RETRY_AFTER_SECONDS', '2'))
+
+# Search results kept per worker: served without admission while fresh, and to overloaded requests until stale
+SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', '1000'))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv('SEARCH_CACHE_TTL_SECONDS', '60'))
+SEARCH_CACHE_STALE_SECONDS = float(os.getenv('SEARCH_CACHE_STALE_SECONDS', '1800'))
+
+ADMITTED = 'admitted'
+QUEUE_FULL = 'queue_full'
+QUEUE_TIMEOUT = 'queue_timeout'
+
+ADMISSION_METRIC = 'admission_requests_total'
+describe(ADMISSION_METRIC, 'Requests by admission outcome (admitted, cached, degraded, rejected)')
+
+
+class AdmissionController:
+    """
+    A counting semaphore with a short, bounded queue. Expensive requests hold
+    at most limit - reserved slots, so the reserved ones stay free for cheap
+    requests, and queued cheap requests are admitted before expensive ones.
+    """
+
+    def __init__(self, limit, reserved, queue_size, queue_timeout_ms):
+        self.limit = limit
+        self.expensive_limit = max(1, limit - reserved)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.pid = os.getpid()
+        self.active = 0
+        self.active_expensive = 0
+        self._waiting = {True: deque(), False: deque()}
+        self._lock = threading.Lock()
+
+    def _fits(self, cheap):
+        return self.active < self.limit and (cheap or self.active_expensive < self.expensive_limit)
+
+    def _take(self, cheap):
+        self.active += 1
+        if not cheap:
+            self.active_expensive += 1
+
+    def queued(self):
+        return len(self._waiting[True]) + len(self._waiting[False])
+
+    def acquire(self, cheap):
+        """ADMITTED, QUEUE_FULL or QUEUE_TIMEOUT; only ADMITTED must be released"""
+        with self._lock:
+            waiting = self._waiting[cheap]
+            if not waiting and self._fits(cheap):
+                self._take(cheap)
+                return ADMITTED
+            if self.queued() >= self.queue_size:
+                return QUEUE_FULL
+            waiter = threading.Event()
+            waiting.append(waiter)
+        if waiter.wait(self.queue_timeout):
+            return ADMITTED
+        with self._lock:
+            # Granted between the timeout and taking the lock
+            if waiter.is_set():
+                return ADMITTED
+            waiting.remove(waiter)
+            return QUEUE_TIMEOUT
+
+    def release(self, cheap):
+        with self._lock:
+            self.active -= 1
+            if not cheap:
+                self.active_expensive -= 1
+            for waiting_cheap in (True, False):
+                waiting = self._waiting[waiting_cheap]
+                while waiting and self._fits(waiting_cheap):
+                    self._take(waiting_cheap)
+                    waiting.popleft().set()
+
+
+class ResultCache:
+    """LRU of search scope -> (stored at, activities), read with a maximum age"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scope, max_age):
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry is None or time.monotonic() - entry[0] > max_age:
+                return None
+            self._entries.move_to_end(scope)
+            return entry[1]
+
+    def put(self, scope, activities):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[scope] = (time.monotonic(), activities)
+            self._entries.move_to_end(scope)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_results = ResultCache(SEARCH_CACHE_SIZE)
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def cache_results(scope, activities):
+    _results.put(scope, activities)
+
+
+def cached_results(scope, stale=False):
+    """Fresh results for a search scope, or with stale=True any not yet past SEARCH_CACHE_STALE_SECONDS"""
+    return _results.get(scope, SEARCH_CACHE_STALE_SECONDS if stale else SEARCH_CACHE_TTL_SECONDS)
+
+
+def get_admission():
+    """This worker's controller; a forked worker gets its own"""
+    global _controller
+    if _controller is None or _controller.pid != os.getpid():
+        with _controller_lock:
+            if _controller is None or _controller.pid != os.getpid():
+                _controller = AdmissionController(ADMISSION_MAX_CONCURRENT, ADMISSION_RESERVED,
+                                                  ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT_MS)
+    return _controller
+
+
+def overloaded_response():
+    response = jsonify({'error': 'Server is busy, please retry shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(ADMISSION_RETRY_AFTER_SECONDS)
+    return response
+
+
+def install_admission(blueprint, cheap_endpoints=(), cached_response=None, degraded_response=None):
+    """
+    Put every request to blueprint through admission control. cached_response(endpoint)
+    may answer a request without a slot (a fresh cache hit); degraded_response(endpoint,
+    reason) may answer one that was turned away. Either returns a response or None.
+    """
+    def admit():
+        if request.method == 'OPTIONS':
+            return None
+        endpoint = request.endpoint
+        if cached_response is not None:
+            response = cached_response(endpoint)
+            if response is not None:
+                get_counter(ADMISSION_METRIC, outcome='cached').inc()
+                return response
+        if not ADMISSION_ENABLED:
+            return None
+
+        cheap = endpoint in cheap_endpoints
+        controller = get_admission()
+        started = time.perf_counter()
+        outcome = controller.acquire(cheap)
+        observe_stage('admission_wait', time.perf_counter() - started)
+        if outcome == ADMITTED:
+            g.admission = (controller, cheap)
+            get_counter(ADMISSION_METRIC, outcome='admitted').inc()
+            return None
+
+        response = degraded_response(endpoint, outcome) if degraded_response is not None else None
+        get_counter(ADMISSION_METRIC, outcome='rejected' if response is None else 'degraded').inc()
+        return response if response is not None else overloaded_response()
+
+    def release(exc):
+        admission = g.pop('admission', None)
+        if admission is not None:
+            controller, cheap = admission
+            controller.release(cheap)
+
+    blueprint.before_request(admit)
+    blueprint.teardown_request(release)
+
+
+register_gauge('admission_active', 'Requests holding an admission slot',
+               lambda: _controller.active if _controller is not None else 0)
+register_gauge('admission_queued', 'Requests waiting for an admission slot',
+               lambda: _controller.queued() if _controller is not None else 0)
+register_gauge('search_cache_entries', 'Search results kept for repeat and overloaded searches', lambda: len(_results))
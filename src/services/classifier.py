@@ -0,0 +1,176 @@
+from collections import deque
+from functools import lru_cache
+
+# Query categories in priority order: when a query matches several, the first wins
+# as the primary category. Each carries the upstream filters it maps to.
+CATEGORIES = [
+    {
+        'id': 'music',
+        'keywords': ['music', 'concert', 'festival', 'band', 'jazz', 'rock', 'live music'],
+        'yelp': 'music',
+        'ticketmaster': 'Music',
+    },
+    {
+        'id': 'food',
+        'keywords': ['food', 'restaurant', 'dining', 'wine', 'beer', 'cooking', 'tasting'],
+        'yelp': 'food-and-drink',
+        'ticketmaster': None,
+    },
+    {
+        'id': 'tech',
+        'keywords': ['tech', 'technology', 'programming', 'coding', 'startup', 'hackathon'],
+        'yelp': 'business',
+        'ticketmaster': None,
+    },
+    {
+        'id': 'art',
+        'keywords': ['art', 'arts', 'gallery', 'galleries', 'exhibition', 'painting', 'sculpture', 'theatre', 'theater'],
+        'yelp': 'visual-arts',
+        'ticketmaster': 'Arts & Theatre',
+    },
+    {
+        'id': 'fitness',
+        'keywords': ['sport', 'fitness', 'running', 'yoga', 'gym', 'workout'],
+        'yelp': 'sports-and-fitness',
+        'ticketmaster': 'Sports',
+    },
+]
+
+_CATEGORY_BY_ID = {category['id']: category for category in CATEGORIES}
+_PRIORITY = {category['id']: index for index, category in enumerate(CATEGORIES)}
+
+
+def _inflections(keyword):
+    """A keyword also matches its plain plural ("concerts", "festivals")"""
+    if keyword.endswith('s'):
+        return [keyword]
+    return [keyword, keyword + 's']
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over the category keywords. A query is scanned once
+    and a match only counts when it starts and ends on a word boundary, so
+    "art" matches "street art" but not "party".
+    """
+
+    def __init__(self, keyword_map):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for keyword, category_id in keyword_map:
+            self._add(keyword, category_id)
+        self._build_failure_links()
+
+    def _add(self, keyword, category_id):
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append((len(keyword), category_id))
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def matches(self, text):
+        """Yield (start, end, category_id) for every whole-word keyword in text"""
+        state = 0
+        length = len(text)
+        for index, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if not self.output[state]:
+                continue
+            end = index + 1
+            if end < length and text[end].isalnum():
+                continue
+            for keyword_length, category_id in self.output[state]:
+                start = end - keyword_length
+                if start == 0 or not text[start - 1].isalnum():
+                    yield start, end, category_id
+
+
+_automaton = KeywordAutomaton(
+    (inflection, category['id'])
+    for category in CATEGORIES
+    for keyword in category['keywords']
+    for inflection in _inflections(keyword)
+)
+
+
+@lru_cache(maxsize=4096)
+def _classify_normalized(query_lower):
+    found = {category_id for _, _, category_id in _automaton.matches(query_lower)}
+    return tuple(sorted(found, key=_PRIORITY.__getitem__))
+
+
+def classify_query(query):
+    """
+    Return the matching category ids for a query, highest priority first
+    """
+    if not query:
+        return ()
+    return _classify_normalized(' '.join(str(query).lower().split()))
+
+
+def classify_text(text):
+    """
+    Category ids mentioned anywhere in free text such as an event title. Not
+    memoized, unlike classify_query, since event text rarely repeats.
+    """
+    if not text:
+        return ()
+    found = {category_id for _, _, category_id in _automaton.matches(' '.join(str(text).lower().split()))}
+    return tuple(sorted(found, key=_PRIORITY.__getitem__))
+
+
+def primary_category(query):
+    """The highest-priority category id for a query, or None"""
+    categories = classify_query(query)
+    return categories[0] if categories else None
+
+
+def get_category(category_id):
+    return _CATEGORY_BY_ID.get(category_id)
+
+
+def yelp_categories(query):
+    """Comma-separated Yelp event categories for a query ('other' when nothing matches)"""
+    mapped = [_CATEGORY_BY_ID[category_id]['yelp'] for category_id in classify_query(query)]
+    return ','.join(mapped) if mapped else 'other'
+
+
+def ticketmaster_classification(query):
+    """
+    Ticketmaster segment name to push down as classificationName, or None. Only
+    pushed down when every matched category agrees, so a mixed query such as
+    "food festival" is not narrowed to a single segment.
+    """
+    segments = {_CATEGORY_BY_ID[category_id]['ticketmaster'] for category_id in classify_query(query)}
+    if len(segments) == 1:
+        return segments.pop()
+    return None
+
+
+def iter_keywords():
+    """Yield (keyword, category_id) for every configured keyword"""
+    for category in CATEGORIES:
+        for keyword in category['keywords']:
+            yield keyword, category['id']
@@ -0,0 +1,543 @@
+"""
+Read-only columnar snapshot of the activity corpus.
+
+Activities returned by searches are buffered per worker and periodically merged
+into one snapshot file: fixed-width little-endian arrays (id hash, date, category
+code, source code, lat, lon, similarity cluster, record offset/length), the
+events' similarity vectors and cluster centroids, then a heap of JSON-encoded
+records. Every worker mmaps the same file, so the corpus lives once
+in the page cache however many workers there are, and filters run as NumPy
+vectorized predicates over the mapped arrays.
+
+    python -m src.services.corpus synthetic 1000000   # write a synthetic corpus for benchmarking
+    python -m src.services.corpus info
+"""
+import hashlib
+import importlib.util
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.classifier import CATEGORIES, classify_text
+from src.services.metrics import register_gauge
+from src.services.similar import SIMILAR_DIMENSIONS, activity_vectors, cluster_vectors, quantize
+
+# NumPy is optional; without it the corpus is simply unavailable
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+CORPUS_ENABLED = NUMPY_AVAILABLE and os.getenv('CORPUS_ENABLED', '1') == '1'
+CORPUS_PATH = os.getenv('CORPUS_PATH', os.path.join(tempfile.gettempdir(), 'activity-finder-corpus.bin'))
+# How often a worker merges its buffered activities into the snapshot, and the buffer bound
+CORPUS_EXPORT_SECONDS = float(os.getenv('CORPUS_EXPORT_SECONDS', '60'))
+CORPUS_MAX_PENDING = int(os.getenv('CORPUS_MAX_PENDING', '50000'))
+# How often a worker checks whether another worker replaced the snapshot
+CORPUS_RELOAD_SECONDS = float(os.getenv('CORPUS_RELOAD_SECONDS', '5'))
+# Events that ended more than this many days ago are dropped at export
+CORPUS_RETENTION_DAYS = int(os.getenv('CORPUS_RETENTION_DAYS', '1'))
+
+MAGIC = b'AFCORP1\n'
+ALIGNMENT = 64
+NO_DATE = -1
+
+# Category codes are the classifier's categories; 0 is anything else
+CATEGORY_CODES = ['other'] + [category['id'] for category in CATEGORIES]
+_CATEGORY_INDEX = {name: code for code, name in enumerate(CATEGORY_CODES)}
+
+COLUMNS = (
+    ('id_hash', '<u8'),
+    ('date', '<i4'),        # days since 1970-01-01, NO_DATE when unknown
+    ('category', '<u2'),
+    ('source', '<u1'),
+    ('lat', '<f4'),         # NaN when unknown
+    ('lon', '<f4'),
+    ('cluster', '<u2'),     # nearest similarity centroid
+    ('heap_offset', '<u8'),
+    ('heap_length', '<u4'),
+)
+
+_EPOCH = date(1970, 1, 1)
+SYNTHETIC_TOPIC_WORDS = 50
+SYNTHETIC_GENERAL_WORDS = 2000
+
+
+def id_hash(activity_id):
+    return int.from_bytes(hashlib.blake2b(str(activity_id).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def day_number(value):
+    """'2025-06-14' -> days since the epoch, NO_DATE when unparseable"""
+    try:
+        return (date.fromisoformat(str(value)[:10]) - _EPOCH).days
+    except ValueError:
+        return NO_DATE
+
+
+def category_code(activity):
+    found = classify_text(f"{activity.get('category', '')} {activity.get('title', '')}")
+    return _CATEGORY_INDEX[found[0]] if found else 0
+
+
+def _coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class ColumnarSnapshot:
+    """A mapped snapshot file; columns are zero-copy NumPy views over the mapping"""
+
+    def __init__(self, path):
+        import numpy as np
+
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not an activity corpus snapshot')
+        (header_length,) = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._mmap[start:start + header_length])
+        self.count = header['count']
+        self.sources = header['sources']
+        self.created_at = header['created_at']
+        self.columns = {
+            name: np.frombuffer(self._mmap, dtype=dtype, count=self.count, offset=offset)
+            for name, (offset, dtype) in header['columns'].items()
+        }
+        self._heap_offset = header['heap_offset']
+        # Snapshots written before similarity vectors existed have neither block
+        self.vectors = self.centroids = None
+        self.trained_on = header.get('trained_on', 0)
+        if 'vectors' in header:
+            offset, dimensions = header['vectors']
+            self.vectors = np.frombuffer(self._mmap, dtype='<i1', count=self.count * dimensions,
+                                         offset=offset).reshape(self.count, dimensions)
+            offset, clusters = header['centroids']
+            self.centroids = np.frombuffer(self._mmap, dtype='<f4', count=clusters * dimensions,
+                                           offset=offset).reshape(clusters, dimensions)
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        start = self._heap_offset + int(self.columns['heap_offset'][index])
+        return json.loads(self._mmap[start:start + int(self.columns['heap_length'][index])])
+
+    def filter(self, start_day=None, end_day=None, categories=None, sources=None,
+               lat=None, lon=None, radius_km=None, limit=50):
+        """
+        Indices of matching events, soonest first. The most selective predicate
+        scans its whole column; the rest only look at the rows that survived it.
+        The radius check is a bounding box on latitude and longitude followed by
+        the exact haversine distance.
+        """
+        import numpy as np
+
+        columns = self.columns
+        predicates = []
+        if lat is not None and lon is not None and radius_km is not None:
+            lat_span = radius_km / 111.0
+            lon_span = radius_km / max(111.0 * np.cos(np.radians(lat)), 1e-6)
+            predicates.append(('lat', lambda values: np.abs(values - np.float32(lat)) <= lat_span))
+            predicates.append(('lon', lambda values: np.abs(values - np.float32(lon)) <= lon_span))
+        if start_day is not None and end_day is not None:
+            # One unsigned comparison covers both bounds (and excludes NO_DATE)
+            if end_day < start_day:
+                return np.empty(0, dtype=np.int64)
+            span = np.uint32(end_day - start_day)
+            predicates.append(('date', lambda values: (values - np.int32(start_day)).view(np.uint32) <= span))
+        elif start_day is not None:
+            predicates.append(('date', lambda values: values >= start_day))
+        elif end_day is not None:
+            predicates.append(('date', lambda values: (values <= end_day) & (values != NO_DATE)))
+        if categories:
+            wanted = np.zeros(len(CATEGORY_CODES), dtype=bool)
+            wanted[[_CATEGORY_INDEX[name] for name in categories if name in _CATEGORY_INDEX]] = True
+            predicates.append(('category', lambda values: wanted[values]))
+        if sources:
+            wanted_sources = np.zeros(256, dtype=bool)
+            wanted_sources[[code for code, name in enumerate(self.sources) if name in sources]] = True
+            predicates.append(('source', lambda values: wanted_sources[values]))
+
+        if predicates:
+            name, predicate = predicates[0]
+            indices = np.flatnonzero(predicate(columns[name]))
+            for name, predicate in predicates[1:]:
+                indices = indices[predicate(columns[name][indices])]
+        else:
+            indices = np.arange(self.count)
+
+        if lat is not None and lon is not None and radius_km is not None and len(indices):
+            lat1, lon1 = np.radians(lat), np.radians(lon)
+            lat2 = np.radians(columns['lat'][indices].astype(np.float64))
+            lon2 = np.radians(columns['lon'][indices].astype(np.float64))
+            a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+            indices = indices[6371.0 * 2 * np.arcsin(np.sqrt(a)) <= radius_km]
+
+        # Undated events sort last
+        dates = columns['date'][indices]
+        dates = np.where(dates == NO_DATE, np.iinfo(np.int32).max, dates)
+        if len(indices) > limit:
+            nearest = np.argpartition(dates, limit)[:limit]
+            indices, dates = indices[nearest], dates[nearest]
+        return indices[np.argsort(dates, kind='stable')]
+
+    def close(self):
+        self.columns = {}
+        self.vectors = self.centroids = None
+        self._mmap.close()
+
+
+def write_snapshot(path, columns, heap, sources, vectors, centroids, trained_on):
+    """
+    Write columns (name -> array in COLUMNS order/dtypes), the similarity
+    vectors and centroids, and the record heap to a temporary file, then
+    atomically replace the snapshot
+    """
+    count = len(columns['id_hash'])
+    layout = {}
+    offset = 0
+    for name, dtype in COLUMNS:
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = offset
+        offset += count * int(dtype[-1])
+    vectors_offset = -(-offset // ALIGNMENT) * ALIGNMENT
+    centroids_offset = -(-(vectors_offset + vectors.size) // ALIGNMENT) * ALIGNMENT
+    heap_offset = -(-(centroids_offset + centroids.size * 4) // ALIGNMENT) * ALIGNMENT
+
+    header = {
+        'count': count,
+        'sources': sources,
+        'categories': CATEGORY_CODES,
+        'created_at': time.time(),
+        'columns': {},
+        'vectors': [0, vectors.shape[1]],
+        'centroids': [0, len(centroids)],
+        'trained_on': trained_on,
+        'heap_offset': 0,
+    }
+    # Offsets are relative to the file, after the header; size the header first
+    header_probe = json.dumps(header | {
+        'columns': {n: [10 ** 12, d] for n, d in COLUMNS},
+        'vectors': [10 ** 12, vectors.shape[1]],
+        'centroids': [10 ** 12, len(centroids)],
+        'heap_offset': 10 ** 12,
+    })
+    data_start = -(-(len(MAGIC) + 4 + len(header_probe)) // ALIGNMENT) * ALIGNMENT
+    header['columns'] = {name: [data_start + layout[name], dtype] for name, dtype in COLUMNS}
+    header['vectors'][0] = data_start + vectors_offset
+    header['centroids'][0] = data_start + centroids_offset
+    header['heap_offset'] = data_start + heap_offset
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for name, dtype in COLUMNS:
+                f.seek(data_start + layout[name])
+                f.write(columns[name].astype(dtype, copy=False).tobytes())
+            f.seek(data_start + vectors_offset)
+            f.write(vectors.astype('<i1', copy=False).tobytes())
+            f.seek(data_start + centroids_offset)
+            f.write(centroids.astype('<f4', copy=False).tobytes())
+            f.seek(data_start + heap_offset)
+            f.write(heap)
+        os.replace(temp_path, path)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+
+def build_columns(records, sources):
+    """
+    Columns and heap for a list of (activity, lat, lon) tuples. sources is the
+    source-name table, extended in place with any new source.
+    """
+    import numpy as np
+
+    count = len(records)
+    source_index = {name: code for code, name in enumerate(sources)}
+    columns = {name: np.empty(count, dtype=dtype) for name, dtype in COLUMNS}
+    chunks = []
+    heap_position = 0
+    for row, (activity, lat, lon) in enumerate(records):
+        source = activity.get('source', 'Unknown')
+        if source not in source_index:
+            source_index[source] = len(sources)
+            sources.append(source)
+        encoded = json.dumps(activity, separators=(',', ':')).encode('utf-8')
+        columns['id_hash'][row] = id_hash(activity['id'])
+        columns['date'][row] = day_number(activity.get('date', ''))
+        columns['category'][row] = category_code(activity)
+        columns['source'][row] = source_index[source]
+        columns['lat'][row] = lat
+        columns['lon'][row] = lon
+        columns['heap_offset'][row] = heap_position
+        columns['heap_length'][row] = len(encoded)
+        chunks.append(encoded)
+        heap_position += len(encoded)
+    return columns, b''.join(chunks)
+
+
+def merge_into_snapshot(path, records):
+    """
+    Merge new (activity, lat, lon) records into the snapshot at path: records
+    replace older copies with the same id, and events past the retention
+    window are dropped. Only new records are encoded and vectorized; surviving
+    rows, their vectors and cluster assignments are copied from the old snapshot.
+    """
+    import numpy as np
+
+    old = None
+    if os.path.exists(path):
+        try:
+            old = ColumnarSnapshot(path)
+        except Exception as e:
+            print(f"Corpus snapshot error: {e}")
+
+    sources = list(old.sources) if old is not None else []
+    new_columns, new_heap = build_columns(records, sources)
+    new_vectors = quantize(activity_vectors([activity for activity, _, _ in records]))
+    if old is None or not len(old):
+        if old is not None:
+            old.close()
+        centroids, new_columns['cluster'], trained_on = cluster_vectors(new_vectors)
+        write_snapshot(path, new_columns, new_heap, sources, new_vectors, centroids, trained_on)
+        return len(records)
+
+    cutoff = (date.today() - _EPOCH).days - CORPUS_RETENTION_DAYS
+    keep = ~np.isin(old.columns['id_hash'], new_columns['id_hash'])
+    keep &= (old.columns['date'] >= cutoff) | (old.columns['date'] == NO_DATE)
+    kept = np.flatnonzero(keep)
+
+    lengths = old.columns['heap_length'][kept].astype(np.uint64)
+    starts = (old.columns['heap_offset'][kept] + old._heap_offset).tolist()
+    kept_heap = b''.join(old._mmap[start:start + length] for start, length in zip(starts, lengths.tolist()))
+    kept_offsets = np.cumsum(lengths) - lengths
+
+    if old.vectors is not None and old.vectors.shape[1] == SIMILAR_DIMENSIONS:
+        kept_vectors = old.vectors[kept]
+        kept_clusters, centroids, trained_on = old.columns['cluster'][kept], np.array(old.centroids), old.trained_on
+    else:
+        # Older snapshots, or a changed SIMILAR_DIMENSIONS, are vectorized once from their records
+        kept_vectors = quantize(activity_vectors([old.record(row) for row in kept]))
+        kept_clusters, centroids, trained_on = None, None, 0
+    vectors = np.concatenate((kept_vectors, new_vectors))
+    centroids, clusters, trained_on = cluster_vectors(vectors, centroids, kept_clusters, trained_on)
+
+    merged = {'cluster': clusters}
+    for name, dtype in COLUMNS:
+        if name == 'heap_offset':
+            merged[name] = np.concatenate((kept_offsets, new_columns[name] + len(kept_heap))).astype(dtype)
+        elif name != 'cluster':
+            merged[name] = np.concatenate((old.columns[name][kept], new_columns[name])).astype(dtype)
+    old.close()
+    write_snapshot(path, merged, kept_heap + new_heap, sources, vectors, centroids, trained_on)
+    return len(merged['id_hash'])
+
+
+class CorpusIngest:
+    """
+    Per-worker buffer of activities seen in search results, merged into the
+    shared snapshot by a background thread. An exclusive lock file keeps
+    workers from merging concurrently.
+    """
+
+    def __init__(self, path=CORPUS_PATH, export_seconds=CORPUS_EXPORT_SECONDS, max_pending=CORPUS_MAX_PENDING):
+        self.path = path
+        self.export_seconds = export_seconds
+        self.max_pending = max_pending
+        self.pid = os.getpid()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name='corpus-export', daemon=True)
+        self._thread.start()
+
+    def add(self, activities, place=None):
+        """Queue normalized activities; events without coordinates inherit the searched place's"""
+        fallback_lat = place.get('lat') if place else None
+        fallback_lon = place.get('lon') if place else None
+        with self._lock:
+            for activity in activities:
+                if not activity.get('id'):
+                    continue
+                if len(self._pending) >= self.max_pending and activity['id'] not in self._pending:
+                    self.dropped += 1
+                    continue
+                lat = activity.get('lat') if activity.get('lat') is not None else fallback_lat
+                lon = activity.get('lon') if activity.get('lon') is not None else fallback_lon
+                self._pending[activity['id']] = (activity, _coordinate(lat), _coordinate(lon))
+
+    def pending(self):
+        return len(self._pending)
+
+    def _run(self):
+        while True:
+            time.sleep(self.export_seconds)
+            self.export()
+
+    def export(self):
+        with self._lock:
+            records = list(self._pending.values())
+            self._pending = {}
+        if not records:
+            return 0
+        import fcntl
+
+        try:
+            with open(self.path + '.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                return merge_into_snapshot(self.path, records)
+        except Exception as e:
+            print(f"Corpus export error: {e}")
+            return 0
+
+
+_ingest = None
+_ingest_lock = threading.Lock()
+_snapshot = None
+_snapshot_checked = 0.0
+_snapshot_lock = threading.Lock()
+
+
+def ingest_activities(activities, place=None):
+    """Buffer search results for the corpus; a no-op when the corpus is disabled"""
+    global _ingest
+    if not CORPUS_ENABLED:
+        return
+    if _ingest is None or _ingest.pid != os.getpid():
+        with _ingest_lock:
+            if _ingest is None or _ingest.pid != os.getpid():
+                _ingest = CorpusIngest()
+    _ingest.add(activities, place)
+
+
+def pending_activity(activity_id):
+    """An activity this worker has buffered but not yet exported, or None"""
+    if _ingest is None or _ingest.pid != os.getpid():
+        return None
+    record = _ingest._pending.get(activity_id)
+    return record[0] if record else None
+
+
+def get_snapshot():
+    """
+    This worker's mapping of the current snapshot, or None. Replacement by
+    another worker is noticed within CORPUS_RELOAD_SECONDS.
+    """
+    global _snapshot, _snapshot_checked
+    if not CORPUS_ENABLED:
+        return None
+    now = time.monotonic()
+    if _snapshot is not None and now - _snapshot_checked < CORPUS_RELOAD_SECONDS:
+        return _snapshot
+    with _snapshot_lock:
+        _snapshot_checked = now
+        try:
+            stat = os.stat(CORPUS_PATH)
+        except FileNotFoundError:
+            return None
+        if _snapshot is None or _snapshot.identity != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            try:
+                # The old mapping is left to the garbage collector; requests may still be reading it
+                _snapshot = ColumnarSnapshot(CORPUS_PATH)
+            except Exception as e:
+                print(f"Corpus snapshot error: {e}")
+    return _snapshot
+
+
+register_gauge('corpus_events', 'Events in the mapped activity corpus snapshot',
+               lambda: len(_snapshot) if _snapshot is not None else 0)
+register_gauge('corpus_pending', 'Activities buffered for the next corpus export',
+               lambda: _ingest.pending() if _ingest is not None else 0)
+
+
+def write_synthetic(path, count, seed=7):
+    """A synthetic corpus around the gazetteer's cities, for benchmarks"""
+    import numpy as np
+    from src.services.locations import get_gazetteer
+
+    rng = np.random.default_rng(seed)
+    places = get_gazetteer().places
+    place_index = rng.integers(0, len(places), count)
+    city_lat = np.array([place['lat'] for place in places], dtype=np.float32)[place_index]
+    city_lon = np.array([place['lon'] for place in places], dtype=np.float32)[place_index]
+    today = (date.today() - _EPOCH).days
+    sources = ['Eventbrite', 'Ticketmaster']
+    columns = {
+        'id_hash': np.empty(count, dtype=np.uint64),
+        'date': (today + rng.integers(0, 180, count)).astype(np.int32),
+        'category': rng.integers(0, len(CATEGORY_CODES), count).astype(np.uint16),
+        'source': rng.integers(0, len(sources), count).astype(np.uint8),
+        'lat': city_lat + rng.normal(0, 0.2, count).astype(np.float32),
+        'lon': city_lon + rng.normal(0, 0.2, count).astype(np.float32),
+    }
+    # Titles mix words from a per-category topic list with general words, so similar events cluster
+    topic_words = rng.integers(0, SYNTHETIC_TOPIC_WORDS, (count, 2))
+    general_words = rng.integers(0, SYNTHETIC_GENERAL_WORDS, count)
+    activities = []
+    chunks = []
+    offsets = np.empty(count, dtype=np.uint64)
+    lengths = np.empty(count, dtype=np.uint32)
+    position = 0
+    for row in range(count):
+        columns['id_hash'][row] = id_hash(f'synthetic_{row}')
+        category = CATEGORY_CODES[columns['category'][row]]
+        activity = {
+            'id': f'synthetic_{row}',
+            'title': f'{category}{topic_words[row, 0]} {category}{topic_words[row, 1]} word{general_words[row]} {row}',
+            'location': places[place_index[row]]['display'],
+            'date': str(_EPOCH.fromordinal(_EPOCH.toordinal() + int(columns['date'][row]))),
+            'category': category,
+            'source': sources[columns['source'][row]],
+        }
+        encoded = json.dumps(activity, separators=(',', ':')).encode('utf-8')
+        activities.append(activity)
+        offsets[row] = position
+        lengths[row] = len(encoded)
+        chunks.append(encoded)
+        position += len(encoded)
+    columns['heap_offset'] = offsets
+    columns['heap_length'] = lengths
+    vectors = quantize(activity_vectors(activities))
+    centroids, columns['cluster'], trained_on = cluster_vectors(vectors)
+    write_snapshot(path, columns, b''.join(chunks), sources, vectors, centroids, trained_on)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect or generate the activity corpus snapshot')
+    parser.add_argument('command', choices=['info', 'synthetic'])
+    parser.add_argument('count', type=int, nargs='?', default=1000000)
+    parser.add_argument('--path', default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'synthetic':
+        started = time.perf_counter()
+        write_synthetic(args.path, args.count)
+        print(f"Wrote {args.count} synthetic events to {args.path} in {time.perf_counter() - started:.1f} s")
+    snapshot = ColumnarSnapshot(args.path)
+    print(f"{args.path}: {len(snapshot)} events, {os.path.getsize(args.path) / 1e6:.1f} MB, sources {snapshot.sources}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from src.services.metrics import register_counter
+
+# Worker processes per server process; 0 shares the CPUs between the server
+# processes (WEB_CONCURRENCY, defaulting as in gunicorn.conf.py), at least one each
+_CPUS = os.cpu_count() or 1
+_SERVER_PROCESSES = int(os.getenv('WEB_CONCURRENCY', str(min(4, _CPUS + 1))))
+_CONFIGURED_WORKERS = int(os.getenv('CPU_POOL_WORKERS', '0'))
+CPU_POOL_WORKERS = _CONFIGURED_WORKERS or max(1, _CPUS // max(1, _SERVER_PROCESSES))
+# A pool of one process per server process gains nothing: the work still shares that
+# CPU and also pays for pickling and IPC, so unless CPU_POOL_WORKERS is set
+# explicitly such hosts (os.cpu_count() < 2 * WEB_CONCURRENCY) normalize inline
+CPU_POOL_ENABLED = os.getenv('CPU_POOL_ENABLED', '1') == '1' and (_CONFIGURED_WORKERS > 0 or CPU_POOL_WORKERS > 1)
+# forkserver avoids forking a process that has request threads mid-flight
+CPU_POOL_START_METHOD = os.getenv('CPU_POOL_START_METHOD', 'forkserver')
+# Imported once by the fork server, so pool workers start with them loaded
+CPU_POOL_PRELOAD = ['src.routes.activities']
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_stats = {'chunks': 0, 'fallbacks': 0}
+
+
+def get_process_pool():
+    """This process's worker pool, created on first use (and again in a forked child)"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                context = multiprocessing.get_context(CPU_POOL_START_METHOD)
+                if CPU_POOL_START_METHOD == 'forkserver':
+                    context.set_forkserver_preload(CPU_POOL_PRELOAD)
+                _pool = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS, mp_context=context)
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def map_chunks(func, items, chunk_size):
+    """
+    func(list) -> list applied to consecutive chunks of items in worker
+    processes, results concatenated in order. func must be a module-level
+    function. The calling thread waits without holding the GIL; if the pool
+    is disabled or broken the work runs inline instead.
+    """
+    if not CPU_POOL_ENABLED or len(items) <= chunk_size:
+        return func(items)
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    try:
+        results = list(get_process_pool().map(func, chunks))
+    except Exception as e:
+        print(f"Process pool error: {e}")
+        _stats['fallbacks'] += 1
+        _discard_pool()
+        return func(items)
+    _stats['chunks'] += len(chunks)
+    return [item for result in results for item in result]
+
+
+register_counter('cpu_pool_chunks_total', 'Chunks of CPU-bound work run in the process pool', lambda: _stats['chunks'])
+register_counter('cpu_pool_fallbacks_total', 'Process pool failures that fell back to inline work',
+               lambda: _stats['fallbacks'])
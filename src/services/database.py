@@ -0,0 +1,96 @@
+import os
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+DEFAULT_DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'app.db')
+
+# Pool sizing; with gthread workers a worker can hold one connection per thread
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '16'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '8'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+# SQLite pragmas applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL').upper()
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_CACHE_MB = int(os.getenv('SQLITE_CACHE_MB', '64'))
+SQLITE_MMAP_MB = int(os.getenv('SQLITE_MMAP_MB', '256'))
+
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+
+def get_database_url():
+    """
+    DATABASE_URL selects the backend; without it the bundled SQLite file is used.
+    Heroku-style postgres:// URLs are accepted as well.
+    """
+    url = os.getenv('DATABASE_URL', '').strip()
+    if not url:
+        return f'sqlite:///{DEFAULT_DATABASE_PATH}'
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """
+    Engine/pool options for a database URL. SQLite gets a busy timeout and a
+    pool shared across threads; server databases get pre-ping and recycling so
+    connections dropped by the server or a proxy are replaced transparently.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite':
+        options = {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False}}
+        # In-memory databases live and die with a single connection, so keep the default pool
+        if parsed.database and parsed.database != ':memory:' and 'mode=memory' not in str(parsed):
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        return options
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+    }
+
+
+def configure_database(app):
+    """Set the database URI and engine options on a Flask app before db.init_app"""
+    url = get_database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+
+def sqlite_pragmas():
+    """The pragma statements run on each new SQLite connection"""
+    journal_mode = SQLITE_JOURNAL_MODE if SQLITE_JOURNAL_MODE in JOURNAL_MODES else 'WAL'
+    synchronous = SQLITE_SYNCHRONOUS if SQLITE_SYNCHRONOUS in SYNCHRONOUS_MODES else 'NORMAL'
+    return [
+        f'PRAGMA journal_mode={journal_mode}',
+        # NORMAL is durable in WAL mode except for the last commits on power loss
+        f'PRAGMA synchronous={synchronous}',
+        f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}',
+        # Negative cache_size is in KiB
+        f'PRAGMA cache_size={-SQLITE_CACHE_MB * 1024}',
+        f'PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA foreign_keys=ON',
+    ]
+
+
+@event.listens_for(Engine, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for statement in sqlite_pragmas():
+            cursor.execute(statement)
+    except Exception as e:
+        print(f"SQLite pragma error: {e}")
+    finally:
+        cursor.close()
@@ -0,0 +1,55 @@
+import os
+import sys
+import threading
+
+# Connections kept alive per upstream host; size it to the worker's thread count
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '32'))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Process-wide requests session so provider calls reuse pooled keep-alive
+    connections instead of paying a TCP/TLS handshake per search
+    """
+    global _session
+    if _session is None:
+        # requests is imported on first use so processes that never call upstream skip it
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def reset_http_session():
+    """Drop pooled connections, e.g. in a freshly forked worker"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def is_timeout(exc):
+    """Whether an exception raised by the session is a connect/read timeout"""
+    requests = sys.modules.get('requests')
+    return requests is not None and isinstance(exc, requests.Timeout)
+
+
+def prewarm_connections(urls, timeout=3):
+    """Open a pooled connection to each upstream so the first search skips the handshake"""
+    session = get_http_session()
+    for url in urls:
+        try:
+            session.head(url, timeout=timeout, allow_redirects=False)
+        except Exception as e:
+            print(f"Connection prewarm failed for {url}: {e}")
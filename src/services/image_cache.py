@@ -0,0 +1,107 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class DiskLRUCache:
+    """
+    Size-bounded on-disk cache, shared by every worker using the directory.
+    Reads touch the file's modification time, so it records recency for all
+    workers. Each worker keeps an in-memory index of sizes in recency order,
+    updated on every read and write, and deletes the least recently used files
+    once it holds more than max_bytes. Files written by other workers join the
+    index when read, or at the next directory rescan (every rescan_seconds).
+    """
+
+    def __init__(self, directory, max_bytes, rescan_seconds=60.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rescan_seconds = rescan_seconds
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._index = OrderedDict()
+        self._lock = threading.Lock()
+        self._scanned_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self._rescan()
+
+    def _rescan(self):
+        """Rebuild the index from the directory, oldest first, and evict"""
+        self._scanned_at = time.monotonic()
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        with self._lock:
+            self._index = OrderedDict((name, size) for _, name, size in sorted(entries))
+            self.total_bytes = sum(size for _, _, size in entries)
+            self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Return the cached bytes for key, or None; another worker may have written it"""
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.total_bytes -= self._index.pop(key, 0)
+                self.misses += 1
+            return None
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        with self._lock:
+            if key not in self._index:
+                self.total_bytes += len(data)
+            self._index[key] = len(data)
+            self._index.move_to_end(key)
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        if time.monotonic() - self._scanned_at > self.rescan_seconds:
+            # Picks up what other workers wrote to the same directory since the last scan
+            self._rescan()
+            return
+        with self._lock:
+            self.total_bytes += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used files down to max_bytes; the caller holds the lock"""
+        while self.total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._index), 'bytes': self.total_bytes, 'hits': self.hits, 'misses': self.misses}
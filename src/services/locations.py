@@ -0,0 +1,154 @@
+import csv
+import os
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+
+GAZETTEER_PATH = os.getenv(
+    'GAZETTEER_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'gazetteer.csv'),
+)
+
+# Full names accepted as region qualifiers ("austin, texas")
+REGION_NAMES = {
+    'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
+    'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'district of columbia': 'DC',
+    'florida': 'FL', 'georgia': 'GA', 'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL',
+    'indiana': 'IN', 'iowa': 'IA', 'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA',
+    'maine': 'ME', 'maryland': 'MD', 'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN',
+    'mississippi': 'MS', 'missouri': 'MO', 'montana': 'MT', 'nebraska': 'NE', 'nevada': 'NV',
+    'new hampshire': 'NH', 'new jersey': 'NJ', 'new mexico': 'NM', 'new york': 'NY',
+    'north carolina': 'NC', 'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK', 'oregon': 'OR',
+    'pennsylvania': 'PA', 'rhode island': 'RI', 'south carolina': 'SC', 'south dakota': 'SD',
+    'tennessee': 'TN', 'texas': 'TX', 'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA',
+    'washington': 'WA', 'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY',
+    'ontario': 'ON', 'quebec': 'QC', 'british columbia': 'BC', 'alberta': 'AB',
+    'england': 'ENG', 'scotland': 'SCT',
+}
+COUNTRY_NAMES = {
+    'usa': 'US', 'united states': 'US', 'united states of america': 'US', 'america': 'US',
+    'canada': 'CA', 'mexico': 'MX', 'uk': 'GB', 'united kingdom': 'GB', 'great britain': 'GB',
+    'ireland': 'IE', 'france': 'FR', 'germany': 'DE', 'netherlands': 'NL', 'spain': 'ES',
+    'italy': 'IT', 'portugal': 'PT', 'japan': 'JP', 'australia': 'AU',
+}
+# Countries whose places are displayed as "City, REGION" rather than "City, COUNTRY"
+REGION_DISPLAY_COUNTRIES = {'US', 'CA'}
+
+_PUNCTUATION = re.compile(r"[.'’]")
+_SEPARATORS = re.compile(r'\s*,\s*')
+_WHITESPACE = re.compile(r'\s+')
+_SLUG = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_place_text(text):
+    """Lower-case, drop accents and periods, collapse whitespace: ' St. Louis ,MO ' -> 'st louis, mo'"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    text = _PUNCTUATION.sub('', text.lower())
+    text = _SEPARATORS.sub(', ', _WHITESPACE.sub(' ', text.strip()))
+    return text.strip(' ,;')
+
+
+class Gazetteer:
+    """
+    In-memory lookup over the bundled gazetteer: every normalized name and
+    alias maps to its places, most populous first
+    """
+
+    def __init__(self, path):
+        self.places = []
+        self._by_name = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                place = {
+                    'key': row['key'],
+                    'name': row['name'],
+                    'region': row['region'],
+                    'country': row['country'],
+                    'lat': float(row['lat']),
+                    'lon': float(row['lon']),
+                    'population': int(row['population'] or 0),
+                }
+                place['display'] = self._display(place)
+                self.places.append(place)
+                names = [row['name']] + [alias for alias in row['aliases'].split('|') if alias]
+                for name in names:
+                    self._by_name.setdefault(normalize_place_text(name), []).append(place)
+        for candidates in self._by_name.values():
+            candidates.sort(key=lambda place: place['population'], reverse=True)
+
+    @staticmethod
+    def _display(place):
+        qualifier = place['region'] if place['country'] in REGION_DISPLAY_COUNTRIES else place['country']
+        return f"{place['name']}, {qualifier}" if qualifier else place['name']
+
+    @staticmethod
+    def _matches(place, qualifier):
+        code = REGION_NAMES.get(qualifier) or COUNTRY_NAMES.get(qualifier) or qualifier.upper()
+        return code in (place['region'], place['country'])
+
+    def _lookup(self, name, qualifiers):
+        candidates = self._by_name.get(name)
+        if not candidates:
+            return None
+        for qualifier in qualifiers:
+            candidates = [place for place in candidates if self._matches(place, qualifier)]
+        return candidates[0] if candidates else None
+
+    def lookup(self, text):
+        """Best place for normalized text, or None. 'portland' is the most populous Portland."""
+        parts = text.split(', ')
+        place = self._lookup(parts[0], parts[1:])
+        if place is not None or len(parts) > 1:
+            return place
+        # No comma: peel trailing words off as a qualifier ("austin tx", "portland maine")
+        words = parts[0].split(' ')
+        for split in range(len(words) - 1, 0, -1):
+            place = self._lookup(' '.join(words[:split]), [' '.join(words[split:])])
+            if place is not None:
+                return place
+        return None
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer(GAZETTEER_PATH)
+    return _gazetteer
+
+
+@lru_cache(maxsize=8192)
+def _resolve_normalized(text):
+    place = get_gazetteer().lookup(text)
+    if place is None:
+        return None
+    return tuple(sorted(place.items()))
+
+
+def resolve_location(location):
+    """
+    Canonical place for free-text location: key, name, region, country,
+    display, lat and lon. Unknown places keep the text as their display name,
+    a slug of it as their key, and no coordinates.
+    """
+    text = normalize_place_text(location)
+    resolved = _resolve_normalized(text)
+    if resolved is not None:
+        return dict(resolved, resolved=True)
+    return {
+        'key': _SLUG.sub('-', text).strip('-'),
+        'name': location.strip(),
+        'region': '',
+        'country': '',
+        'display': location.strip(),
+        'lat': None,
+        'lon': None,
+        'population': 0,
+        'resolved': False,
+    }
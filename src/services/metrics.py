@@ -0,0 +1,220 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency bucket upper bounds in seconds (Prometheus convention)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_METRIC = 'activity_search_stage_seconds'
+PROVIDER_REQUESTS_METRIC = 'activity_provider_requests_total'
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; an observation is one bisect and two increments
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q):
+        """Approximate quantile: upper bound of the bucket holding the q-th observation"""
+        counts, _, total = self.snapshot()
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+_help = {
+    STAGE_METRIC: 'Time spent in each stage of an activity search',
+    PROVIDER_REQUESTS_METRIC: 'Provider calls by outcome (success, error, timeout)',
+}
+_histograms = {}
+_counters = {}
+_gauges = {}
+_counter_callbacks = {}
+_registry_lock = threading.Lock()
+
+
+def _labels_key(labels):
+    # Empty label values are equivalent to absent labels in Prometheus
+    return tuple(sorted((key, value) for key, value in labels.items() if value != ''))
+
+
+def get_histogram(name, **labels):
+    key = (name, _labels_key(labels))
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _registry_lock:
+            histogram = _histograms.setdefault(key, Histogram())
+    return histogram
+
+
+def get_counter(name, **labels):
+    key = (name, _labels_key(labels))
+    counter = _counters.get(key)
+    if counter is None:
+        with _registry_lock:
+            counter = _counters.setdefault(key, Counter())
+    return counter
+
+
+def describe(name, help_text):
+    _help[name] = help_text
+
+
+def register_gauge(name, help_text, callback):
+    """
+    Register a gauge evaluated at scrape time. The callback returns a plain number,
+    or a dict mapping label tuples such as (('provider', 'eventbrite'),) to values
+    """
+    _help[name] = help_text
+    _gauges[name] = callback
+
+
+def register_counter(name, help_text, callback):
+    """
+    Like register_gauge, for a running total kept elsewhere (e.g. a cache's hit
+    count); exported with TYPE counter so rate() works on it
+    """
+    _help[name] = help_text
+    _counter_callbacks[name] = callback
+
+
+def observe_stage(stage, seconds, provider=''):
+    get_histogram(STAGE_METRIC, stage=stage, provider=provider).observe(seconds)
+
+
+def count_provider_call(provider, outcome):
+    get_counter(PROVIDER_REQUESTS_METRIC, provider=provider, outcome=outcome).inc()
+
+
+@contextmanager
+def timed(stage, provider=''):
+    """Time a block of the search hot path into the per-stage histogram"""
+    histogram = get_histogram(STAGE_METRIC, stage=stage, provider=provider)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started)
+
+
+def stage_summary():
+    """Per-stage count/mean/p50/p95/p99 in milliseconds, used by the benchmarks"""
+    summary = {}
+    for (name, labels), histogram in list(_histograms.items()):
+        if name != STAGE_METRIC:
+            continue
+        _, total, count = histogram.snapshot()
+        if not count:
+            continue
+        label_map = dict(labels)
+        key = label_map['stage'] + (f"[{label_map['provider']}]" if 'provider' in label_map else '')
+        summary[key] = {
+            'count': count,
+            'mean_ms': total / count * 1000,
+            'p50_ms': histogram.quantile(0.50) * 1000,
+            'p95_ms': histogram.quantile(0.95) * 1000,
+            'p99_ms': histogram.quantile(0.99) * 1000,
+        }
+    return summary
+
+
+def reset():
+    with _registry_lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """Render every metric in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    histograms = sorted(_histograms.items())
+    counters = sorted(_counters.items())
+
+    for name in sorted({name for (name, _) in _histograms}):
+        lines.append(f'# HELP {name} {_help.get(name, name)}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric_name, labels), histogram in histograms:
+            if metric_name != name:
+                continue
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (('le', _format_value(bound)),)
+                lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {repr(total)}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+
+    for name in sorted({name for (name, _) in _counters}):
+        lines.append(f'# HELP {name} {_help.get(name, name)}')
+        lines.append(f'# TYPE {name} counter')
+        for (metric_name, labels), counter in counters:
+            if metric_name == name:
+                lines.append(f'{name}{_format_labels(labels)} {counter.value}')
+
+    callbacks = [(name, 'gauge', callback) for name, callback in _gauges.items()]
+    callbacks += [(name, 'counter', callback) for name, callback in _counter_callbacks.items()]
+    for name, kind, callback in sorted(callbacks, key=lambda entry: entry[0]):
+        try:
+            values = callback()
+        except Exception as e:
+            print(f"Metrics {kind} {name} error: {e}")
+            continue
+        lines.append(f'# HELP {name} {_help.get(name, name)}')
+        lines.append(f'# TYPE {name} {kind}')
+        if isinstance(values, dict):
+            for labels, value in sorted(values.items()):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        else:
+            lines.append(f'{name} {_format_value(values)}')
+
+    return '\n'.join(lines) + '\n'
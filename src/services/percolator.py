@@ -0,0 +1,345 @@
+"""
+Saved-search matching. Instead of re-running every subscription against the
+providers, subscriptions themselves are indexed by (location cell, term) and
+(location cell, category); each newly seen event looks up only the postings
+for its own cell and words, and verifies that short candidate list.
+"""
+import math
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from src.services.classifier import classify_query, classify_text
+from src.services.metrics import register_counter, register_gauge, timed
+
+PERCOLATOR_ENABLED = os.getenv('PERCOLATOR_ENABLED', '1') == '1'
+# Grid cell size in degrees; subscriptions are filed under every cell their radius touches
+PERCOLATOR_CELL_DEGREES = float(os.getenv('PERCOLATOR_CELL_DEGREES', '0.5'))
+# How often a worker picks up subscriptions created or cancelled by other workers
+PERCOLATOR_REFRESH_SECONDS = float(os.getenv('PERCOLATOR_REFRESH_SECONDS', '30'))
+# Events already percolated by this worker are skipped; bounded LRU of their ids
+PERCOLATOR_SEEN_SIZE = int(os.getenv('PERCOLATOR_SEEN_SIZE', '200000'))
+PERCOLATOR_MAX_PENDING = int(os.getenv('PERCOLATOR_MAX_PENDING', '1000'))
+
+MAX_RADIUS_KM = 100.0
+_TOKEN = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'at', 'by', 'event', 'events', 'for', 'in', 'near', 'of', 'on', 'or', 'the', 'to', 'with',
+])
+
+
+def terms(text):
+    """Distinct lower-case words of text, stopwords and single characters dropped"""
+    return frozenset(word for word in _TOKEN.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+class PercolatorIndex:
+    """
+    Reverse index from (cell, kind, value) postings to subscription ids.
+    Subscriptions with explicit categories are filed under those categories;
+    otherwise under their longest query term (usually the rarest) and under
+    any category their query names, so "live music" also matches every music
+    event. Candidates found through the postings are verified in full.
+    """
+
+    def __init__(self, cell_degrees=PERCOLATOR_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._postings = {}
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def cells(self, subscription):
+        if subscription['lat'] is None or subscription['lon'] is None:
+            return [('key', subscription['location_key'])]
+        radius = min(subscription['radius_km'], MAX_RADIUS_KM)
+        lat_span = radius / 111.0
+        lon_span = radius / max(111.0 * math.cos(math.radians(subscription['lat'])), 1.0)
+        low = self._cell(subscription['lat'] - lat_span, subscription['lon'] - lon_span)
+        high = self._cell(subscription['lat'] + lat_span, subscription['lon'] + lon_span)
+        return [(row, column) for row in range(low[0], high[0] + 1) for column in range(low[1], high[1] + 1)]
+
+    @staticmethod
+    def compile(subscription):
+        """Matching form of a subscription dict (Subscription.to_dict() fields)"""
+        query_terms = terms(subscription['query'])
+        categories = frozenset(subscription['categories'])
+        if categories:
+            related = frozenset()
+            keys = [('category', name) for name in categories]
+        else:
+            # A query naming a category ("music", "food festival") subscribes to that whole category
+            related = frozenset(name for name in classify_query(subscription['query']) if name in query_terms)
+            keys = [('category', name) for name in related]
+            if query_terms:
+                keys.append(('term', max(query_terms, key=lambda term: (len(term), term))))
+        return dict(subscription, terms=query_terms, category_set=categories, related=related, keys=keys)
+
+    def add(self, subscription):
+        compiled = self.compile(subscription)
+        with self._lock:
+            self._remove(compiled['id'])
+            compiled['postings'] = [(cell,) + key for cell in self.cells(compiled) for key in compiled['keys']]
+            for posting in compiled['postings']:
+                self._postings.setdefault(posting, set()).add(compiled['id'])
+            self._subscriptions[compiled['id']] = compiled
+
+    def remove(self, subscription_id):
+        with self._lock:
+            self._remove(subscription_id)
+
+    def _remove(self, subscription_id):
+        compiled = self._subscriptions.pop(subscription_id, None)
+        if compiled is None:
+            return
+        for posting in compiled['postings']:
+            ids = self._postings.get(posting)
+            if ids is not None:
+                ids.discard(subscription_id)
+                if not ids:
+                    del self._postings[posting]
+
+    def match(self, activity, place=None, candidates=None):
+        """
+        Ids of subscriptions the activity satisfies. candidates replaces the
+        postings lookup with explicit ids to verify (all of them for a full scan).
+        """
+        lat = activity.get('lat')
+        lon = activity.get('lon')
+        if (lat is None or lon is None) and place:
+            lat, lon = place.get('lat'), place.get('lon')
+        event_cells = []
+        if lat is not None and lon is not None:
+            event_cells.append(self._cell(lat, lon))
+        if place and place.get('key'):
+            event_cells.append(('key', place['key']))
+        if not event_cells:
+            return []
+
+        words = terms(f"{activity.get('title', '')} {activity.get('category', '')} {activity.get('description', '')}")
+        event_categories = frozenset(classify_text(f"{activity.get('category', '')} {activity.get('title', '')}"))
+        keys = [('term', word) for word in words] + [('category', name) for name in event_categories]
+
+        if candidates is None:
+            candidates = set()
+            postings = self._postings
+            for cell in event_cells:
+                for kind, value in keys:
+                    ids = postings.get((cell, kind, value))
+                    if ids:
+                        candidates.update(ids)
+
+        matched = []
+        for subscription_id in candidates:
+            subscription = self._subscriptions.get(subscription_id)
+            if subscription is None:
+                continue
+            if subscription['category_set'] and not subscription['category_set'] & event_categories:
+                continue
+            if not subscription['terms'] <= words and not subscription['related'] & event_categories:
+                continue
+            if subscription['lat'] is not None and subscription['lon'] is not None:
+                if lat is None or lon is None:
+                    continue
+                if haversine_km(subscription['lat'], subscription['lon'], lat, lon) > subscription['radius_km']:
+                    continue
+            elif not place or place.get('key') != subscription['location_key']:
+                continue
+            matched.append(subscription_id)
+        return matched
+
+
+class Percolator:
+    """
+    This worker's index plus a background thread that matches queued batches
+    of search results and writes the matches, one transaction per batch
+    """
+
+    def __init__(self, app, max_pending=PERCOLATOR_MAX_PENDING, seen_size=PERCOLATOR_SEEN_SIZE):
+        self.app = app
+        self.pid = os.getpid()
+        self.index = PercolatorIndex()
+        self.seen_size = seen_size
+        self._seen = OrderedDict()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._loaded_until = None
+        self._refreshed_at = 0.0
+        self.matched = 0
+        self.errors = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name='percolator', daemon=True)
+        self._thread.start()
+
+    def submit(self, activities, place):
+        try:
+            self._queue.put_nowait((activities, place))
+        except queue.Full:
+            self.dropped += 1
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def refresh(self):
+        """Apply subscriptions created or cancelled since the last refresh (all of them the first time)"""
+        from src.models.subscription import Subscription
+        from src.models.user import db
+
+        with self.app.app_context():
+            try:
+                statement = db.select(Subscription).order_by(Subscription.updated_at)
+                if self._loaded_until is not None:
+                    # Overlap a little so rows committed out of timestamp order aren't missed
+                    statement = statement.where(Subscription.updated_at >= self._loaded_until - timedelta(seconds=5))
+                else:
+                    statement = statement.where(Subscription.active.is_(True))
+                for subscription in db.session.scalars(statement):
+                    if subscription.active:
+                        self.index.add(subscription.to_dict())
+                    else:
+                        self.index.remove(subscription.id)
+                    self._loaded_until = subscription.updated_at
+                if self._loaded_until is None:
+                    self._loaded_until = datetime.utcnow()
+            except Exception as e:
+                print(f"Percolator refresh error: {e}")
+            finally:
+                db.session.remove()
+        self._refreshed_at = time.monotonic()
+
+    def _run(self):
+        self.refresh()
+        while True:
+            # One bad batch or subscription must not stop matching for this worker
+            try:
+                try:
+                    activities, place = self._queue.get(timeout=PERCOLATOR_REFRESH_SECONDS)
+                except queue.Empty:
+                    self.refresh()
+                    continue
+                if time.monotonic() - self._refreshed_at > PERCOLATOR_REFRESH_SECONDS:
+                    self.refresh()
+                self.process(activities, place)
+            except Exception as e:
+                self.errors += 1
+                print(f"Percolator error: {e}")
+
+    def _unseen(self, activities):
+        fresh = []
+        for activity in activities:
+            activity_id = activity.get('id')
+            if not activity_id or activity_id in self._seen:
+                continue
+            self._seen[activity_id] = True
+            fresh.append(activity)
+        while len(self._seen) > self.seen_size:
+            self._seen.popitem(last=False)
+        return fresh
+
+    def process(self, activities, place):
+        """Match events this worker has not percolated before and record the matches"""
+        with timed('percolate'):
+            matches = [
+                (subscription_id, activity)
+                for activity in self._unseen(activities)
+                for subscription_id in self.index.match(activity, place)
+            ]
+        if matches:
+            self._write(matches)
+
+    def _write(self, matches):
+        from src.models.subscription import Subscription, SubscriptionMatch
+        from src.models.user import db
+
+        with self.app.app_context():
+            try:
+                # Subscriptions cancelled or deleted since the last refresh drop out here
+                wanted = {subscription_id for subscription_id, _ in matches}
+                live = set(db.session.scalars(
+                    db.select(Subscription.id).where(Subscription.id.in_(wanted), Subscription.active.is_(True))
+                ))
+                for subscription_id in wanted - live:
+                    self.index.remove(subscription_id)
+                rows = [
+                    {
+                        'subscription_id': subscription_id,
+                        'activity_id': str(activity['id'])[:200],
+                        'title': (activity.get('title') or '')[:500],
+                        'date': (activity.get('date') or '')[:20],
+                        'link': (activity.get('link') or '')[:500],
+                        'source': (activity.get('source') or '')[:40],
+                        'created_at': datetime.utcnow(),
+                    }
+                    for subscription_id, activity in matches if subscription_id in live
+                ]
+                if rows:
+                    db.session.execute(insert_ignoring_duplicates(SubscriptionMatch.__table__, db.engine.dialect.name), rows)
+                    db.session.commit()
+                    self.matched += len(rows)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Percolator write error: {e}")
+            finally:
+                db.session.remove()
+
+
+def insert_ignoring_duplicates(table, dialect_name):
+    """INSERT that skips rows colliding with a unique constraint (another worker saw the event too)"""
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing()
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing()
+    from sqlalchemy import insert
+    if dialect_name in ('mysql', 'mariadb'):
+        return insert(table).prefix_with('IGNORE')
+    return insert(table)
+
+
+_percolator = None
+_percolator_lock = threading.Lock()
+
+
+def get_percolator(app):
+    """The percolator for this process, started on first use (and again in a forked child)"""
+    global _percolator
+    if _percolator is None or _percolator.pid != os.getpid():
+        with _percolator_lock:
+            if _percolator is None or _percolator.pid != os.getpid():
+                _percolator = Percolator(app)
+    return _percolator
+
+
+def percolate(app, activities, place=None):
+    """Queue normalized search results for subscription matching; never blocks the request"""
+    if PERCOLATOR_ENABLED and activities:
+        get_percolator(app).submit(activities, place)
+
+
+def _percolator_gauge(read):
+    def collect():
+        return read(_percolator) if _percolator is not None else 0
+    return collect
+
+
+register_gauge('percolator_subscriptions', 'Subscriptions in this worker\'s percolator index',
+               _percolator_gauge(lambda p: len(p.index)))
+register_gauge('percolator_pending', 'Search result batches waiting to be percolated', _percolator_gauge(lambda p: p.pending()))
+register_counter('percolator_matches_total', 'Subscription matches recorded since startup',
+                 _percolator_gauge(lambda p: p.matched))
+register_counter('percolator_errors_total', 'Search result batches that failed to percolate',
+                 _percolator_gauge(lambda p: p.errors))
@@ -0,0 +1,132 @@
+import hmac
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import g, request
+
+# Fraction of requests to profile, e.g. 0.01 for one in a hundred (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+
+# Requests carrying this value in the X-Profile-Token header are always profiled
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+PROFILE_HEADER = 'X-Profile-Token'
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'activity-finder-profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '2'))
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread at a fixed interval from a background
+    thread and aggregates the stacks in folded (flamegraph.pl / speedscope) format
+    """
+
+    def __init__(self, thread_id, interval_ms=PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000.0
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(frames))] += 1
+            self.samples += 1
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def _should_profile():
+    if PROFILE_TOKEN:
+        token = request.headers.get(PROFILE_HEADER)
+        if token and hmac.compare_digest(token, PROFILE_TOKEN):
+            return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _start_profile():
+    if _should_profile():
+        g.profile_sampler = StackSampler(threading.get_ident()).start()
+
+
+def _finish_profile(response):
+    sampler = g.pop('profile_sampler', None)
+    if sampler is None:
+        return response
+    sampler.stop()
+    try:
+        path = write_profile(sampler, request.endpoint or 'unknown')
+        response.headers['X-Profile-Id'] = os.path.basename(path)
+    except OSError as e:
+        print(f"Profile write error: {e}")
+    return response
+
+
+def _abandon_profile(exc):
+    # after_request is skipped for unhandled errors; never leave a sampler running
+    sampler = g.pop('profile_sampler', None)
+    if sampler is not None:
+        sampler.stop()
+
+
+def write_profile(sampler, label):
+    """
+    Write a folded-stack profile into PROFILE_DIR, keeping only the newest
+    PROFILE_MAX_FILES profiles
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{int(time.time() * 1000)}-{label.replace('.', '_')}-{int(sampler.duration * 1000)}ms-{uuid.uuid4().hex[:8]}.folded"
+    path = os.path.join(PROFILE_DIR, name)
+    with open(path, 'w') as f:
+        f.write(sampler.folded())
+
+    # File names start with a millisecond timestamp, so name order is age order
+    profiles = sorted(entry for entry in os.listdir(PROFILE_DIR) if entry.endswith('.folded'))
+    for stale in profiles[:max(0, len(profiles) - PROFILE_MAX_FILES)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, stale))
+        except OSError:
+            pass
+    return path
+
+
+def install_profiler(blueprint):
+    """
+    Register the sampling hooks on a blueprint. Nothing is registered unless a sample
+    rate or trusted token is configured, so unprofiled deployments pay nothing.
+    """
+    if PROFILE_SAMPLE_RATE <= 0 and not PROFILE_TOKEN:
+        return False
+    blueprint.before_request(_start_profile)
+    blueprint.after_request(_finish_profile)
+    blueprint.teardown_request(_abandon_profile)
+    return True
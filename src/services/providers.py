@@ -0,0 +1,232 @@
+import os
+import threading
+import time
+from src.services.metrics import count_provider_call, observe_stage, register_gauge, timed
+
+# How many activities a search aims to collect before it stops calling providers
+SEARCH_TARGET_RESULTS = int(os.getenv('SEARCH_TARGET_RESULTS', '20'))
+
+# Soft latency budget for one search; providers that would overrun it are left out of the plan
+SEARCH_LATENCY_BUDGET_MS = float(os.getenv('SEARCH_LATENCY_BUDGET_MS', '3000'))
+
+# A provider left out for its latency is still called once per interval, so its stats can recover
+PROVIDER_PROBE_INTERVAL_SECONDS = float(os.getenv('PROVIDER_PROBE_INTERVAL_SECONDS', '60'))
+
+# Weight of the newest sample in the moving averages kept per provider
+STATS_SMOOTHING = 0.2
+
+
+class ProviderError(Exception):
+    """Raised by a provider search function when the upstream API call fails"""
+
+
+class ProviderTimeout(ProviderError):
+    """Raised by a provider search function when the upstream API call times out"""
+
+
+class ProviderStats:
+    """
+    Live latency and yield statistics for one provider (exponential moving averages)
+    """
+
+    def __init__(self, latency_ms, expected_yield):
+        self.latency_ms = float(latency_ms)
+        self.expected_yield = float(expected_yield)
+        self.calls = 0
+        self.errors = 0
+        self.last_called = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms, result_count=None):
+        with self._lock:
+            self.calls += 1
+            self.last_called = time.monotonic()
+            self.latency_ms += STATS_SMOOTHING * (latency_ms - self.latency_ms)
+            if result_count is None:
+                self.errors += 1
+                self.expected_yield -= STATS_SMOOTHING * self.expected_yield
+            else:
+                self.expected_yield += STATS_SMOOTHING * (result_count - self.expected_yield)
+
+    def claim_probe(self, interval=None):
+        """True for the one caller that gets to probe a provider idle for longer than interval"""
+        interval = PROVIDER_PROBE_INTERVAL_SECONDS if interval is None else interval
+        with self._lock:
+            now = time.monotonic()
+            if now - self.last_called < interval:
+                return False
+            # Concurrent searches see it as just called and leave the probe to this one
+            self.last_called = now
+            return True
+
+    def to_dict(self):
+        return {
+            'latency_ms': round(self.latency_ms, 1),
+            'expected_yield': round(self.expected_yield, 2),
+            'calls': self.calls,
+            'errors': self.errors
+        }
+
+
+class Provider:
+    """
+    An activity source: a search function returning raw provider events and a
+    parser turning them into our standard activity format
+    """
+
+    def __init__(self, name, search, parser, api_key_env=None, endpoint=None, capabilities=(),
+                 cost=0.0, latency_hint_ms=1000, yield_hint=10, stub=False):
+        self.name = name
+        self.search = search
+        self.parser = parser
+        self.api_key_env = api_key_env
+        self.endpoint = endpoint
+        self.capabilities = frozenset(capabilities)
+        self.cost = cost
+        self.stub = stub
+        self.stats = ProviderStats(latency_hint_ms, yield_hint)
+
+    def is_enabled(self):
+        """Stubs never run; keyed providers only run when their API key is configured"""
+        if self.stub:
+            return False
+        if self.api_key_env and not os.getenv(self.api_key_env):
+            return False
+        allowed = _allowed_providers()
+        return allowed is None or self.name in allowed
+
+    def score(self):
+        """Expected results per second of latency, discounted by per-call cost"""
+        stats = self.stats
+        return stats.expected_yield / (max(stats.latency_ms, 1.0) / 1000.0) / (1.0 + self.cost)
+
+    def __repr__(self):
+        return f'<Provider {self.name}>'
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _allowed_providers():
+    """Optional per-deployment allow-list, e.g. ACTIVITY_PROVIDERS=ticketmaster,eventbrite"""
+    value = os.getenv('ACTIVITY_PROVIDERS', '').strip()
+    if not value:
+        return None
+    return {name.strip().lower() for name in value.split(',') if name.strip()}
+
+
+def register_provider(provider):
+    """Add a provider to the registry, replacing any provider with the same name"""
+    with _registry_lock:
+        _registry[provider.name] = provider
+    return provider
+
+
+def unregister_provider(name):
+    with _registry_lock:
+        return _registry.pop(name, None)
+
+
+def get_provider(name):
+    return _registry.get(name)
+
+
+def get_providers():
+    return list(_registry.values())
+
+
+def get_enabled_providers():
+    return [provider for provider in get_providers() if provider.is_enabled()]
+
+
+def plan_providers(budget_ms=None):
+    """
+    Order the enabled providers by their live results-per-second score, dropping
+    those whose expected latency no longer fits in the search budget; when none
+    fits the plan is empty. A dropped provider that has been idle for
+    PROVIDER_PROBE_INTERVAL_SECONDS is kept as a probe so a single slow call
+    doesn't exclude it for good; probes are the only calls a dropped provider gets.
+    """
+    budget_ms = SEARCH_LATENCY_BUDGET_MS if budget_ms is None else budget_ms
+
+    plan = []
+    spent_ms = 0.0
+    for provider in sorted(get_enabled_providers(), key=lambda p: p.score(), reverse=True):
+        if spent_ms + provider.stats.latency_ms > budget_ms:
+            if provider.stats.claim_probe():
+                plan.append(provider)
+            continue
+        plan.append(provider)
+        spent_ms += provider.stats.latency_ms
+    return plan
+
+
+def run_provider(provider, query, location, **options):
+    """
+    Call one provider and record its latency and yield; errors yield no results
+    """
+    started = time.perf_counter()
+    try:
+        raw_events = provider.search(query, location, **options)
+        with timed('parse', provider.name):
+            activities = provider.parser(raw_events) if raw_events else []
+    except Exception as e:
+        latency_ms = (time.perf_counter() - started) * 1000
+        provider.stats.record(latency_ms)
+        count_provider_call(provider.name, 'timeout' if isinstance(e, ProviderTimeout) else 'error')
+        print(f"{provider.name} provider error: {e}")
+        return [], {'provider': provider.name, 'latency_ms': round(latency_ms, 1), 'count': 0, 'status': 'error'}
+
+    elapsed = time.perf_counter() - started
+    latency_ms = elapsed * 1000
+    provider.stats.record(latency_ms, len(activities))
+    count_provider_call(provider.name, 'success')
+    observe_stage('provider_total', elapsed, provider.name)
+    return activities, {'provider': provider.name, 'latency_ms': round(latency_ms, 1), 'count': len(activities), 'status': 'ok'}
+
+
+def search_providers(query, location, target=None, **options):
+    """
+    Run the planned providers in order until enough activities are collected.
+    Returns the activities and a per-provider report of what was called.
+    """
+    target = SEARCH_TARGET_RESULTS if target is None else target
+    activities = []
+    report = []
+    for provider in plan_providers():
+        if len(activities) >= target:
+            break
+        results, entry = run_provider(provider, query, location, **options)
+        activities.extend(results)
+        report.append(entry)
+    return activities, report
+
+
+def search_providers_broad(location, limit, **options):
+    """
+    One keyword-less call per planned provider that supports it (the 'broad'
+    capability), returning up to limit events each. Used to answer many
+    searches for the same location from one shared pool of activities.
+    """
+    activities = []
+    report = []
+    for provider in plan_providers():
+        if 'broad' not in provider.capabilities:
+            continue
+        results, entry = run_provider(provider, '', location, limit=limit, **options)
+        activities.extend(results)
+        report.append(entry)
+    return activities, report
+
+
+def _provider_stat_gauge(field):
+    def collect():
+        return {(('provider', p.name),): getattr(p.stats, field) for p in get_providers()}
+    return collect
+
+
+register_gauge('activity_provider_latency_ewma_ms', 'Moving average latency used for provider planning',
+               _provider_stat_gauge('latency_ms'))
+register_gauge('activity_provider_expected_yield', 'Moving average results per call used for provider planning',
+               _provider_stat_gauge('expected_yield'))
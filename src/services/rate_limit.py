@@ -0,0 +1,262 @@
+"""
+Per-client rate limiting shared by every worker on the host.
+
+Clients are identified by API key (X-API-Key) or IP address and limited to
+their tier's request budget per window, using a sliding-window estimate: the
+previous fixed window's count, weighted by how much of it still overlaps the
+sliding window, plus the current window's count. Counters live in a small
+memory-mapped table file; an update locks only the few slots its key can
+occupy (an fcntl byte-range lock), so a check costs a hash, two system calls
+and a few struct reads.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from flask import g, jsonify, request
+from src.services.metrics import describe, get_counter
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH', os.path.join(tempfile.gettempdir(), 'activity-finder-ratelimit.bin'))
+# Counter slots in the shared table; more than the clients active within two windows
+RATE_LIMIT_SLOTS = int(os.getenv('RATE_LIMIT_SLOTS', '65536'))
+# Tiers as name:requests/window seconds; unknown clients get 'anonymous'
+RATE_LIMIT_TIERS = os.getenv('RATE_LIMIT_TIERS', 'anonymous:300/60,standard:1200/60,partner:12000/60')
+# API keys and their tiers as key:tier
+RATE_LIMIT_API_KEYS = os.getenv('RATE_LIMIT_API_KEYS', '')
+# Reverse proxies in front of the app; the client address is that many entries from the end of X-Forwarded-For
+RATE_LIMIT_PROXY_HOPS = int(os.getenv('RATE_LIMIT_PROXY_HOPS', '0'))
+
+API_KEY_HEADER = 'X-API-Key'
+MAGIC = b'AFRATE1\n'
+HEADER = struct.Struct('<8sI')
+HEADER_SIZE = 64
+# key hash, window number, count in that window, count in the window before
+SLOT = struct.Struct('<QqII')
+PROBES = 8
+
+RATE_LIMITED_METRIC = 'rate_limited_requests_total'
+describe(RATE_LIMITED_METRIC, 'Requests refused with 429 by tier')
+
+
+def parse_tiers(value):
+    """'anonymous:300/60,partner:12000/60' -> {'anonymous': (300, 60.0), ...}"""
+    tiers = {}
+    for entry in value.split(','):
+        if not entry.strip():
+            continue
+        name, budget = entry.strip().split(':', 1)
+        requests, window = budget.split('/', 1)
+        tiers[name.strip()] = (int(requests), float(window))
+    tiers.setdefault('anonymous', (300, 60.0))
+    return tiers
+
+
+def parse_api_keys(value):
+    return dict(entry.strip().split(':', 1) for entry in value.split(',') if ':' in entry)
+
+
+TIERS = parse_tiers(RATE_LIMIT_TIERS)
+API_KEY_TIERS = {key: tier for key, tier in parse_api_keys(RATE_LIMIT_API_KEYS).items() if tier in TIERS}
+
+
+def key_hash(key):
+    # Never 0, which marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') | 1
+
+
+class SlidingWindowStore:
+    """
+    Fixed-size table of (key, window, count, previous count) slots in a shared
+    file. A key lives in one of PROBES consecutive slots from its hash; slots
+    whose counts are more than a window old are reused, and when all of them
+    are live the one least recently counted is.
+    """
+
+    def __init__(self, path=RATE_LIMIT_PATH, slots=RATE_LIMIT_SLOTS):
+        import fcntl
+
+        self._fcntl = fcntl
+        self.path = path
+        self.slots = slots
+        self.pid = os.getpid()
+        # fcntl locks belong to the process, so they don't exclude this process's other threads
+        self._lock = threading.Lock()
+        size = HEADER_SIZE + (slots + PROBES) * SLOT.size
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX, HEADER_SIZE, 0)
+                if os.fstat(fd).st_ino != os.stat(path).st_ino:
+                    # Replaced by another process while we waited for the lock
+                    os.close(fd)
+                    continue
+                header = os.pread(fd, HEADER.size, 0)
+                if os.fstat(fd).st_size == size and header == HEADER.pack(MAGIC, slots):
+                    fcntl.lockf(fd, fcntl.LOCK_UN, HEADER_SIZE, 0)
+                    self._map = mmap.mmap(fd, size)
+                    break
+                # New file or another table size: swap in an empty table. Resizing
+                # this one in place would fault other processes that have it mapped.
+                self._create(size)
+                os.close(fd)
+            except Exception:
+                os.close(fd)
+                raise
+        self._fd = fd
+
+    def _create(self, size):
+        """Atomically replace the table file with an empty one of size bytes"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), prefix='.ratelimit-')
+        try:
+            os.ftruncate(fd, size)
+            os.pwrite(fd, HEADER.pack(MAGIC, self.slots), 0)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        finally:
+            os.close(fd)
+
+    def hit(self, key, limit, window, cost=1, now=None):
+        """
+        Count a request of cost against key's budget unless it would go over.
+        Returns (allowed, remaining, reset seconds): reset is when the current
+        window ends, or for a refused request when enough budget frees up.
+        """
+        now = time.time() if now is None else now
+        number = int(now // window)
+        elapsed = now / window - number
+        target = key_hash(key)
+        first = target % self.slots
+        offset = HEADER_SIZE + first * SLOT.size
+        length = PROBES * SLOT.size
+        with self._lock:
+            self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX, length, offset)
+            try:
+                slot_window, count, previous, position = self._find(target, offset, length, number)
+                used = previous * (1 - elapsed) + count
+                allowed = used + cost <= limit
+                if allowed:
+                    count += cost
+                    used += cost
+                SLOT.pack_into(self._map, position, target, slot_window, count, previous)
+            finally:
+                self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, length, offset)
+
+        if allowed:
+            return True, max(0, int(limit - used)), math.ceil((1 - elapsed) * window)
+        return False, 0, retry_after(previous, count, elapsed, limit, window, cost)
+
+    def _find(self, target, offset, length, number):
+        """(window, count, previous count, slot position) for a key as of window number; the caller holds the lock"""
+        free = oldest = None
+        for position in range(offset, offset + length, SLOT.size):
+            slot_key, slot_window, count, previous = SLOT.unpack_from(self._map, position)
+            if slot_key == target:
+                if slot_window == number:
+                    return slot_window, count, previous, position
+                if slot_window == number - 1:
+                    return number, 0, count, position
+                return number, 0, 0, position
+            if free is None and (slot_key == 0 or slot_window < number - 1):
+                free = position
+            if oldest is None or slot_window < oldest_window:
+                oldest, oldest_window = position, slot_window
+        return number, 0, 0, free if free is not None else oldest
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+def retry_after(previous, count, elapsed, limit, window, cost):
+    """Seconds until the sliding estimate leaves room for cost again"""
+    room = limit - cost
+    if room < 0:
+        return math.ceil(window)
+    if count <= room and previous:
+        # Within this window, once enough of the previous window has slid out
+        wait = (1 - (room - count) / previous - elapsed) * window
+    else:
+        # After this window ends, once enough of it has slid out
+        wait = (1 - elapsed + (1 - room / count if count else 0)) * window
+    return max(1, math.ceil(wait))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """This process's mapping of the shared table"""
+    global _store
+    if _store is None or _store.pid != os.getpid():
+        with _store_lock:
+            if _store is None or _store.pid != os.getpid():
+                _store = SlidingWindowStore()
+    return _store
+
+
+def client_identity():
+    """(counter key, tier) for the current request"""
+    api_key = request.headers.get(API_KEY_HEADER)
+    if api_key and api_key in API_KEY_TIERS:
+        return f'key:{api_key}', API_KEY_TIERS[api_key]
+    address = request.remote_addr or ''
+    if RATE_LIMIT_PROXY_HOPS:
+        forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= RATE_LIMIT_PROXY_HOPS:
+            address = forwarded[-RATE_LIMIT_PROXY_HOPS]
+    return f'ip:{address}', 'anonymous'
+
+
+def install_rate_limit(blueprint, costs=None, buckets=None):
+    """
+    Limit every request to blueprint per client and tier; each blueprint has
+    its own budget. costs maps endpoints to how many requests they count as;
+    buckets maps endpoints to a budget of their own, so e.g. typeahead
+    requests can't use up a client's searches. Responses carry
+    RateLimit-Limit/-Remaining/-Reset and RateLimit-Policy; refused requests
+    get 429 with Retry-After. Store errors let requests through.
+    """
+    costs = costs or {}
+    buckets = buckets or {}
+
+    def check():
+        if not RATE_LIMIT_ENABLED or request.method == 'OPTIONS':
+            return None
+        key, tier = client_identity()
+        limit, window = TIERS[tier]
+        bucket = buckets.get(request.endpoint, blueprint.name)
+        try:
+            allowed, remaining, reset = get_store().hit(f'{bucket}|{key}', limit, window,
+                                                         costs.get(request.endpoint, 1))
+        except Exception as e:
+            print(f"Rate limit error: {e}")
+            return None
+        g.rate_limit = (limit, window, remaining, reset)
+        if allowed:
+            return None
+        get_counter(RATE_LIMITED_METRIC, tier=tier).inc()
+        response = jsonify({'error': 'Rate limit exceeded, please retry later'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(reset)
+        return response
+
+    def add_headers(response):
+        state = g.pop('rate_limit', None)
+        if state is not None:
+            limit, window, remaining, reset = state
+            response.headers['RateLimit-Limit'] = str(limit)
+            response.headers['RateLimit-Remaining'] = str(remaining)
+            response.headers['RateLimit-Reset'] = str(reset)
+            response.headers['RateLimit-Policy'] = f'{limit};w={window:g}'
+        return response
+
+    blueprint.before_request(check)
+    blueprint.after_request(add_headers)
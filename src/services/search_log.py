@@ -0,0 +1,208 @@
+import atexit
+import json
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from src.services.metrics import register_counter, register_gauge, timed
+
+SEARCH_LOG_ENABLED = os.getenv('SEARCH_LOG_ENABLED', '1') == '1'
+# A batch is written when it reaches this size or has waited this long
+SEARCH_LOG_BATCH_SIZE = int(os.getenv('SEARCH_LOG_BATCH_SIZE', '200'))
+SEARCH_LOG_FLUSH_SECONDS = float(os.getenv('SEARCH_LOG_FLUSH_SECONDS', '2'))
+# Entries beyond this are dropped (and counted) rather than blocking requests
+SEARCH_LOG_MAX_PENDING = int(os.getenv('SEARCH_LOG_MAX_PENDING', '10000'))
+
+_SEPARATORS = re.compile(r'\s*,\s*')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_location(location):
+    """'  Austin ,TX. ' -> 'austin, tx'"""
+    location = _WHITESPACE.sub(' ', location.strip().lower())
+    location = _SEPARATORS.sub(', ', location)
+    return location.strip(' ,.;')[:200]
+
+
+def normalize_filters(filters):
+    """Canonical JSON for a filter set so equal filter sets compare equal"""
+    if not isinstance(filters, dict):
+        return '{}'
+    canonical = {}
+    for key, value in filters.items():
+        if isinstance(value, list):
+            value = sorted({str(item).strip().lower() for item in value if str(item).strip()})
+        elif value is not None and not isinstance(value, (str, int, float, bool)):
+            continue
+        if value in (None, '', []):
+            continue
+        canonical[str(key)] = value
+    return json.dumps(canonical, sort_keys=True, separators=(',', ':'))[:500]
+
+
+class SearchLogWriter:
+    """
+    Buffers search log entries in memory and writes them in batches from a
+    background thread, one transaction per batch
+    """
+
+    def __init__(self, app, batch_size=SEARCH_LOG_BATCH_SIZE, flush_seconds=SEARCH_LOG_FLUSH_SECONDS,
+                 max_pending=SEARCH_LOG_MAX_PENDING):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.pid = os.getpid()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._write_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name='search-log-writer', daemon=True)
+        self._thread.start()
+
+    def record(self, entry):
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def flush(self):
+        """Write everything still queued; used at shutdown"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        from src.models.search_log import SearchLog, SearchProviderCall
+        from src.models.user import db
+        from sqlalchemy import insert
+
+        with self._write_lock, self.app.app_context(), timed('search_log_flush'):
+            try:
+                table = SearchLog.__table__
+                searches = [{key: value for key, value in entry.items() if key != 'providers'} for entry in batch]
+                if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+                    ids = db.session.scalars(
+                        insert(table).returning(table.c.id, sort_by_parameter_order=True), searches
+                    ).all()
+                else:
+                    # e.g. MySQL, which has no INSERT ... RETURNING: only searches with provider calls
+                    # need their id, so those are inserted one at a time and the rest in one statement
+                    ids = [
+                        db.session.execute(insert(table), search).inserted_primary_key[0] if entry['providers'] else None
+                        for search, entry in zip(searches, batch)
+                    ]
+                    plain = [search for search, entry in zip(searches, batch) if not entry['providers']]
+                    if plain:
+                        db.session.execute(insert(table), plain)
+                calls = [
+                    {
+                        'search_id': search_id,
+                        'provider': call['provider'],
+                        'status': call['status'],
+                        'latency_ms': call['latency_ms'],
+                        'result_count': call['count'],
+                    }
+                    for search_id, entry in zip(ids, batch)
+                    for call in entry['providers']
+                ]
+                if calls:
+                    db.session.execute(insert(SearchProviderCall.__table__), calls)
+                db.session.commit()
+                self.written += len(batch)
+            except Exception as e:
+                db.session.rollback()
+                self.failed += len(batch)
+                print(f"Search log flush error: {e}")
+            finally:
+                db.session.remove()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_search_log_writer(app):
+    """The writer for this process, started on first use (and again in a forked child)"""
+    global _writer
+    if _writer is None or _writer.pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid():
+                _writer = SearchLogWriter(app)
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def record_search(app, query, location, filters, providers, result_count, latency_ms, used_mock):
+    """Queue one search for the log; never touches the database on the calling thread"""
+    if not SEARCH_LOG_ENABLED:
+        return
+    get_search_log_writer(app).record({
+        'created_at': datetime.utcnow(),
+        'query_text': query.strip().lower()[:200],
+        'location': normalize_location(location),
+        'filters': normalize_filters(filters),
+        'result_count': result_count,
+        'latency_ms': round(latency_ms, 1),
+        'used_mock': used_mock,
+        'providers': providers,
+    })
+
+
+def top_searches(limit=50, since=None, min_searches=1):
+    """
+    Most frequent (query, location) pairs searched at least min_searches
+    times, optionally since a datetime; the input for cache pre-warming,
+    capacity planning and typeahead. Needs an app context.
+    """
+    from src.models.search_log import SearchLog
+    from src.models.user import db
+
+    count = db.func.count(SearchLog.id)
+    statement = db.select(SearchLog.query_text.label('query'), SearchLog.location, count.label('searches'))
+    if since is not None:
+        statement = statement.where(SearchLog.created_at >= since)
+    statement = statement.group_by(SearchLog.query_text, SearchLog.location)
+    if min_searches > 1:
+        statement = statement.having(count >= min_searches)
+    statement = statement.order_by(count.desc()).limit(limit)
+    return [dict(row._mapping) for row in db.session.execute(statement)]
+
+
+def _writer_gauge(read):
+    def collect():
+        return read(_writer) if _writer is not None else 0
+    return collect
+
+
+register_gauge('search_log_pending', 'Search log entries waiting to be written', _writer_gauge(lambda w: w.pending()))
+register_counter('search_log_written_total', 'Search log entries written since startup', _writer_gauge(lambda w: w.written))
+register_counter('search_log_dropped_total', 'Search log entries dropped because the buffer was full',
+                 _writer_gauge(lambda w: w.dropped))
@@ -0,0 +1,188 @@
+"""
+"Similar activities" over the corpus snapshot. Each event gets a hashed-feature
+vector of its title, category and description words (hashing rather than a
+TF-IDF vocabulary, so existing vectors never need recomputing as new events
+arrive). Vectors are stored as int8 in the snapshot (a quarter of float32's
+size, and far cheaper than float16 to widen for scoring) next to k-means
+centroids and each row's nearest centroid, so a lookup scores only the rows in
+the few clusters nearest the query (an inverted-file index) instead of the
+whole corpus.
+"""
+import math
+import os
+import re
+import threading
+import zlib
+from functools import lru_cache
+from src.services.percolator import STOPWORDS
+
+# Changing the dimension recomputes every vector at the next corpus export
+SIMILAR_DIMENSIONS = int(os.getenv('SIMILAR_DIMENSIONS', '128'))
+# Clusters scored per lookup; more finds closer neighbors at proportionally higher cost
+SIMILAR_PROBES = int(os.getenv('SIMILAR_PROBES', '8'))
+SIMILAR_MAX_CLUSTERS = 4096
+TRAIN_SAMPLE_SIZE = 20000
+TRAIN_ITERATIONS = 8
+ASSIGN_BLOCK_SIZE = 65536
+# Unit vectors are stored as round(component * VECTOR_SCALE)
+VECTOR_SCALE = 127
+
+FIELD_WEIGHTS = (('title', 2.0), ('category', 1.5), ('description', 1.0))
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+@lru_cache(maxsize=200000)
+def _bucket(token, dimensions):
+    """Column and sign of a token; the sign bit keeps colliding tokens from only ever adding up"""
+    value = zlib.crc32(token.encode('utf-8'))
+    return value % dimensions, 1.0 if value & 0x80000000 else -1.0
+
+
+def activity_vectors(activities, dimensions=SIMILAR_DIMENSIONS):
+    """Unit-length float32 hashed-feature vectors, one row per activity"""
+    import numpy as np
+
+    vectors = np.zeros((len(activities), dimensions), dtype=np.float32)
+    for row, activity in enumerate(activities):
+        vector = vectors[row]
+        for field, weight in FIELD_WEIGHTS:
+            for token in _TOKEN.findall(str(activity.get(field) or '').lower()):
+                if len(token) > 1 and token not in STOPWORDS:
+                    column, sign = _bucket(token, dimensions)
+                    vector[column] += sign * weight
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def quantize(vectors):
+    import numpy as np
+
+    return np.rint(vectors * VECTOR_SCALE).astype(np.int8)
+
+
+def cluster_count(rows):
+    return max(1, min(SIMILAR_MAX_CLUSTERS, int(math.sqrt(rows))))
+
+
+def train_centroids(vectors, count, seed=0):
+    """Spherical k-means on a sample of the vectors"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    sample = vectors if len(vectors) <= TRAIN_SAMPLE_SIZE else vectors[rng.choice(len(vectors), TRAIN_SAMPLE_SIZE, replace=False)]
+    sample = np.asarray(sample, dtype=np.float32)
+    count = min(count, len(sample))
+    centroids = sample[rng.choice(len(sample), count, replace=False)].copy()
+    for _ in range(TRAIN_ITERATIONS):
+        nearest = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, nearest, sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Clusters that lost every member keep their previous centroid
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    return centroids.astype(np.float32)
+
+
+def assign_clusters(vectors, centroids):
+    import numpy as np
+
+    clusters = np.empty(len(vectors), dtype=np.uint16)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_SIZE):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK_SIZE], dtype=np.float32)
+        clusters[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return clusters
+
+
+def cluster_vectors(vectors, centroids=None, clusters=None, trained_on=0):
+    """
+    (centroids, clusters, trained_on) after a merge. clusters are the known
+    assignments of the leading rows; only the remaining rows are assigned.
+    Centroids are retrained, and every row reassigned, when there are none
+    yet or the corpus has doubled since they were trained.
+    """
+    import numpy as np
+
+    if len(vectors) == 0:
+        return np.zeros((0, vectors.shape[1]), dtype=np.float32), np.empty(0, dtype=np.uint16), 0
+    if centroids is None or len(centroids) == 0 or centroids.shape[1] != vectors.shape[1] \
+            or len(vectors) > 2 * max(trained_on, 1):
+        centroids = train_centroids(vectors, cluster_count(len(vectors)))
+        return centroids, assign_clusters(vectors, centroids), len(vectors)
+    known = 0 if clusters is None else len(clusters)
+    fresh = assign_clusters(vectors[known:], centroids)
+    return centroids, np.concatenate((clusters, fresh)) if known else fresh, trained_on
+
+
+class SimilarityIndex:
+    """
+    Per-worker lookup structures over one snapshot: rows sorted by id hash
+    for id lookups, and rows grouped by cluster (the inverted lists)
+    """
+
+    def __init__(self, snapshot):
+        import numpy as np
+
+        self.snapshot = snapshot
+        ids = snapshot.columns['id_hash']
+        self._id_order = np.argsort(ids).astype(np.int64)
+        self._sorted_ids = ids[self._id_order]
+        clusters = snapshot.columns['cluster']
+        self._members = np.argsort(clusters, kind='stable').astype(np.int64)
+        self._bounds = np.searchsorted(clusters[self._members], np.arange(len(snapshot.centroids) + 1))
+
+    def row_for(self, activity_id):
+        from src.services.corpus import id_hash
+
+        target = id_hash(activity_id)
+        position = int(self._sorted_ids.searchsorted(target))
+        if position < len(self._sorted_ids) and int(self._sorted_ids[position]) == target:
+            return int(self._id_order[position])
+        return None
+
+    def neighbors(self, queries, limit=10, exclude=(), probes=SIMILAR_PROBES):
+        """
+        Top matches for a batch of query vectors: one list of (row, cosine)
+        per query, best first. Each query's nearest clusters are probed and all
+        candidates scored with a single matrix product. exclude holds row sets
+        to leave out, one per query (e.g. the query event itself).
+        """
+        import numpy as np
+
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        centroids = self.snapshot.centroids
+        probes = min(probes, len(centroids))
+        nearest_clusters = np.argpartition(-(queries @ centroids.T), probes - 1, axis=1)[:, :probes]
+        probed = np.unique(nearest_clusters)
+        candidates = np.concatenate([self._members[self._bounds[c]:self._bounds[c + 1]] for c in probed])
+        if not len(candidates):
+            return [[] for _ in queries]
+        scores = (self.snapshot.vectors[candidates].astype(np.float32) @ queries.T) / VECTOR_SCALE
+
+        results = []
+        for column in range(len(queries)):
+            column_scores = scores[:, column]
+            skip = exclude[column] if column < len(exclude) else ()
+            wanted = min(limit + len(skip), len(candidates))
+            top = np.argpartition(-column_scores, wanted - 1)[:wanted]
+            top = top[np.argsort(-column_scores[top], kind='stable')]
+            found = [(int(candidates[i]), float(column_scores[i])) for i in top if int(candidates[i]) not in skip]
+            results.append(found[:limit])
+        return results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index(snapshot):
+    """The index for this snapshot, rebuilt when the worker maps a newer one"""
+    global _index
+    index = _index
+    if index is None or index.snapshot is not snapshot:
+        with _index_lock:
+            if _index is None or _index.snapshot is not snapshot:
+                _index = SimilarityIndex(snapshot)
+            index = _index
+    return index
@@ -0,0 +1,195 @@
+"""
+Static file serving from an in-memory manifest of the static folder.
+
+The manifest is built once at startup, so requests never stat the filesystem.
+Content-hashed build assets are served with immutable caching, precompressed
+.br/.gz siblings are used when the client accepts them, and index.html (the SPA
+fallback) is served from memory.
+
+Generate the compressed siblings after a frontend build with:
+
+    python -m src.services.static_files [static_folder]
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from flask import Response, request
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Vite emits assets as name-<8 char content hash>.ext
+HASHED_ASSET_PATTERN = re.compile(r'(^|/)assets/.+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Served encodings in order of preference, with the sibling suffix that holds them
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml', 'image/x-icon',
+                      'image/vnd.microsoft.icon')
+MIN_COMPRESS_SIZE = 1024
+
+
+def _file_etag(path):
+    digest = hashlib.blake2b(digest_size=12)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _guess_type(path):
+    mimetype, _ = mimetypes.guess_type(path)
+    mimetype = mimetype or 'application/octet-stream'
+    if mimetype.startswith('text/') or mimetype == 'application/javascript':
+        mimetype += '; charset=utf-8'
+    return mimetype
+
+
+class StaticEntry:
+    def __init__(self, path, size, etag, mimetype, immutable, variants=None, body=None):
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.mimetype = mimetype
+        self.immutable = immutable
+        # encoding -> (path, size, etag, in-memory body or None)
+        self.variants = variants or {}
+        self.body = body
+
+
+class StaticManifest:
+    """
+    Snapshot of every file under the static folder, taken once at startup
+    """
+
+    def __init__(self, static_folder, index_name='index.html'):
+        self.static_folder = static_folder
+        self.index_name = index_name
+        self.entries = {}
+        self.index = None
+        self.build()
+
+    def build(self):
+        entries = {}
+        if os.path.isdir(self.static_folder):
+            for root, _, files in os.walk(self.static_folder):
+                names = set(files)
+                for name in files:
+                    if name.endswith(tuple(suffix for _, suffix in ENCODINGS)) and name[:name.rfind('.')] in names:
+                        continue
+                    full_path = os.path.join(root, name)
+                    rel_path = os.path.relpath(full_path, self.static_folder).replace(os.sep, '/')
+                    entries[rel_path] = self._entry(full_path, rel_path, names, name)
+        self.entries = entries
+        self.index = entries.get(self.index_name)
+        if self.index is not None:
+            self._load_in_memory(self.index)
+        return self
+
+    def _entry(self, full_path, rel_path, sibling_names, name):
+        variants = {}
+        directory = os.path.dirname(full_path)
+        for encoding, suffix in ENCODINGS:
+            if name + suffix in sibling_names:
+                variant_path = os.path.join(directory, name + suffix)
+                variants[encoding] = (variant_path, os.path.getsize(variant_path),
+                                      _file_etag(variant_path) + '-' + encoding, None)
+        return StaticEntry(full_path, os.path.getsize(full_path), _file_etag(full_path), _guess_type(full_path),
+                           bool(HASHED_ASSET_PATTERN.search(rel_path)), variants)
+
+    def _load_in_memory(self, entry):
+        with open(entry.path, 'rb') as f:
+            entry.body = f.read()
+        if 'gzip' not in entry.variants and len(entry.body) >= MIN_COMPRESS_SIZE:
+            compressed = gzip.compress(entry.body, compresslevel=9, mtime=0)
+            entry.variants['gzip'] = (None, len(compressed), entry.etag + '-gzip', compressed)
+
+    def get(self, path):
+        return self.entries.get(path)
+
+    def serve(self, path):
+        """Serve a static path, falling back to index.html for client-side routes"""
+        entry = self.entries.get(path) if path else None
+        if entry is None:
+            entry = self.index
+        if entry is None:
+            return Response('Not Found', status=404, mimetype='text/plain')
+        return self._respond(entry)
+
+    def _respond(self, entry):
+        encoding = self._negotiate(entry)
+        if encoding:
+            path, size, etag, body = entry.variants[encoding]
+        else:
+            path, size, etag, body = entry.path, entry.size, entry.etag, entry.body
+
+        headers = {
+            'ETag': f'"{etag}"',
+            'Cache-Control': IMMUTABLE_CACHE_CONTROL if entry.immutable else REVALIDATE_CACHE_CONTROL,
+        }
+        if entry.variants:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        headers['Content-Length'] = str(size)
+
+        if request.method == 'HEAD':
+            return Response(status=200, headers=headers, content_type=entry.mimetype)
+        if body is None:
+            body = wrap_file(request.environ, open(path, 'rb'))
+        return Response(body, status=200, headers=headers, content_type=entry.mimetype, direct_passthrough=True)
+
+    def _negotiate(self, entry):
+        if not entry.variants:
+            return None
+        accepted = request.accept_encodings
+        for encoding, _ in ENCODINGS:
+            if encoding in entry.variants and accepted[encoding] > 0:
+                return encoding
+        return None
+
+
+def precompress(static_folder):
+    """Write .gz (and .br when brotli is installed) siblings for compressible files"""
+    written = []
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if name.endswith(('.gz', '.br')):
+                continue
+            path = os.path.join(root, name)
+            mimetype, _ = mimetypes.guess_type(path)
+            if not mimetype or not mimetype.startswith(COMPRESSIBLE_TYPES):
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < MIN_COMPRESS_SIZE:
+                continue
+            outputs = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                outputs.append(('.br', brotli.compress(data, quality=11)))
+            for suffix, compressed in outputs:
+                # Only keep variants that actually save bytes
+                if len(compressed) < len(data):
+                    with open(path + suffix, 'wb') as f:
+                        f.write(compressed)
+                    written.append((path + suffix, len(data), len(compressed)))
+    return written
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')
+    for path, original, compressed in precompress(folder):
+        print(f'{path}: {original} -> {compressed} bytes')
@@ -0,0 +1,198 @@
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from src.services.classifier import CATEGORIES, iter_keywords
+
+SUGGEST_REFRESH_SECONDS = float(os.getenv('SUGGEST_REFRESH_SECONDS', '300'))
+# Past searches pulled from the search log per rebuild
+SUGGEST_HISTORY_SIZE = int(os.getenv('SUGGEST_HISTORY_SIZE', '5000'))
+# Past searches are suggested to everyone only once searched this often, so one
+# user's private search text (names, addresses, typos) is never offered to others
+SUGGEST_MIN_SEARCHES = int(os.getenv('SUGGEST_MIN_SEARCHES', '5'))
+MAX_SUGGESTIONS = 20
+# Distinct result categories counted; only the most common are kept past this
+SEEN_CATEGORY_LIMIT = 100
+
+# Prefixes this short match a large slice of the index, so their answers are precomputed
+_PRECOMPUTED_PREFIX_LENGTH = 2
+
+# Base weights; past searches add their search count on top
+KEYWORD_WEIGHT = 1.0
+CATEGORY_WEIGHT = 2.0
+SEEN_CATEGORY_WEIGHT = 0.5
+# Gazetteer places, scaled by population, all below a single past search
+PLACE_WEIGHT = 0.5
+
+
+class PrefixIndex:
+    """
+    Immutable sorted array of (term, weight) answering "top k terms starting
+    with prefix": two bisects find the matching slice, whose best entries are
+    picked by a heap or a popularity-ordered walk, whichever is cheaper.
+    Terms match case-insensitively and are returned as given ("Austin, TX").
+    Answers for one- and two-character prefixes are precomputed.
+    """
+
+    def __init__(self, weights):
+        items = sorted((term.lower(), term, weight) for term, weight in weights.items() if term)
+        self.terms = [key for key, _, _ in items]
+        self.texts = [term for _, term, _ in items]
+        self.weights = [weight for _, _, weight in items]
+        # Popularity order, for prefixes matching so much of the index that
+        # walking from the most popular term finds the top k sooner than a slice scan
+        self._by_weight = sorted(range(len(items)), key=lambda i: (-self.weights[i], self.terms[i]))
+        self._precomputed = {}
+        for term in self.terms:
+            for length in range(1, min(len(term), _PRECOMPUTED_PREFIX_LENGTH) + 1):
+                prefix = term[:length]
+                if prefix not in self._precomputed:
+                    self._precomputed[prefix] = self._scan(prefix, MAX_SUGGESTIONS)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _scan(self, prefix, limit):
+        start = bisect_left(self.terms, prefix)
+        end = bisect_left(self.terms, prefix + '\uffff', start)
+        matched = end - start
+        if matched <= limit:
+            matches = range(start, end)
+        elif matched * matched > len(self.terms) * limit:
+            # Expected walk is len/matched * limit entries
+            matches = []
+            for i in self._by_weight:
+                if start <= i < end:
+                    matches.append(i)
+                    if len(matches) == limit:
+                        break
+        else:
+            matches = heapq.nlargest(limit, range(start, end), key=self.weights.__getitem__)
+        ranked = sorted(matches, key=lambda i: (-self.weights[i], self.terms[i]))
+        return [(self.texts[i], self.weights[i]) for i in ranked]
+
+    def search(self, prefix, limit=8):
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+        precomputed = self._precomputed.get(prefix)
+        if precomputed is not None:
+            return precomputed[:limit]
+        return self._scan(prefix, limit)
+
+
+_seen_categories = Counter()
+_seen_lock = threading.Lock()
+
+_indexes = {'query': PrefixIndex({}), 'location': PrefixIndex({})}
+_built_at = 0.0
+_rebuilding = threading.Lock()
+
+
+def _category_vocabulary():
+    """Category names that may be suggested: classifier ids, keywords and provider segments"""
+    names = {keyword for keyword, _ in iter_keywords()}
+    for category in CATEGORIES:
+        names.add(category['id'])
+        if category['ticketmaster']:
+            names.add(category['ticketmaster'].lower())
+    return frozenset(names)
+
+
+CATEGORY_VOCABULARY = _category_vocabulary()
+
+
+def note_categories(activities):
+    """
+    Count the known categories of provider results so popular ones rank
+    higher. Anything outside CATEGORY_VOCABULARY is ignored: result
+    categories can echo the user's query (the mock results do), and those
+    must not be suggested to everyone else.
+    """
+    names = [str(activity.get('category') or '').strip().lower() for activity in activities]
+    with _seen_lock:
+        _seen_categories.update(name for name in names if name in CATEGORY_VOCABULARY)
+        if len(_seen_categories) > 2 * SEEN_CATEGORY_LIMIT:
+            kept = _seen_categories.most_common(SEEN_CATEGORY_LIMIT)
+            _seen_categories.clear()
+            _seen_categories.update(dict(kept))
+
+
+def _place_weights():
+    """Gazetteer places by display name, weighted by population"""
+    from src.services.locations import get_gazetteer
+
+    try:
+        places = get_gazetteer().places
+    except Exception as e:
+        print(f"Suggest gazetteer error: {e}")
+        return {}
+    largest = max((place['population'] for place in places), default=0) or 1
+    return {place['display']: PLACE_WEIGHT * place['population'] / largest for place in places}
+
+
+def build_indexes(history=()):
+    """
+    Query index from classifier keywords, category ids, seen categories and past
+    searches; location index from gazetteer places and past searches. history
+    is top_searches() output.
+    """
+    queries = Counter()
+    for keyword, _ in iter_keywords():
+        queries[keyword] = max(queries[keyword], KEYWORD_WEIGHT)
+    for category in CATEGORIES:
+        queries[category['id']] = max(queries[category['id']], CATEGORY_WEIGHT)
+    with _seen_lock:
+        seen = list(_seen_categories.items())
+    for name, count in seen:
+        queries[name] += SEEN_CATEGORY_WEIGHT * count
+
+    locations = Counter(_place_weights())
+    # The search log keeps locations lower-cased; count them towards the gazetteer's spelling
+    displays = {place.lower(): place for place in locations}
+    for row in history:
+        queries[' '.join(row['query'].lower().split())] += row['searches']
+        locations[displays.get(row['location'], row['location'])] += row['searches']
+    return {'query': PrefixIndex(queries), 'location': PrefixIndex(locations)}
+
+
+def _load_history(app):
+    if app is None:
+        return []
+    from src.services.search_log import top_searches
+
+    try:
+        with app.app_context():
+            return top_searches(limit=SUGGEST_HISTORY_SIZE, min_searches=SUGGEST_MIN_SEARCHES)
+    except Exception as e:
+        print(f"Suggest index history error: {e}")
+        return []
+
+
+def rebuild(app=None):
+    global _indexes, _built_at
+    _indexes = build_indexes(_load_history(app))
+    _built_at = time.monotonic()
+
+
+def _rebuild_in_background(app):
+    try:
+        rebuild(app)
+    finally:
+        _rebuilding.release()
+
+
+def suggest(kind, prefix, limit=8, app=None):
+    """
+    Top suggestions for a prefix. The first call builds the index; afterwards a
+    stale index keeps answering while a background thread replaces it.
+    """
+    if _built_at == 0.0:
+        with _rebuilding:
+            if _built_at == 0.0:
+                rebuild(app)
+    elif time.monotonic() - _built_at > SUGGEST_REFRESH_SECONDS and _rebuilding.acquire(blocking=False):
+        threading.Thread(target=_rebuild_in_background, args=(app,), name='suggest-rebuild', daemon=True).start()
+    return _indexes[kind].search(prefix, min(limit, MAX_SUGGESTIONS))
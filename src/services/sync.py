@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from src.services.image_cache import DiskLRUCache
+
+# Snapshots kept in memory per process, in front of the directory shared by
+# every worker on the host; a token that has been evicted from both simply
+# gets a full response and a fresh token
+SYNC_SNAPSHOT_CACHE_SIZE = int(os.getenv('SYNC_SNAPSHOT_CACHE_SIZE', '10000'))
+SYNC_SNAPSHOT_DIR = os.getenv('SYNC_SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'activity-finder-sync'))
+SYNC_SNAPSHOT_MAX_BYTES = int(os.getenv('SYNC_SNAPSHOT_CACHE_MB', '64')) * 1024 * 1024
+
+_FIELD_SEPARATOR = '\x1f'
+# Tokens come back from clients and name files, so anything else is unknown
+_TOKEN = re.compile(r'[0-9a-f]{24}')
+
+
+def record_hash(activity):
+    """Content hash of one normalized activity; any field change changes it"""
+    content = _FIELD_SEPARATOR.join(f'{key}={activity[key]}' for key in sorted(activity))
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def snapshot_token(scope, hashes):
+    """
+    Tokens are content-addressed: the same results for the same search always
+    get the same token, so steady-state polling stores nothing new
+    """
+    digest = hashlib.blake2b(scope.encode('utf-8'), digest_size=12)
+    for activity_id in sorted(hashes):
+        digest.update(f'{activity_id}{_FIELD_SEPARATOR}{hashes[activity_id]}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SnapshotStore:
+    """
+    LRU of sync token -> (scope, {activity id: content hash}), optionally
+    backed by a DiskLRUCache shared with the other workers, so a poll can
+    land on any worker
+    """
+
+    def __init__(self, max_entries, shared=None):
+        self.max_entries = max_entries
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        if not _TOKEN.fullmatch(token):
+            return None
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                self._entries.move_to_end(token)
+                return entry
+        if self.shared is None:
+            return None
+        try:
+            data = self.shared.get(token)
+            if data is None:
+                return None
+            scope, hashes = json.loads(data)
+        except Exception as e:
+            print(f"Sync snapshot read error: {e}")
+            return None
+        self._remember(token, scope, hashes)
+        return scope, hashes
+
+    def put(self, token, scope, hashes):
+        # Tokens are content-addressed, so one this worker already holds is already shared
+        with self._lock:
+            known = token in self._entries
+        self._remember(token, scope, hashes)
+        if self.shared is not None and not known:
+            try:
+                self.shared.put(token, json.dumps([scope, hashes], separators=(',', ':')).encode('utf-8'))
+            except Exception as e:
+                print(f"Sync snapshot write error: {e}")
+
+    def _remember(self, token, scope, hashes):
+        with self._lock:
+            self._entries[token] = (scope, hashes)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """This process's snapshot store, backed by SYNC_SNAPSHOT_DIR when it is usable"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    shared = DiskLRUCache(SYNC_SNAPSHOT_DIR, SYNC_SNAPSHOT_MAX_BYTES)
+                except OSError as e:
+                    print(f"Sync snapshot directory error: {e}")
+                    shared = None
+                _store = SnapshotStore(SYNC_SNAPSHOT_CACHE_SIZE, shared)
+    return _store
+
+
+def compute_delta(scope, token, activities):
+    """
+    Snapshot the current results of a search (scope) and diff them against the
+    snapshot a client's token refers to. Returns (new token, delta) where delta
+    is None when the token is missing, unknown or from a different search,
+    otherwise {'added': [...], 'changed': [...], 'removed': [ids]}.
+    """
+    hashes = {activity['id']: record_hash(activity) for activity in activities}
+    new_token = snapshot_token(scope, hashes)
+    store = get_store()
+    previous = store.get(token) if isinstance(token, str) and token else None
+    store.put(new_token, scope, hashes)
+
+    if previous is None or previous[0] != scope:
+        return new_token, None
+    old_hashes = previous[1]
+    if token == new_token:
+        return new_token, {'added': [], 'changed': [], 'removed': []}
+
+    added = [activity for activity in activities if activity['id'] not in old_hashes]
+    changed = [
+        activity for activity in activities
+        if activity['id'] in old_hashes and old_hashes[activity['id']] != hashes[activity['id']]
+    ]
+    removed = [activity_id for activity_id in old_hashes if activity_id not in hashes]
+    return new_token, {'added': added, 'changed': changed, 'removed': removed}
@@ -0,0 +1,206 @@
+import importlib.util
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.services.metrics import register_counter, register_gauge
+
+# Bounded in-process cache of serialized users; set USER_CACHE_SIZE=0 to disable
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+# Each worker has its own local cache and only sees its own invalidations, so
+# entries expire quickly: another worker's write shows up within this many seconds
+USER_CACHE_LOCAL_TTL = float(os.getenv('USER_CACHE_LOCAL_TTL', '5'))
+# Optional cache shared by every worker; needs the redis package
+USER_CACHE_REDIS_URL = os.getenv('USER_CACHE_REDIS_URL', '')
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '3600'))
+
+
+class LocalUserCache:
+    """
+    LRU map of user id -> (expiry, serialized JSON body). A generation counter
+    bumped on every invalidation stops a reader that loaded a row before a
+    concurrent write from caching the stale body after the write's invalidation.
+    Entries expire after ttl seconds, which bounds how long a write made
+    through another worker goes unseen.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, body, generation):
+        with self._lock:
+            if generation != self.generation or self.max_entries <= 0 or self.ttl <= 0:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            self.generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class RedisUserCache:
+    """
+    The same interface backed by Redis, so an invalidation in one worker is seen
+    by all of them. Redis errors are treated as misses so reads fall back to the database.
+    """
+
+    def __init__(self, url, ttl):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(user_id):
+        return f'activity-finder:user:{user_id}'
+
+    def get(self, user_id):
+        try:
+            body = self._client.get(self._key(user_id))
+        except Exception as e:
+            print(f"User cache error: {e}")
+            body = None
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    def put(self, user_id, body, generation):
+        # SET NX never overwrites a newer body; a read racing a write can still
+        # store the old one, so USER_CACHE_TTL bounds how long that can last
+        try:
+            self._client.set(self._key(user_id), body, ex=self.ttl, nx=True)
+        except Exception as e:
+            print(f"User cache error: {e}")
+
+    def invalidate(self, user_ids):
+        keys = [self._key(user_id) for user_id in user_ids]
+        if not keys:
+            return
+        try:
+            self._client.delete(*keys)
+        except Exception as e:
+            print(f"User cache error: {e}")
+
+    def clear(self):
+        try:
+            keys = list(self._client.scan_iter(match=self._key('*')))
+            if keys:
+                self._client.delete(*keys)
+        except Exception as e:
+            print(f"User cache error: {e}")
+
+    def stats(self):
+        return {'entries': 0, 'hits': self.hits, 'misses': self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if USER_CACHE_REDIS_URL and importlib.util.find_spec('redis') is not None:
+                    _cache = RedisUserCache(USER_CACHE_REDIS_URL, USER_CACHE_TTL)
+                else:
+                    if USER_CACHE_REDIS_URL:
+                        print('User cache error: USER_CACHE_REDIS_URL is set but redis is not installed; using the local cache')
+                    _cache = LocalUserCache(USER_CACHE_SIZE, USER_CACHE_LOCAL_TTL)
+    return _cache
+
+
+def cached_user_body(user_id, load):
+    """
+    Read-through lookup: the cached JSON body for a user, or load(user_id) -> body
+    (None when the user doesn't exist) stored for next time
+    """
+    cache = get_user_cache()
+    body = cache.get(user_id)
+    if body is not None:
+        return body
+    generation = cache.generation
+    body = load(user_id)
+    if body is not None:
+        cache.put(user_id, body, generation)
+    return body
+
+
+def invalidate_users(user_ids):
+    get_user_cache().invalidate(list(user_ids))
+
+
+# ORM writes are invalidated automatically: ids of changed/deleted users are
+# collected at flush and dropped once the transaction commits. Core UPDATE/DELETE
+# statements bypass these events and must call invalidate_users() themselves.
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    from src.models.user import User
+
+    changed = session.info.setdefault('invalidate_user_ids', set())
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            changed.add(instance.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    changed = session.info.pop('invalidate_user_ids', None)
+    if changed:
+        invalidate_users(changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('invalidate_user_ids', None)
+
+
+def _cache_gauge(field):
+    def collect():
+        return _cache.stats()[field] if _cache is not None else 0
+    return collect
+
+
+register_gauge('user_cache_entries', 'Serialized users held in the in-process cache', _cache_gauge('entries'))
+register_counter('user_cache_hits_total', 'User cache hits since startup', _cache_gauge('hits'))
+register_counter('user_cache_misses_total', 'User cache misses since startup', _cache_gauge('misses'))
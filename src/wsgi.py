@@ -0,0 +1,78 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app     # migrates in the master, warms up each worker
+    python -m src.wsgi --workers 2 --threads 16   # same thing through the bundled CLI
+
+Imported any other way (a plain `gunicorn src.wsgi:app`, uWSGI, mod_wsgi)
+the migration and warm-up run on import, once per process. gunicorn.conf.py
+sets WSGI_STARTUP_HOOKS=0 because its own hooks run them instead.
+"""
+import argparse
+import os
+import runpy
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.main import create_app, startup
+
+# Off when gunicorn.conf.py runs the startup hooks itself (on_starting, post_worker_init)
+WSGI_STARTUP_HOOKS = os.getenv('WSGI_STARTUP_HOOKS', '1') == '1'
+
+app = create_app()
+# Run as the CLI below, this process becomes the gunicorn master, whose hooks take over
+if WSGI_STARTUP_HOOKS and __name__ != '__main__':
+    startup(app)
+
+
+def _default_workers():
+    return int(os.getenv('WEB_CONCURRENCY', str(min(4, (os.cpu_count() or 1) + 1))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run Activity Finder under gunicorn')
+    parser.add_argument('--bind', default=os.getenv('BIND', '0.0.0.0:' + os.getenv('PORT', '5000')))
+    parser.add_argument('--workers', type=int, default=_default_workers(), help='worker processes')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('GUNICORN_THREADS', '16')),
+                        help='request threads per worker')
+    parser.add_argument('--keepalive', type=int, default=int(os.getenv('GUNICORN_KEEPALIVE', '5')),
+                        help='seconds to hold idle keep-alive connections')
+    parser.add_argument('--timeout', type=int, default=int(os.getenv('GUNICORN_TIMEOUT', '30')),
+                        help='seconds before a silent worker is restarted')
+    parser.add_argument('--max-requests', type=int, default=int(os.getenv('GUNICORN_MAX_REQUESTS', '5000')),
+                        help='recycle a worker after this many requests (0 disables)')
+    parser.add_argument('--max-requests-jitter', type=int,
+                        default=int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '500')))
+    args = parser.parse_args()
+
+    from gunicorn.app.base import BaseApplication
+
+    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+    class ActivityFinderApplication(BaseApplication):
+        def load_config(self):
+            # Hooks and defaults come from gunicorn.conf.py; CLI flags override them
+            if os.path.exists(config_path):
+                for key, value in runpy.run_path(config_path).items():
+                    if key in self.cfg.settings and value is not None:
+                        self.cfg.set(key, value)
+            for key, value in {
+                'bind': args.bind,
+                'workers': args.workers,
+                'threads': args.threads,
+                'keepalive': args.keepalive,
+                'timeout': args.timeout,
+                'max_requests': args.max_requests,
+                'max_requests_jitter': args.max_requests_jitter,
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    ActivityFinderApplication().run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Shared test setup. Settings are read from the environment at import time, so
+every path the app writes to points into a temporary directory, background
+writers are off, and the providers talk to the benchmark fake provider
+before anything from src is imported.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_provider import FakeProviderServer
+
+TEST_DIR = tempfile.mkdtemp(prefix='activity-finder-tests-')
+FAKE_PROVIDER = FakeProviderServer(latency_ms=1, jitter_ms=0).start()
+
+os.environ.update(FAKE_PROVIDER.provider_env())
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(TEST_DIR, 'app.db'),
+    'CORPUS_PATH': os.path.join(TEST_DIR, 'corpus.bin'),
+    'RATE_LIMIT_PATH': os.path.join(TEST_DIR, 'ratelimit.bin'),
+    'IMAGE_CACHE_DIR': os.path.join(TEST_DIR, 'images'),
+    'PROFILE_DIR': os.path.join(TEST_DIR, 'profiles'),
+    'SYNC_SNAPSHOT_DIR': os.path.join(TEST_DIR, 'sync'),
+    'RATE_LIMIT_ENABLED': '0',
+    'SEARCH_LOG_ENABLED': '0',
+    'PERCOLATOR_ENABLED': '0',
+    'CPU_POOL_ENABLED': '0',
+    'PROVIDER_TIMEOUT_SECONDS': '5',
+})
+
+
+def pytest_unconfigure(config):
+    FAKE_PROVIDER.stop()
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from src.main import create_app
+
+    return create_app()
+
+
+@pytest.fixture
+def db(app):
+    """Empty tables for each test"""
+    from src.main import init_database
+    from src.models.user import db
+    from src.services.user_cache import get_user_cache
+
+    with app.app_context():
+        db.drop_all()
+    init_database(app)
+    get_user_cache().clear()
+    return db
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
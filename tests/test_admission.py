@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from src.services import admission
+from src.services.admission import ADMITTED, QUEUE_FULL, QUEUE_TIMEOUT, AdmissionController, ResultCache
+
+
+def test_reserved_slots_are_left_for_cheap_requests():
+    controller = AdmissionController(limit=2, reserved=1, queue_size=4, queue_timeout_ms=10)
+
+    assert controller.acquire(cheap=False) == ADMITTED
+    assert controller.acquire(cheap=False) == QUEUE_TIMEOUT
+    assert controller.acquire(cheap=True) == ADMITTED
+    assert controller.acquire(cheap=True) == QUEUE_TIMEOUT
+    assert controller.queued() == 0
+    controller.release(cheap=False)
+    assert controller.acquire(cheap=False) == ADMITTED
+
+
+def test_full_queue_turns_requests_away():
+    controller = AdmissionController(limit=1, reserved=0, queue_size=1, queue_timeout_ms=5000)
+    assert controller.acquire(cheap=False) == ADMITTED
+    outcomes = []
+    waiter = threading.Thread(target=lambda: outcomes.append(controller.acquire(cheap=False)))
+    waiter.start()
+    while not controller.queued():
+        time.sleep(0.001)
+
+    assert controller.acquire(cheap=True) == QUEUE_FULL
+    controller.release(cheap=False)
+    waiter.join()
+    assert outcomes == [ADMITTED]
+    assert controller.active == 1
+
+
+def test_released_slots_go_to_cheap_requests_first():
+    controller = AdmissionController(limit=1, reserved=0, queue_size=4, queue_timeout_ms=5000)
+    assert controller.acquire(cheap=False) == ADMITTED
+    order = []
+
+    def wait(cheap):
+        controller.acquire(cheap)
+        order.append(cheap)
+
+    expensive = threading.Thread(target=wait, args=(False,))
+    expensive.start()
+    while controller.queued() < 1:
+        time.sleep(0.001)
+    cheap = threading.Thread(target=wait, args=(True,))
+    cheap.start()
+    while controller.queued() < 2:
+        time.sleep(0.001)
+
+    controller.release(cheap=False)
+    cheap.join()
+    controller.release(cheap=True)
+    expensive.join()
+    assert order == [True, False]
+
+
+def test_result_cache_expires_and_evicts():
+    cache = ResultCache(2)
+    cache.put('a', [1])
+    cache.put('b', [2])
+    cache.get('a', 60)
+    cache.put('c', [3])
+
+    assert cache.get('b', 60) is None
+    assert cache.get('a', 60) == [1]
+    assert cache.get('a', -1) is None
+    assert len(cache) == 2
+    ResultCache(0).put('a', [1])
+
+
+@pytest.fixture
+def overloaded(monkeypatch):
+    """This worker's only slot is taken; the returned controller can be reconfigured"""
+    controller = AdmissionController(limit=1, reserved=0, queue_size=0, queue_timeout_ms=10)
+    controller.acquire(cheap=False)
+    monkeypatch.setattr(admission, '_controller', controller)
+    monkeypatch.setattr(admission, '_results', ResultCache(10))
+    return controller
+
+
+def test_overloaded_searches_are_degraded_or_refused(client, overloaded, monkeypatch):
+    refused = client.post('/api/activities/search', json={'query': 'busy jazz', 'location': 'Austin'})
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == str(admission.ADMISSION_RETRY_AFTER_SECONDS)
+
+    overloaded.queue_size = 1
+    mock = client.post('/api/activities/search', json={'query': 'busy jazz', 'location': 'Austin'})
+    assert mock.status_code == 200
+    assert mock.get_json()['degraded'] == 'mock'
+
+    admission.cache_results('busy jazz|austin-tx-us|{}', [{'id': 'kept', 'title': 'Kept result'}])
+    cached = client.post('/api/activities/search', json={'query': 'Busy Jazz', 'location': 'atx'})
+    assert cached.status_code == 200
+    assert cached.headers['X-Cache'] == 'HIT'
+    assert cached.get_json()['activities'] == [{'id': 'kept', 'title': 'Kept result'}]
+
+    # Past the TTL the same results are only good for overloaded requests
+    monkeypatch.setattr(admission, 'SEARCH_CACHE_TTL_SECONDS', -1)
+    stale = client.post('/api/activities/search', json={'query': 'busy jazz', 'location': 'Austin'})
+    assert stale.get_json()['degraded'] == 'cached'
+    assert 'X-Cache' not in stale.headers
@@ -0,0 +1,53 @@
+import os
+import runpy
+import sqlite3
+import subprocess
+import sys
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tables(path):
+    with sqlite3.connect(path) as connection:
+        return {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def import_wsgi(tmp_path, **env):
+    """Import src.wsgi in a fresh interpreter against its own database; returns the database path"""
+    path = tmp_path / 'wsgi.db'
+    environment = dict(os.environ, DATABASE_URL=f'sqlite:///{path}', **env)
+    subprocess.run([sys.executable, '-c', 'import src.wsgi'], cwd=ROOT, env=environment, check=True, timeout=60)
+    return path
+
+
+def test_importing_wsgi_creates_the_tables(tmp_path):
+    path = import_wsgi(tmp_path)
+
+    assert {'user', 'search_log', 'subscription'} <= tables(path)
+
+
+def test_wsgi_startup_hooks_can_be_turned_off(tmp_path):
+    path = import_wsgi(tmp_path, WSGI_STARTUP_HOOKS='0')
+
+    assert not path.exists() or not tables(path)
+
+
+def test_gunicorn_hooks_migrate_in_the_master_and_warm_up_workers(tmp_path, monkeypatch):
+    import src.main
+
+    monkeypatch.delenv('WSGI_STARTUP_HOOKS', raising=False)
+    config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+    # Workers importing src.wsgi leave the hooks to gunicorn
+    assert os.environ['WSGI_STARTUP_HOOKS'] == '0'
+    migrated, warmed = [], []
+    monkeypatch.setattr(src.main, 'init_database', migrated.append)
+    monkeypatch.setattr(src.main, 'warm_up', warmed.append)
+    worker_app = object()
+
+    config['on_starting'](None)
+    config['post_worker_init'](SimpleNamespace(wsgi=worker_app))
+
+    assert len(migrated) == 1
+    assert warmed == [worker_app]
+    assert config['worker_class'] == 'gthread'
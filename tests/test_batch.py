@@ -0,0 +1,69 @@
+from src.routes import activities
+from src.routes.activities import select_from_pool
+from src.services.providers import get_enabled_providers
+
+
+def test_select_from_pool_puts_text_matches_first():
+    pool = [
+        {'title': 'Symphony night', 'category': 'Arts'},
+        {'title': 'Jazz on the lawn', 'category': 'Music'},
+        {'title': 'Pickup soccer', 'category': 'Sports'},
+    ]
+    categories = [['music'], ['music'], ['sports']]
+
+    selected = select_from_pool('jazz', pool, categories, limit=5)
+
+    assert [activity['title'] for activity in selected] == ['Jazz on the lawn', 'Symphony night']
+    assert select_from_pool('jazz', pool, categories, limit=1) == [pool[1]]
+
+
+def test_batch_groups_searches_and_keeps_request_order(client):
+    searches = [
+        {'query': 'music', 'location': 'Austin, TX'},
+        {'query': 'concerts', 'location': 'atx'},
+        {'query': 'pottery wheel', 'location': 'Austin'},
+        {'query': 'Pottery Wheel', 'location': 'austin tx'},
+        {'query': '', 'location': 'Austin'},
+        'not a search',
+        {'query': 'music', 'location': 'Boston'},
+    ]
+
+    response = client.post('/api/activities/batch', json={'searches': searches})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    results = data['results']
+    assert data['total'] == len(searches)
+    assert [result.get('source') for result in results] == ['shared', 'shared', 'direct', 'direct', None, None, 'shared']
+    assert [result.get('query') for result in results] == \
+        ['music', 'concerts', 'pottery wheel', 'Pottery Wheel', None, None, 'music']
+    assert results[4] == results[5] == {'error': 'Query and location are required'}
+    assert results[1]['location']['key'] == 'austin-tx-us'
+    assert results[6]['location']['key'] == 'boston-ma-us'
+    assert all(result['activities'] for result in results if 'error' not in result)
+    # One broad call per provider for each of the two places, one search for the repeated direct query
+    assert data['upstream_calls'] <= 3 * len(get_enabled_providers())
+
+
+def test_batch_rejects_bad_requests(client, monkeypatch):
+    monkeypatch.setattr(activities, 'BATCH_MAX_SEARCHES', 2)
+
+    assert client.post('/api/activities/batch', json={}).status_code == 400
+    assert client.post('/api/activities/batch', json={'searches': []}).status_code == 400
+    too_many = [{'query': 'music', 'location': 'Austin'}] * 3
+    response = client.post('/api/activities/batch', json={'searches': too_many})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'At most 2 searches per batch'
+
+
+def test_pool_misses_get_a_search_of_their_own(client, monkeypatch):
+    monkeypatch.setattr(activities, 'select_from_pool', lambda query, pool, categories, limit: [])
+    searches = [{'query': 'music', 'location': 'Austin'}, {'query': 'Music', 'location': 'atx'}]
+
+    data = client.post('/api/activities/batch', json={'searches': searches}).get_json()
+
+    assert [result['source'] for result in data['results']] == ['direct', 'direct']
+    assert all(result['activities'] for result in data['results'])
+    # The broad call per provider, then one search shared by both spellings
+    providers = len(get_enabled_providers())
+    assert providers + 1 <= data['upstream_calls'] <= 2 * providers
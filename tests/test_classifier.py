@@ -0,0 +1,34 @@
+from src.services.classifier import (
+    classify_query,
+    classify_text,
+    primary_category,
+    ticketmaster_classification,
+    yelp_categories,
+)
+
+
+def test_keywords_match_whole_words_only():
+    assert classify_query('street art') == ('art',)
+    assert classify_query('party') == ()
+    assert classify_query('Rock  CONCERTS') == ('music',)
+
+
+def test_categories_come_in_priority_order():
+    assert classify_query('yoga and wine tasting after the jazz festival') == ('music', 'food', 'fitness')
+    assert primary_category('food festival') == 'music'
+    assert primary_category('knitting circle') is None
+
+
+def test_overlapping_keywords():
+    assert classify_query('live music') == ('music',)
+    assert classify_text('Hackathon: coding for galleries') == ('tech', 'art')
+
+
+def test_upstream_filters():
+    assert yelp_categories('wine tasting') == 'food-and-drink'
+    assert yelp_categories('jazz gallery') == 'music,visual-arts'
+    assert yelp_categories('knitting') == 'other'
+    assert ticketmaster_classification('jazz') == 'Music'
+    # Mixed queries are not narrowed to one segment
+    assert ticketmaster_classification('food festival') is None
+    assert ticketmaster_classification('tech meetup') is None
@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+
+import pytest
+
+from src.services import corpus
+from src.services.corpus import ColumnarSnapshot, day_number, merge_into_snapshot
+
+AUSTIN = (30.2672, -97.7431)
+BOSTON = (42.3601, -71.0589)
+
+
+def day(offset):
+    return str(date.today() + timedelta(days=offset))
+
+
+def record(activity_id, offset, category, place=AUSTIN, source='Eventbrite', title=None):
+    activity = {'id': activity_id, 'title': title or f'{category} night {activity_id}', 'date': day(offset),
+                'category': category, 'source': source}
+    return activity, place[0], place[1]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = str(tmp_path / 'corpus.bin')
+    merge_into_snapshot(path, [
+        record('a', 3, 'Music'),
+        record('b', 1, 'Sports'),
+        record('c', 2, 'Music', place=BOSTON, source='Ticketmaster'),
+        record('d', 5, 'Music', source='Ticketmaster'),
+    ])
+    return path
+
+
+def ids(snapshot, indices):
+    return [snapshot.record(index)['id'] for index in indices]
+
+
+def test_day_number():
+    assert day_number('1970-01-02') == 1
+    assert day_number('2025-06-14T19:00:00') == day_number('2025-06-14')
+    assert day_number('TBD') == corpus.NO_DATE
+
+
+def test_filters_combine_and_sort_soonest_first(snapshot_path):
+    snapshot = ColumnarSnapshot(snapshot_path)
+
+    assert len(snapshot) == 4
+    assert ids(snapshot, snapshot.filter()) == ['b', 'c', 'a', 'd']
+    assert ids(snapshot, snapshot.filter(categories=['music'])) == ['c', 'a', 'd']
+    assert ids(snapshot, snapshot.filter(categories=['music'], lat=AUSTIN[0], lon=AUSTIN[1], radius_km=25)) == \
+        ['a', 'd']
+    assert ids(snapshot, snapshot.filter(sources=['Ticketmaster'])) == ['c', 'd']
+    assert ids(snapshot, snapshot.filter(start_day=day_number(day(2)), end_day=day_number(day(3)))) == ['c', 'a']
+    assert ids(snapshot, snapshot.filter(end_day=day_number(day(2)), limit=1)) == ['b']
+    assert len(snapshot.filter(start_day=day_number(day(3)), end_day=day_number(day(2)))) == 0
+    snapshot.close()
+
+
+def test_merge_replaces_records_and_drops_past_events(snapshot_path):
+    merge_into_snapshot(snapshot_path, [
+        record('a', 4, 'Music', title='Moved show'),
+        record('old', -30, 'Music'),
+        record('e', 6, 'Sports'),
+    ])
+    merge_into_snapshot(snapshot_path, [record('f', 7, 'Sports')])
+    snapshot = ColumnarSnapshot(snapshot_path)
+
+    records = [snapshot.record(index) for index in snapshot.filter(limit=10)]
+    assert [activity['id'] for activity in records] == ['b', 'c', 'a', 'd', 'e', 'f']
+    assert records[2]['title'] == 'Moved show'
+    assert snapshot.vectors.shape[0] == len(snapshot)
+    snapshot.close()
+
+
+def test_browse_endpoint(client, monkeypatch, snapshot_path):
+    monkeypatch.setattr(corpus, 'CORPUS_PATH', snapshot_path)
+    monkeypatch.setattr(corpus, '_snapshot', None)
+
+    response = client.get('/api/activities/browse?category=music&location=Austin, TX&radius_km=25')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [activity['id'] for activity in data['activities']] == ['a', 'd']
+    assert data['corpus_size'] == 4
+    assert data['location']['key'] == 'austin-tx-us'
+    assert client.get('/api/activities/browse?limit=lots').status_code == 400
+    assert client.get('/api/activities/browse?from=soon').status_code == 400
+    assert client.get('/api/activities/browse?location=Tiny Hamlet').status_code == 400
+
+
+def test_browse_without_a_corpus(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(corpus, 'CORPUS_PATH', str(tmp_path / 'missing.bin'))
+    monkeypatch.setattr(corpus, '_snapshot', None)
+
+    assert client.get('/api/activities/browse').status_code == 503
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.services import cpu_pool
+from src.services.cpu_pool import map_chunks
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tag_with_pid(items):
+    return [(item * 2, os.getpid()) for item in items]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A two-worker pool of this test's own, shut down afterwards"""
+    monkeypatch.setattr(cpu_pool, 'CPU_POOL_ENABLED', True)
+    monkeypatch.setattr(cpu_pool, 'CPU_POOL_WORKERS', 2)
+    monkeypatch.setattr(cpu_pool, '_pool', None)
+    monkeypatch.setattr(cpu_pool, '_stats', {'chunks': 0, 'fallbacks': 0})
+    yield
+    cpu_pool._discard_pool()
+
+
+def test_disabled_or_small_work_runs_inline(monkeypatch):
+    monkeypatch.setattr(cpu_pool, 'CPU_POOL_ENABLED', False)
+    assert map_chunks(tag_with_pid, [1, 2, 3], chunk_size=1) == [(2, os.getpid()), (4, os.getpid()), (6, os.getpid())]
+
+    monkeypatch.setattr(cpu_pool, 'CPU_POOL_ENABLED', True)
+    monkeypatch.setattr(cpu_pool, '_pool', None)
+    assert map_chunks(tag_with_pid, [1, 2], chunk_size=2) == [(2, os.getpid()), (4, os.getpid())]
+    assert cpu_pool._pool is None
+
+
+def test_chunks_run_in_worker_processes_in_order(pool):
+    results = map_chunks(tag_with_pid, list(range(10)), chunk_size=3)
+
+    assert [value for value, _ in results] == [item * 2 for item in range(10)]
+    assert os.getpid() not in {pid for _, pid in results}
+    assert cpu_pool._stats == {'chunks': 4, 'fallbacks': 0}
+
+
+def test_pool_failure_falls_back_to_inline(pool):
+    # A lambda can't be sent to a worker process
+    results = map_chunks(lambda items: [item + 1 for item in items], [1, 2, 3], chunk_size=1)
+
+    assert results == [2, 3, 4]
+    assert cpu_pool._stats['fallbacks'] == 1
+    assert cpu_pool._pool is None
+
+
+def pool_settings(**env):
+    environment = {key: value for key, value in os.environ.items() if not key.startswith('CPU_POOL')}
+    environment.update(env)
+    script = 'from src.services import cpu_pool; print(cpu_pool.CPU_POOL_WORKERS, cpu_pool.CPU_POOL_ENABLED)'
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=environment, check=True, timeout=60,
+                            capture_output=True, text=True).stdout.split()
+    return int(output[0]), output[1] == 'True'
+
+
+def test_a_single_pool_process_per_worker_is_not_used():
+    cpus = os.cpu_count() or 1
+
+    assert pool_settings(WEB_CONCURRENCY=str(cpus)) == (1, False)
+    assert pool_settings(WEB_CONCURRENCY=str(cpus), CPU_POOL_WORKERS='1') == (1, True)
+    if cpus >= 4:
+        assert pool_settings(WEB_CONCURRENCY='2') == (cpus // 2, True)
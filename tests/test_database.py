@@ -0,0 +1,38 @@
+from sqlalchemy import text
+
+from src.services import database
+from src.services.database import engine_options, get_database_url
+
+
+def test_database_url(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://u:p@db/app')
+    assert get_database_url() == 'postgresql://u:p@db/app'
+    monkeypatch.setenv('DATABASE_URL', '')
+    assert get_database_url() == f'sqlite:///{database.DEFAULT_DATABASE_PATH}'
+
+
+def test_engine_options():
+    assert engine_options('sqlite:////tmp/app.db')['pool_size'] == database.DB_POOL_SIZE
+    assert 'pool_size' not in engine_options('sqlite:///:memory:')
+    server = engine_options('postgresql://u:p@db/app')
+    assert server['pool_pre_ping'] is True
+    assert server['pool_recycle'] == database.DB_POOL_RECYCLE
+
+
+def test_invalid_pragma_settings_fall_back(monkeypatch):
+    monkeypatch.setattr(database, 'SQLITE_JOURNAL_MODE', 'BOGUS; DROP TABLE user')
+    monkeypatch.setattr(database, 'SQLITE_SYNCHRONOUS', 'FULL')
+
+    pragmas = database.sqlite_pragmas()
+
+    assert 'PRAGMA journal_mode=WAL' in pragmas
+    assert 'PRAGMA synchronous=FULL' in pragmas
+
+
+def test_connections_get_the_pragmas(app, db):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert connection.execute(text('PRAGMA synchronous')).scalar() == 1
+            assert connection.execute(text('PRAGMA foreign_keys')).scalar() == 1
+            assert connection.execute(text('PRAGMA busy_timeout')).scalar() == database.SQLITE_BUSY_TIMEOUT_MS
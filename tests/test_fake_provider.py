@@ -0,0 +1,28 @@
+import requests
+
+from benchmarks.fake_provider import FakeProviderServer
+
+
+def test_replays_recorded_payloads():
+    server = FakeProviderServer(latency_ms=0, jitter_ms=0).start()
+    try:
+        env = server.provider_env()
+        eventbrite = requests.get(env['EVENTBRITE_API_URL'], params={'q': 'jazz'}, timeout=5)
+        ticketmaster = requests.get(env['TICKETMASTER_API_URL'], timeout=5)
+        missing = requests.get(server.base_url + '/nope', timeout=5)
+    finally:
+        server.stop()
+
+    assert eventbrite.status_code == 200 and eventbrite.json()['events']
+    assert ticketmaster.status_code == 200 and ticketmaster.json()['_embedded']['events']
+    assert missing.status_code == 404
+
+
+def test_injects_failures():
+    server = FakeProviderServer(latency_ms=0, jitter_ms=0, error_rate=1.0).start()
+    try:
+        response = requests.get(server.provider_env()['EVENTBRITE_API_URL'], timeout=5)
+    finally:
+        server.stop()
+
+    assert response.status_code == 503
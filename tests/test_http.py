@@ -0,0 +1,25 @@
+import requests
+
+from src.services.http import get_http_session, is_timeout, reset_http_session
+
+
+def test_one_pooled_session_per_process():
+    session = get_http_session()
+
+    assert get_http_session() is session
+    assert session.get_adapter('https://app.ticketmaster.com')._pool_maxsize >= 1
+
+
+def test_reset_replaces_the_session():
+    session = get_http_session()
+
+    reset_http_session()
+
+    assert get_http_session() is not session
+
+
+def test_is_timeout():
+    assert is_timeout(requests.ReadTimeout())
+    assert is_timeout(requests.ConnectTimeout())
+    assert not is_timeout(requests.ConnectionError())
+    assert not is_timeout(ValueError())
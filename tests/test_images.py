@@ -0,0 +1,139 @@
+import io
+import os
+import time
+
+import pytest
+
+from src.routes import images
+from src.routes.images import _fetch_source, is_presized, is_proxyable, proxy_image_url
+from src.services.image_cache import DiskLRUCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, location=None, body=b''):
+        self.status_code = status_code
+        self.headers = {'Location': location} if location else {}
+        self.is_redirect = location is not None
+        self.body = body
+
+    def iter_content(self, size):
+        yield self.body
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requested = []
+
+    def get(self, url, **options):
+        assert options['allow_redirects'] is False
+        self.requested.append(url)
+        return self.responses.pop(0)
+
+
+def test_only_allowed_hosts_are_proxied():
+    assert is_proxyable('https://s1.ticketm.net/dam/a/123.jpg')
+    assert not is_proxyable('https://evil.example/a.jpg')
+    assert not is_proxyable('file:///etc/passwd')
+    assert proxy_image_url('https://evil.example/a.jpg') == 'https://evil.example/a.jpg'
+
+
+def test_presized_cdn_urls_are_left_alone():
+    unsplash = 'https://images.unsplash.com/photo-1?w=400&h=300&fit=crop'
+
+    assert is_presized(unsplash)
+    assert proxy_image_url(unsplash) == unsplash
+    assert proxy_image_url('https://s1.ticketm.net/dam/a/123.jpg').startswith('/api/images/proxy?url=')
+
+
+def test_redirects_are_followed_within_allowed_hosts(monkeypatch):
+    session = FakeSession(FakeResponse(302, '/dam/b.jpg'), FakeResponse(200, body=b'image'))
+    monkeypatch.setattr(images, 'get_http_session', lambda: session)
+
+    assert _fetch_source('https://s1.ticketm.net/dam/a.jpg') == b'image'
+    assert session.requested == ['https://s1.ticketm.net/dam/a.jpg', 'https://s1.ticketm.net/dam/b.jpg']
+
+
+def test_redirects_to_other_hosts_are_refused(monkeypatch):
+    session = FakeSession(FakeResponse(302, 'http://169.254.169.254/latest/meta-data/'))
+    monkeypatch.setattr(images, 'get_http_session', lambda: session)
+
+    assert _fetch_source('https://s1.ticketm.net/dam/a.jpg') is None
+    assert len(session.requested) == 1
+
+
+def test_redirect_loops_give_up(monkeypatch):
+    session = FakeSession(*[FakeResponse(302, '/dam/a.jpg') for _ in range(images.IMAGE_MAX_REDIRECTS + 1)])
+    monkeypatch.setattr(images, 'get_http_session', lambda: session)
+
+    assert _fetch_source('https://s1.ticketm.net/dam/a.jpg') is None
+
+
+@pytest.mark.skipif(not images.PILLOW_AVAILABLE, reason='needs Pillow')
+def test_proxy_resizes_and_caches(client, monkeypatch, tmp_path):
+    from PIL import Image
+
+    source = io.BytesIO()
+    Image.new('RGB', (1200, 600), 'red').save(source, 'PNG')
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return source.getvalue()
+
+    monkeypatch.setattr(images, '_fetch_source', fetch)
+    monkeypatch.setattr(images, '_cache', DiskLRUCache(str(tmp_path), 10 ** 6))
+    url = '/api/images/proxy?url=https%3A%2F%2Fs1.ticketm.net%2Fa.png&w=200&h=100'
+
+    first = client.get(url, headers={'Accept': 'image/webp'})
+    second = client.get(url, headers={'Accept': 'image/webp'})
+    revalidated = client.get(url, headers={'Accept': 'image/webp', 'If-None-Match': first.headers['ETag']})
+
+    assert first.content_type == 'image/webp'
+    assert Image.open(io.BytesIO(first.get_data())).size == (200, 100)
+    assert second.get_data() == first.get_data()
+    assert revalidated.status_code == 304
+    assert len(fetched) == 1
+    assert client.get('/api/images/proxy?url=https%3A%2F%2Fevil.example%2Fa.png').status_code == 400
+
+
+def test_cache_is_bounded_across_workers_sharing_the_directory(tmp_path):
+    first = DiskLRUCache(str(tmp_path), 250)
+    second = DiskLRUCache(str(tmp_path), 250)
+
+    first.put('a', b'x' * 100)
+    second.put('b', b'x' * 100)
+    # Written by the other worker, still found
+    assert first.get('b') == b'x' * 100
+    old = time.time() - 60
+    os.utime(tmp_path / 'a', (old, old))
+    first.put('c', b'x' * 100)
+
+    assert sorted(os.listdir(tmp_path)) == ['b', 'c']
+    assert first.stats()['bytes'] == 200
+
+
+def test_writes_do_not_rescan_the_directory(tmp_path, monkeypatch):
+    cache = DiskLRUCache(str(tmp_path), 250)
+    other = DiskLRUCache(str(tmp_path), 250)
+    other.put('theirs', b'x' * 100)
+
+    def no_scan(path):
+        raise AssertionError('scanned on write')
+
+    monkeypatch.setattr(os, 'scandir', no_scan)
+    cache.put('a', b'x' * 100)
+    cache.put('a', b'x' * 120)
+    cache.put('b', b'x' * 100)
+    assert cache.stats()['bytes'] == 220
+    assert sorted(os.listdir(tmp_path)) == ['a', 'b', 'theirs']
+    monkeypatch.undo()
+
+    # The periodic rescan accounts for the other worker's file and evicts down to the bound
+    cache.rescan_seconds = 0
+    cache.put('c', b'x' * 10)
+    assert cache.stats()['bytes'] <= 250
+    assert 'c' in os.listdir(tmp_path)
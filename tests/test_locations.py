@@ -0,0 +1,55 @@
+import pytest
+
+from src.services.locations import normalize_place_text, resolve_location
+
+
+def test_normalize_place_text():
+    assert normalize_place_text('  St. Louis ,MO ') == 'st louis, mo'
+    assert normalize_place_text('Montréal') == 'montreal'
+
+
+@pytest.mark.parametrize('text', ['Austin, TX', 'austin tx', 'AUSTIN, Texas', 'atx', ' Austin ,  tx. '])
+def test_spellings_resolve_to_one_place(text):
+    place = resolve_location(text)
+
+    assert place['resolved'] is True
+    assert place['key'] == 'austin-tx-us'
+    assert place['display'] == 'Austin, TX'
+    assert place['lat'] == pytest.approx(30.2672)
+
+
+def test_aliases_and_qualifiers():
+    assert resolve_location('NYC')['key'] == 'new-york-ny-us'
+    assert resolve_location('the big apple')['key'] == 'new-york-ny-us'
+    assert resolve_location('saint louis')['display'] == 'St. Louis, MO'
+    assert resolve_location('montréal')['display'] == 'Montreal, QC'
+    assert resolve_location('London')['display'] == 'London, GB'
+
+
+def test_ambiguous_names_prefer_the_qualifier_then_population():
+    assert resolve_location('Portland')['key'] == 'portland-or-us'
+    assert resolve_location('portland maine')['key'] == 'portland-me-us'
+    assert resolve_location('Portland, ME')['key'] == 'portland-me-us'
+    assert resolve_location('springfield')['key'] == 'springfield-mo-us'
+    assert resolve_location('Springfield, IL')['key'] == 'springfield-il-us'
+
+
+def test_unknown_places_keep_their_text():
+    place = resolve_location(' Tiny Hamlet, Nowhere ')
+
+    assert place['resolved'] is False
+    assert place['key'] == 'tiny-hamlet-nowhere'
+    assert place['display'] == 'Tiny Hamlet, Nowhere'
+    assert place['lat'] is None
+    # A known name with a qualifier that matches none of its places is not guessed
+    assert resolve_location('Austin, ME')['resolved'] is False
+
+
+def test_searches_share_results_across_spellings(client):
+    first = client.post('/api/activities/search', json={'query': 'jazz trio', 'location': 'austin tx'})
+    second = client.post('/api/activities/search', json={'query': 'jazz trio', 'location': 'Austin, Texas'})
+
+    assert first.get_json()['location']['key'] == 'austin-tx-us'
+    assert second.get_json()['location'] == first.get_json()['location']
+    assert 'X-Cache' not in first.headers
+    assert second.headers['X-Cache'] == 'HIT'
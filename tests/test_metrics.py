@@ -0,0 +1,63 @@
+import pytest
+
+from src.services import metrics
+from src.services.metrics import Histogram, get_counter, register_counter, register_gauge, render_prometheus, timed
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """Gauges and counters registered by a test don't outlive it"""
+    monkeypatch.setattr(metrics, '_gauges', dict(metrics._gauges))
+    monkeypatch.setattr(metrics, '_counter_callbacks', dict(metrics._counter_callbacks))
+    monkeypatch.setattr(metrics, '_counters', dict(metrics._counters))
+
+
+def test_histogram_quantile_is_the_bucket_upper_bound():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5):
+        histogram.observe(value)
+
+    assert histogram.quantile(0.25) == 0.01
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(1.0) == 1.0
+    histogram.observe(5.0)
+    assert histogram.quantile(1.0) == float('inf')
+
+
+def test_timed_records_the_stage():
+    with timed('test_stage', 'test_provider'):
+        pass
+
+    summary = metrics.stage_summary()
+    assert summary['test_stage[test_provider]']['count'] >= 1
+
+
+def test_prometheus_text_has_types_and_labels():
+    get_counter('test_requests_total', outcome='ok').inc(3)
+    register_gauge('test_queue_depth', 'Items waiting', lambda: 7)
+    register_counter('test_hits_total', 'Hits kept elsewhere', lambda: 11)
+    register_gauge('test_labelled', 'Per provider', lambda: {(('provider', 'a"b'),): 1.5})
+
+    text = render_prometheus()
+
+    assert '# TYPE test_requests_total counter\ntest_requests_total{outcome="ok"} 3' in text
+    assert '# TYPE test_queue_depth gauge\ntest_queue_depth 7' in text
+    assert '# TYPE test_hits_total counter\ntest_hits_total 11' in text
+    assert 'test_labelled{provider="a\\"b"} 1.5' in text
+    assert '# TYPE activity_search_stage_seconds histogram' in text
+
+
+def test_failing_callback_is_left_out():
+    def broken():
+        raise RuntimeError('gone')
+
+    register_gauge('test_broken', 'Broken', broken)
+
+    assert 'test_broken' not in render_prometheus()
+
+
+def test_metrics_endpoint(client):
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+from src.services import percolator
+from src.services.percolator import Percolator, PercolatorIndex, terms
+
+AUSTIN = {'key': 'austin-tx-us', 'lat': 30.2672, 'lon': -97.7431}
+
+
+def subscription(subscription_id, query='', categories=(), lat=30.2672, lon=-97.7431, radius_km=25.0,
+                 location_key='austin-tx-us'):
+    return {'id': subscription_id, 'query': query, 'categories': list(categories), 'lat': lat, 'lon': lon,
+            'radius_km': radius_km, 'location_key': location_key}
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_terms_drop_stopwords_and_single_characters():
+    assert terms('Jazz at the Park, a B-Side event') == {'jazz', 'park', 'side'}
+
+
+def test_index_matches_terms_categories_and_distance():
+    index = PercolatorIndex()
+    index.add(subscription(1, 'jazz brunch'))
+    index.add(subscription(2, 'live music'))
+    index.add(subscription(3, categories=['fitness']))
+    index.add(subscription(4, 'jazz', lat=42.3601, lon=-71.0589))
+    index.add(subscription(5, 'jazz', lat=None, lon=None, location_key='tiny-hamlet'))
+
+    # "live music" subscribes to the whole music category, jazz included
+    assert sorted(index.match({'title': 'Sunday Jazz Brunch', 'category': 'Food'}, AUSTIN)) == [1, 2]
+    assert sorted(index.match({'title': 'Symphony night', 'category': 'Music'}, AUSTIN)) == [2]
+    assert sorted(index.match({'title': 'Pickup soccer', 'category': 'Sports'}, AUSTIN)) == [3]
+    # Event coordinates win over the searched place; Boston is far from Austin
+    assert index.match({'title': 'Jazz brunch', 'lat': 42.36, 'lon': -71.06}, AUSTIN) == [4]
+    assert index.match({'title': 'Jazz in the barn'}, {'key': 'tiny-hamlet', 'lat': None, 'lon': None}) == [5]
+    assert index.match({'title': 'Jazz brunch'}) == []
+
+
+def test_removed_subscriptions_stop_matching():
+    index = PercolatorIndex()
+    index.add(subscription(1, 'jazz'))
+    index.add(subscription(1, 'pottery'))
+
+    assert index.match({'title': 'Jazz night'}, AUSTIN) == []
+    assert index.match({'title': 'Pottery night'}, AUSTIN) == [1]
+    index.remove(1)
+    assert index.match({'title': 'Pottery night'}, AUSTIN) == []
+    assert len(index) == 0
+    assert index._postings == {}
+
+
+@pytest.fixture
+def subscribed(client, monkeypatch):
+    """A user with a jazz subscription in Austin, and a fresh percolator for this process"""
+    monkeypatch.setattr(percolator, '_percolator', None)
+    user_id = client.post('/api/users', json={'username': 'listener', 'email': 'listener@example.com'}).get_json()['id']
+    response = client.post('/api/subscriptions', json={'user_id': user_id, 'query': '  Jazz ', 'location': 'atx'})
+    assert response.status_code == 201
+    return user_id, response.get_json()
+
+
+def test_subscription_routes(client, app, subscribed):
+    user_id, created = subscribed
+
+    assert created['query'] == 'jazz'
+    assert created['location'] == 'Austin, TX'
+    assert client.get(f'/api/subscriptions?user_id={user_id}').get_json() == [created]
+
+    worker = percolator.get_percolator(app)
+    events = [{'id': f'event{i}', 'title': f'Jazz night {i}', 'source': 'Eventbrite'} for i in range(3)]
+    worker.process(events + [{'id': 'other', 'title': 'Pottery class'}], AUSTIN)
+    # Events already percolated are not matched twice
+    worker.process(events, AUSTIN)
+
+    page = client.get(f"/api/subscriptions/{created['id']}/matches?limit=2")
+    assert [match['activity_id'] for match in page.get_json()] == ['event0', 'event1']
+    rest = client.get(f"/api/subscriptions/{created['id']}/matches?limit=2&after={page.headers['X-Next-Cursor']}")
+    assert [match['activity_id'] for match in rest.get_json()] == ['event2']
+    assert 'X-Next-Cursor' not in rest.headers
+
+    assert client.delete(f"/api/subscriptions/{created['id']}").status_code == 204
+    assert client.delete(f"/api/subscriptions/{created['id']}").status_code == 404
+    assert client.get(f'/api/subscriptions?user_id={user_id}').get_json() == []
+    assert worker.index.match({'title': 'Jazz night'}, AUSTIN) == []
+
+
+@pytest.mark.parametrize('body, status', [
+    ({'user_id': 'x', 'query': 'jazz', 'location': 'Austin'}, 400),
+    ({'query': 'jazz', 'location': 'Austin'}, 400),
+    ({'user_id': 1, 'query': 'the', 'location': 'Austin'}, 400),
+    ({'user_id': 1, 'query': 'jazz', 'location': ' '}, 400),
+    ({'user_id': 1, 'categories': ['knitting'], 'location': 'Austin'}, 400),
+    ({'user_id': 1, 'query': 'jazz', 'location': 'Austin', 'radius_km': 500}, 400),
+    ({'user_id': 999, 'query': 'jazz', 'location': 'Austin'}, 404),
+])
+def test_invalid_subscriptions(client, body, status):
+    assert client.post('/api/subscriptions', json=body).status_code == status
+
+
+def test_percolator_survives_a_failing_batch(app, db):
+    with app.app_context():
+        from src.models.subscription import Subscription
+        from src.models.user import User
+
+        user = User(username='listener', email='listener@example.com')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Subscription(user_id=user.id, query_text='jazz', location='Austin, TX',
+                                    location_key='austin-tx-us', lat=AUSTIN['lat'], lon=AUSTIN['lon']))
+        db.session.commit()
+
+    worker = Percolator(app)
+    wait_for(lambda: len(worker.index) == 1)
+    worker.submit(None, AUSTIN)
+    worker.submit([{'id': 'event1', 'title': 'Jazz night'}], AUSTIN)
+
+    wait_for(lambda: worker.matched == 1)
+    assert worker.errors == 1
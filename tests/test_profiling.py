@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+
+from flask import Blueprint, Flask
+
+from src.services import profiling
+from src.services.profiling import StackSampler, install_profiler, write_profile
+
+
+def test_not_installed_without_a_rate_or_token():
+    assert install_profiler(Blueprint('unprofiled', __name__)) is False
+
+
+def test_sampler_collects_folded_stacks():
+    def busy():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+
+    sampler = StackSampler(threading.get_ident(), interval_ms=1).start()
+    busy()
+    sampler.stop()
+
+    assert sampler.samples > 0
+    assert 'busy (test_profiling.py:' in sampler.folded()
+
+
+def test_token_requests_are_profiled(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, 'PROFILE_TOKEN', 'let-me-in')
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    blueprint = Blueprint('profiled', __name__)
+
+    @blueprint.route('/work')
+    def work():
+        time.sleep(0.02)
+        return 'done'
+
+    assert install_profiler(blueprint) is True
+    app = Flask(__name__)
+    app.register_blueprint(blueprint)
+    client = app.test_client()
+
+    assert 'X-Profile-Id' not in client.get('/work').headers
+    assert 'X-Profile-Id' not in client.get('/work', headers={'X-Profile-Token': 'wrong'}).headers
+    profile_id = client.get('/work', headers={'X-Profile-Token': 'let-me-in'}).headers['X-Profile-Id']
+    assert (tmp_path / profile_id).read_text()
+
+
+def test_only_the_newest_profiles_are_kept(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, 'PROFILE_MAX_FILES', 3)
+    sampler = StackSampler(threading.get_ident())
+
+    paths = []
+    for _ in range(5):
+        paths.append(write_profile(sampler, 'activities.search'))
+        time.sleep(0.002)
+
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in paths[-3:])
@@ -0,0 +1,126 @@
+import pytest
+
+from src.services import providers
+from src.services.providers import Provider, ProviderTimeout, plan_providers, register_provider, search_providers
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """An empty provider registry for each test"""
+    monkeypatch.setattr(providers, '_registry', {})
+    monkeypatch.delenv('ACTIVITY_PROVIDERS', raising=False)
+
+
+def fake_provider(name, latency_ms, results=10, calls=None, **options):
+    def search(query, location, **search_options):
+        if calls is not None:
+            calls.append(name)
+        return [{'title': f'{name} {i}'} for i in range(results)]
+
+    return register_provider(Provider(name, search, lambda raw: raw, latency_hint_ms=latency_ms,
+                                      yield_hint=results, **options))
+
+
+def names(plan):
+    return [provider.name for provider in plan]
+
+
+def test_plan_orders_by_results_per_second():
+    fake_provider('slow', 2000, results=10)
+    fake_provider('fast', 200, results=10)
+    fake_provider('cheap', 200, results=20)
+
+    assert names(plan_providers(budget_ms=10000)) == ['cheap', 'fast', 'slow']
+
+
+def test_plan_skips_stubs_and_providers_without_keys(monkeypatch):
+    fake_provider('stub', 100, stub=True)
+    fake_provider('keyed', 100, api_key_env='TEST_PROVIDER_KEY')
+    fake_provider('open', 100)
+
+    assert names(plan_providers()) == ['open']
+    monkeypatch.setenv('TEST_PROVIDER_KEY', 'secret')
+    assert sorted(names(plan_providers())) == ['keyed', 'open']
+    monkeypatch.setenv('ACTIVITY_PROVIDERS', 'keyed')
+    assert names(plan_providers()) == ['keyed']
+
+
+def test_plan_drops_providers_over_budget():
+    fake_provider('fast', 650)
+    fake_provider('slow', 2640)
+
+    assert names(plan_providers(budget_ms=3000)) == ['fast']
+    # Not even the best provider is planned when nothing fits
+    assert plan_providers(budget_ms=100) == []
+
+
+def test_dropped_provider_is_probed_after_the_interval():
+    fake_provider('fast', 650)
+    slow = fake_provider('slow', 2640)
+    assert names(plan_providers(budget_ms=3000)) == ['fast']
+
+    slow.stats.last_called -= providers.PROVIDER_PROBE_INTERVAL_SECONDS + 1
+    # Exactly one search gets the probe
+    assert names(plan_providers(budget_ms=3000)) == ['fast', 'slow']
+    assert names(plan_providers(budget_ms=3000)) == ['fast']
+
+
+def test_search_stops_at_target():
+    calls = []
+    fake_provider('first', 100, results=20, calls=calls)
+    fake_provider('second', 200, results=20, calls=calls)
+
+    activities, report = search_providers('jazz', 'Boston', target=20)
+
+    assert calls == ['first']
+    assert len(activities) == 20
+    assert [entry['provider'] for entry in report] == ['first']
+
+
+def test_search_does_not_call_dropped_providers_when_short():
+    calls = []
+    fake_provider('fast', 650, results=5, calls=calls)
+    fake_provider('slow', 2640, results=20, calls=calls)
+
+    activities, report = search_providers('jazz', 'Boston', target=20)
+
+    assert calls == ['fast']
+    assert len(activities) == 5
+    assert [entry['provider'] for entry in report] == ['fast']
+
+
+def test_search_over_budget_everywhere_calls_nothing(monkeypatch):
+    calls = []
+    fake_provider('slow', 2640, calls=calls)
+    monkeypatch.setattr(providers, 'SEARCH_LATENCY_BUDGET_MS', 100)
+
+    assert search_providers('jazz', 'Boston') == ([], [])
+    assert calls == []
+
+
+def test_stats_recover_once_a_dropped_provider_is_probed():
+    fake_provider('fast', 650, results=5)
+    slow = fake_provider('slow', 2640, results=20)
+
+    for _ in range(10):
+        slow.stats.last_called -= providers.PROVIDER_PROBE_INTERVAL_SECONDS + 1
+        search_providers('jazz', 'Boston', target=20)
+
+    # The fake answers instantly, so its moving average has fallen back under the budget
+    assert slow.stats.calls == 10
+    assert slow.stats.latency_ms < 3000 - 650
+    assert sorted(names(plan_providers(budget_ms=3000))) == ['fast', 'slow']
+
+
+def test_errors_are_reported_and_lower_expected_yield():
+    def failing(query, location, **options):
+        raise ProviderTimeout('upstream timed out')
+
+    provider = register_provider(Provider('flaky', failing, lambda raw: raw, latency_hint_ms=100, yield_hint=10))
+
+    activities, report = search_providers('jazz', 'Boston')
+
+    assert activities == []
+    assert report[0]['status'] == 'error'
+    assert provider.stats.errors == 1
+    assert provider.stats.expected_yield == pytest.approx(8.0)
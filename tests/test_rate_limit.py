@@ -0,0 +1,107 @@
+import pytest
+
+from src.services import rate_limit
+from src.services.rate_limit import SlidingWindowStore, client_identity, parse_api_keys, parse_tiers, retry_after
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SlidingWindowStore(str(tmp_path / 'ratelimit.bin'), slots=64)
+    yield store
+    store.close()
+
+
+def test_parse_tiers_and_keys():
+    assert parse_tiers('standard:1200/60, partner:5/1.5,') == {
+        'standard': (1200, 60.0), 'partner': (5, 1.5), 'anonymous': (300, 60.0),
+    }
+    assert parse_api_keys('abc:partner, bad ,def:standard') == {'abc': 'partner', 'def': 'standard'}
+
+
+def test_sliding_window_counts_the_previous_window_by_overlap(store):
+    for second in range(3):
+        assert store.hit('client', limit=3, window=60, now=second)[0]
+    allowed, remaining, reset = store.hit('client', limit=3, window=60, now=10)
+    assert (allowed, remaining) == (False, 0)
+    # Room for one more once a third of the three has slid out, 20 s into the next window
+    assert reset == 70
+
+    # The whole previous window still overlaps at the start of the next one
+    assert not store.hit('client', limit=3, window=60, now=60)[0]
+    # Halfway through, half of its three requests count
+    assert store.hit('client', limit=3, window=60, now=90) == (True, 0, 30)
+    # Other keys have budgets of their own
+    assert store.hit('other', limit=3, window=60, now=90) == (True, 2, 30)
+
+
+def test_costs_and_retry_after(store):
+    assert store.hit('client', limit=10, window=60, cost=6, now=0)[0]
+    allowed, _, reset = store.hit('client', limit=10, window=60, cost=6, now=30)
+    assert not allowed
+    # Six more fit once a third of the first six has slid out, 20 s into the next window
+    assert reset == 50
+    assert retry_after(0, 0, 0.5, limit=5, window=60, cost=6) == 60
+
+
+def test_workers_share_the_table(store, tmp_path):
+    other = SlidingWindowStore(str(tmp_path / 'ratelimit.bin'), slots=64)
+    assert store.hit('client', limit=2, window=60, now=0)[0]
+    assert other.hit('client', limit=2, window=60, now=1)[0]
+    assert not store.hit('client', limit=2, window=60, now=2)[0]
+    other.close()
+
+
+def test_a_table_of_another_size_is_replaced(store, tmp_path):
+    store.hit('client', limit=1, window=60, now=0)
+    resized = SlidingWindowStore(str(tmp_path / 'ratelimit.bin'), slots=128)
+
+    assert resized.hit('client', limit=1, window=60, now=1)[0]
+    # The old mapping keeps working until its process remaps
+    assert not store.hit('client', limit=1, window=60, now=1)[0]
+    resized.close()
+
+
+def test_client_identity(app, monkeypatch):
+    monkeypatch.setattr(rate_limit, 'API_KEY_TIERS', {'secret': 'partner'})
+    headers = {'X-Forwarded-For': '203.0.113.9, 198.51.100.7'}
+    peer = {'REMOTE_ADDR': '127.0.0.1'}
+
+    with app.test_request_context(headers={'X-API-Key': 'secret'}):
+        assert client_identity() == ('key:secret', 'partner')
+    with app.test_request_context(headers=dict(headers, **{'X-API-Key': 'unknown'}), environ_base=peer):
+        assert client_identity() == ('ip:127.0.0.1', 'anonymous')
+    monkeypatch.setattr(rate_limit, 'RATE_LIMIT_PROXY_HOPS', 1)
+    with app.test_request_context(headers=headers, environ_base=peer):
+        assert client_identity() == ('ip:198.51.100.7', 'anonymous')
+    # Fewer entries than proxies: the header was not set by our proxies
+    monkeypatch.setattr(rate_limit, 'RATE_LIMIT_PROXY_HOPS', 3)
+    with app.test_request_context(headers=headers, environ_base=peer):
+        assert client_identity() == ('ip:127.0.0.1', 'anonymous')
+
+
+@pytest.fixture
+def limited(monkeypatch, store):
+    monkeypatch.setattr(rate_limit, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(rate_limit, 'TIERS', {'anonymous': (10, 60.0)})
+    monkeypatch.setattr(rate_limit, '_store', store)
+
+
+def test_searches_are_limited_by_cost(client, limited):
+    search = {'query': 'rate limited jazz', 'location': 'Austin'}
+
+    first = client.post('/api/activities/search', json=search)
+    assert first.status_code == 200
+    assert first.headers['RateLimit-Limit'] == '10'
+    assert first.headers['RateLimit-Remaining'] == '5'
+    assert first.headers['RateLimit-Policy'] == '10;w=60'
+    assert client.post('/api/activities/search', json=search).status_code == 200
+
+    refused = client.post('/api/activities/search', json=search)
+    assert refused.status_code == 429
+    assert int(refused.headers['Retry-After']) >= 1
+    assert refused.headers['RateLimit-Remaining'] == '0'
+
+    # Typeahead has a budget of its own
+    assert client.get('/api/activities/suggest?q=ja').status_code == 200
+    # And so does each blueprint
+    assert client.get('/api/users').status_code == 200
@@ -0,0 +1,78 @@
+import time
+
+from src.services.search_log import SearchLogWriter, normalize_filters, normalize_location, top_searches
+
+
+def entry(query, location, providers=()):
+    from datetime import datetime
+
+    return {
+        'created_at': datetime.utcnow(),
+        'query_text': query,
+        'location': location,
+        'filters': '{}',
+        'result_count': 3,
+        'latency_ms': 12.5,
+        'used_mock': False,
+        'providers': list(providers),
+    }
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_normalization():
+    assert normalize_location('  Austin ,TX. ') == 'austin, tx'
+    assert normalize_filters({'category': ['Music', ' jazz', 'music'], 'empty': '', 'nested': {'a': 1}}) == \
+        '{"category":["jazz","music"]}'
+    assert normalize_filters(None) == '{}'
+
+
+def test_batches_are_written_in_the_background(app, db):
+    writer = SearchLogWriter(app, batch_size=50, flush_seconds=0.05)
+    call = {'provider': 'eventbrite', 'status': 'ok', 'latency_ms': 10.0, 'count': 3}
+    for _ in range(3):
+        writer.record(entry('jazz', 'boston, ma', [call]))
+    writer.record(entry('yoga', 'austin, tx'))
+
+    wait_for(lambda: writer.written == 4)
+
+    with app.app_context():
+        assert top_searches() == [
+            {'query': 'jazz', 'location': 'boston, ma', 'searches': 3},
+            {'query': 'yoga', 'location': 'austin, tx', 'searches': 1},
+        ]
+        from src.models.search_log import SearchProviderCall
+        assert db.session.query(SearchProviderCall).count() == 3
+
+
+def test_full_buffer_drops_instead_of_blocking(app, db):
+    writer = SearchLogWriter(app, batch_size=1000, flush_seconds=60, max_pending=2)
+    for _ in range(5):
+        writer.record(entry('jazz', 'boston, ma'))
+
+    # The writer thread may already hold one entry in its batch
+    assert writer.dropped in (2, 3)
+    writer.flush()
+
+
+def test_batches_are_written_without_insert_returning(app, db, monkeypatch):
+    # As on MySQL, which has no INSERT ... RETURNING
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, 'insert_executemany_returning_sort_by_parameter_order', False)
+    writer = SearchLogWriter(app, batch_size=50, flush_seconds=0.05)
+    writer.record(entry('jazz', 'boston, ma', [{'provider': 'eventbrite', 'status': 'ok', 'latency_ms': 10.0,
+                                               'count': 3}]))
+    writer.record(entry('yoga', 'austin, tx'))
+
+    wait_for(lambda: writer.written == 2)
+
+    with app.app_context():
+        from src.models.search_log import SearchLog, SearchProviderCall
+        (call,) = db.session.query(SearchProviderCall).all()
+        assert db.session.get(SearchLog, call.search_id).query_text == 'jazz'
+        assert db.session.query(SearchLog).count() == 2
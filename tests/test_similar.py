@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from src.routes import activities
+from src.services import corpus
+from src.services.corpus import ColumnarSnapshot, merge_into_snapshot
+from src.services.similar import SimilarityIndex, activity_vectors, cluster_vectors, quantize
+
+TITLES = {
+    'jazz1': ('Late night jazz quartet', 'Music'),
+    'jazz2': ('Jazz quartet on the patio', 'Music'),
+    'yoga1': ('Sunrise yoga flow', 'Fitness'),
+    'yoga2': ('Yoga flow for beginners', 'Fitness'),
+    'code1': ('Python meetup lightning talks', 'Tech'),
+    'code2': ('Python lightning talks evening', 'Tech'),
+}
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = str(tmp_path / 'corpus.bin')
+    when = str(date.today() + timedelta(days=3))
+    merge_into_snapshot(path, [
+        ({'id': activity_id, 'title': title, 'category': category, 'date': when}, 30.27, -97.74)
+        for activity_id, (title, category) in TITLES.items()
+    ])
+    return path
+
+
+def test_vectors_are_unit_length_and_deterministic():
+    vectors = activity_vectors([{'title': 'Jazz night'}, {'title': 'jazz  NIGHT!'}, {'title': 'the a'}])
+
+    assert vectors.dtype == np.float32
+    assert np.linalg.norm(vectors[0]) == pytest.approx(1.0)
+    assert np.array_equal(vectors[0], vectors[1])
+    # Nothing but stopwords leaves a zero vector
+    assert not vectors[2].any()
+    quantized = quantize(vectors)
+    assert quantized.dtype == np.int8
+    assert np.abs(quantized).max() <= 127
+
+
+def test_clusters_are_kept_until_the_corpus_doubles():
+    vectors = quantize(activity_vectors([{'title': f'event {i} topic{i % 5}'} for i in range(41)]))
+    centroids, clusters, trained_on = cluster_vectors(vectors[:20])
+    assert trained_on == 20
+
+    grown, grown_clusters, grown_trained_on = cluster_vectors(vectors[:35], centroids, clusters, trained_on)
+    assert grown is centroids
+    assert np.array_equal(grown_clusters[:20], clusters)
+    assert grown_trained_on == 20
+
+    _, retrained_clusters, retrained_on = cluster_vectors(vectors, centroids, clusters, trained_on)
+    assert retrained_on == 41
+    assert len(retrained_clusters) == 41
+
+
+def test_index_finds_rows_and_nearest_neighbors(snapshot_path):
+    snapshot = ColumnarSnapshot(snapshot_path)
+    index = SimilarityIndex(snapshot)
+
+    row = index.row_for('jazz1')
+    assert snapshot.record(row)['id'] == 'jazz1'
+    assert index.row_for('missing') is None
+
+    (neighbors,) = index.neighbors(snapshot.vectors[row], limit=2, exclude=[{row}], probes=len(snapshot.centroids))
+    assert snapshot.record(neighbors[0][0])['id'] == 'jazz2'
+    assert neighbors[0][1] > neighbors[1][1]
+    assert row not in [neighbor for neighbor, _ in neighbors]
+    snapshot.close()
+
+
+@pytest.fixture
+def mapped(monkeypatch, snapshot_path):
+    monkeypatch.setattr(corpus, 'CORPUS_PATH', snapshot_path)
+    monkeypatch.setattr(corpus, '_snapshot', None)
+
+
+def test_similar_endpoint(client, mapped, monkeypatch):
+    response = client.get('/api/activities/yoga1/similar?limit=1')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['activity']['id'] == 'yoga1'
+    assert [activity['id'] for activity in data['similar']] == ['yoga2']
+
+    # Results this worker has not exported yet can be looked up too
+    pending = {'id': 'fresh', 'title': 'Python lightning talks', 'category': 'Tech'}
+    monkeypatch.setattr(activities, 'pending_activity', lambda activity_id: pending if activity_id == 'fresh' else None)
+    similar = client.get('/api/activities/fresh/similar?limit=2').get_json()['similar']
+    assert sorted(activity['id'] for activity in similar) == ['code1', 'code2']
+
+    assert client.get('/api/activities/missing/similar').status_code == 404
+    assert client.get('/api/activities/yoga1/similar?limit=some').status_code == 400
+
+
+def test_similar_without_a_corpus(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(corpus, 'CORPUS_PATH', str(tmp_path / 'missing.bin'))
+    monkeypatch.setattr(corpus, '_snapshot', None)
+
+    assert client.get('/api/activities/yoga1/similar').status_code == 503
@@ -0,0 +1,67 @@
+import gzip
+
+import pytest
+from flask import Flask
+
+from src.services.static_files import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticManifest, precompress
+
+SCRIPT = b'console.log("hello");\n' * 200
+
+
+@pytest.fixture
+def static_client(tmp_path):
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'assets' / 'index-AbCd1234.js').write_bytes(SCRIPT)
+    (tmp_path / 'index.html').write_bytes(b'<!doctype html><div id="root"></div>' * 50)
+    (tmp_path / 'favicon.txt').write_bytes(b'tiny')
+    precompress(str(tmp_path))
+
+    manifest = StaticManifest(str(tmp_path))
+    app = Flask(__name__)
+
+    @app.route('/', defaults={'path': ''}, methods=['GET', 'HEAD'])
+    @app.route('/<path:path>', methods=['GET', 'HEAD'])
+    def serve(path):
+        return manifest.serve(path)
+
+    return app.test_client()
+
+
+def test_hashed_assets_are_immutable_and_precompressed(static_client):
+    response = static_client.get('/assets/index-AbCd1234.js', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(response.get_data()) == SCRIPT
+
+
+def test_identity_when_compression_is_not_accepted(static_client):
+    response = static_client.get('/assets/index-AbCd1234.js', headers={'Accept-Encoding': 'identity'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == SCRIPT
+    assert response.content_type == 'text/javascript; charset=utf-8'
+
+
+def test_etag_revalidation(static_client):
+    etag = static_client.get('/favicon.txt').headers['ETag']
+
+    response = static_client.get('/favicon.txt', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.headers['Cache-Control'] == REVALIDATE_CACHE_CONTROL
+
+
+def test_client_routes_fall_back_to_index(static_client):
+    response = static_client.get('/events/123')
+
+    assert response.status_code == 200
+    assert response.get_data().startswith(b'<!doctype html>')
+    assert static_client.head('/').headers['Content-Length'] == str(len(b'<!doctype html><div id="root"></div>' * 50))
+
+
+def test_missing_index_is_a_404(tmp_path):
+    app = Flask(__name__)
+    with app.test_request_context('/'):
+        assert StaticManifest(str(tmp_path)).serve('nope.js').status_code == 404
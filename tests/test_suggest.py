@@ -0,0 +1,74 @@
+import pytest
+
+from src.services import suggest
+from src.services.suggest import PrefixIndex, build_indexes, note_categories
+
+
+@pytest.fixture(autouse=True)
+def seen(monkeypatch):
+    """Categories counted by a test don't outlive it"""
+    monkeypatch.setattr(suggest, '_seen_categories', suggest.Counter())
+
+
+def test_prefix_index_ranks_by_weight_and_ignores_case():
+    index = PrefixIndex({'Music': 3, 'museum': 5, 'yoga': 9, 'mural tour': 1})
+
+    assert index.search('MU') == [('museum', 5), ('Music', 3), ('mural tour', 1)]
+    assert index.search('mus', limit=1) == [('museum', 5)]
+    assert index.search('  mural   t') == [('mural tour', 1)]
+    assert index.search('x') == []
+    assert index.search('   ') == []
+
+
+def test_large_slices_agree_with_a_full_sort():
+    weights = {f'term {i:04d}': (i * 7919) % 1000 for i in range(2000)}
+    index = PrefixIndex(weights)
+
+    expected = sorted(weights.items(), key=lambda item: (-item[1], item[0]))
+    assert index.search('term', limit=10) == expected[:10]
+    assert index.search('term 1', limit=5) == [item for item in expected if item[0].startswith('term 1')][:5]
+
+
+def test_only_known_categories_are_counted():
+    note_categories([{'category': 'Music'}, {'category': ' music '}, {'category': '<script>'}, {}])
+
+    assert dict(suggest._seen_categories) == {'music': 2}
+
+
+def test_history_and_gazetteer_feed_the_indexes():
+    history = [
+        {'query': 'Jazz  Brunch', 'location': 'austin, tx', 'searches': 4},
+        {'query': 'jazz brunch', 'location': 'somewhere new', 'searches': 1},
+    ]
+    indexes = build_indexes(history)
+
+    assert indexes['query'].search('jazz b') == [('jazz brunch', 5)]
+    locations = indexes['location'].search('aust')
+    assert locations[0][0] == 'Austin, TX'
+    assert locations[0][1] > 4
+    assert [text for text, _ in locations].count('Austin, TX') == 1
+    assert indexes['location'].search('somewhere') == [('somewhere new', 1)]
+
+
+def test_suggest_endpoint(client, monkeypatch):
+    monkeypatch.setattr(suggest, '_built_at', 0.0)
+
+    response = client.get('/api/activities/suggest?q=au&type=location&limit=1')
+
+    assert response.status_code == 200
+    assert [entry['text'] for entry in response.get_json()['suggestions']] == ['Austin, TX']
+    assert response.headers['Cache-Control'] == 'public, max-age=60'
+    assert client.get('/api/activities/suggest?q=au&type=venue').status_code == 400
+    assert client.get('/api/activities/suggest?q=au&limit=many').status_code == 400
+
+
+def test_rare_searches_are_not_suggested(app, db, monkeypatch):
+    from src.models.search_log import SearchLog
+
+    monkeypatch.setattr(suggest, 'SUGGEST_MIN_SEARCHES', 3)
+    with app.app_context():
+        for query, times in (('jazz brunch', 3), ('jane doe 12 elm street', 1)):
+            db.session.add_all(SearchLog(query_text=query, location='austin, tx') for _ in range(times))
+        db.session.commit()
+
+    assert suggest._load_history(app) == [{'query': 'jazz brunch', 'location': 'austin, tx', 'searches': 3}]
@@ -0,0 +1,91 @@
+import pytest
+
+from src.services import sync
+from src.services.image_cache import DiskLRUCache
+from src.services.sync import SnapshotStore, compute_delta, record_hash, snapshot_token
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    """Each test starts with no snapshots"""
+    monkeypatch.setattr(sync, '_store', SnapshotStore(10))
+
+
+def activity(activity_id, **fields):
+    return dict({'id': activity_id, 'title': f'Event {activity_id}', 'price': 'Free'}, **fields)
+
+
+def test_tokens_are_content_addressed():
+    hashes = {'a': record_hash(activity('a')), 'b': record_hash(activity('b'))}
+
+    assert snapshot_token('jazz|austin', hashes) == snapshot_token('jazz|austin', dict(reversed(hashes.items())))
+    assert snapshot_token('jazz|austin', hashes) != snapshot_token('jazz|boston', hashes)
+    assert record_hash(activity('a')) != record_hash(activity('a', price='$10'))
+
+
+def test_delta_lists_added_changed_and_removed():
+    token, delta = compute_delta('jazz', None, [activity('a'), activity('b')])
+    assert delta is None
+
+    current = [activity('a', price='$10'), activity('c')]
+    new_token, delta = compute_delta('jazz', token, current)
+
+    assert new_token != token
+    assert delta == {'added': [current[1]], 'changed': [current[0]], 'removed': ['b']}
+    assert compute_delta('jazz', new_token, current) == (new_token, {'added': [], 'changed': [], 'removed': []})
+
+
+def test_unknown_or_foreign_tokens_get_full_results():
+    token, _ = compute_delta('jazz', None, [activity('a')])
+
+    assert compute_delta('yoga', token, [activity('a')])[1] is None
+    assert compute_delta('jazz', 'not-a-token', [activity('a')])[1] is None
+
+
+def test_store_evicts_least_recently_used():
+    one, two, three = ('1' * 24, '2' * 24, '3' * 24)
+    store = SnapshotStore(2)
+    store.put(one, 's', {})
+    store.put(two, 's', {})
+    store.get(one)
+    store.put(three, 's', {})
+
+    assert store.get(two) is None
+    assert store.get(one) == ('s', {})
+    assert len(store) == 2
+
+
+def test_workers_share_snapshots_through_the_directory(tmp_path, monkeypatch):
+    first = SnapshotStore(10, DiskLRUCache(str(tmp_path), 10 ** 6))
+    second = SnapshotStore(10, DiskLRUCache(str(tmp_path), 10 ** 6))
+
+    monkeypatch.setattr(sync, '_store', first)
+    token, _ = compute_delta('jazz', None, [activity('a'), activity('b')])
+    # The next poll lands on another worker
+    monkeypatch.setattr(sync, '_store', second)
+    _, delta = compute_delta('jazz', token, [activity('a')])
+
+    assert delta == {'added': [], 'changed': [], 'removed': ['b']}
+
+
+def test_malformed_tokens_are_unknown(tmp_path):
+    (tmp_path / 'secret').write_text('["jazz", {}]')
+    store = SnapshotStore(10, DiskLRUCache(str(tmp_path / 'sync'), 10 ** 6))
+
+    assert store.get('../secret') is None
+    assert compute_delta('jazz', {'not': 'a string'}, [activity('a')])[1] is None
+
+
+def test_search_returns_only_changes_for_a_sync_token(client):
+    search = {'query': 'sync test jazz', 'location': 'Austin, TX'}
+    first = client.post('/api/activities/search', json=search).get_json()
+
+    assert first['delta'] is False
+    assert len(first['activities']) == first['total']
+
+    second = client.post('/api/activities/search', json=dict(search, sync_token=first['sync_token'])).get_json()
+
+    assert second['delta'] is True
+    assert second['sync_token'] == first['sync_token']
+    assert 'activities' not in second
+    assert (second['added'], second['changed'], second['removed']) == ([], [], [])
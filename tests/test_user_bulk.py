@@ -0,0 +1,87 @@
+import json
+
+from src.routes import user
+
+
+def bulk(client, rows, ndjson=False):
+    if ndjson:
+        body = '\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows)
+        return client.post('/api/users/bulk', data=body, content_type='application/x-ndjson')
+    return client.post('/api/users/bulk', json=rows)
+
+
+def test_creates_updates_and_reports_each_row(client):
+    client.post('/api/users', json={'username': 'existing', 'email': 'old@example.com'})
+    client.post('/api/users', json={'username': 'same', 'email': 'same@example.com'})
+    client.post('/api/users', json={'username': 'owner', 'email': 'owned@example.com'})
+
+    response = bulk(client, [
+        {'username': 'newbie', 'email': 'newbie@example.com'},
+        {'username': 'existing', 'email': 'new@example.com'},
+        {'username': 'same', 'email': 'same@example.com'},
+        {'username': 'x', 'email': 'x@example.com'},
+        {'username': 'newbie', 'email': 'other@example.com'},
+        {'username': 'thief', 'email': 'owned@example.com'},
+        'not an object',
+    ])
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [result['status'] for result in body['results']] == \
+        ['created', 'updated', 'unchanged', 'error', 'error', 'error', 'error']
+    assert body['results'][4]['error'] == 'Duplicate username in request'
+    assert body['results'][5]['error'] == 'Email already exists'
+    assert body['summary'] == {'created': 1, 'updated': 1, 'unchanged': 1, 'error': 4}
+    assert client.get('/api/users?fields=email&limit=1').get_json()[0]['email'] == 'new@example.com'
+
+
+def test_ndjson_body(client):
+    response = bulk(client, [{'username': 'alice', 'email': 'alice@example.com'}, '{broken', ''], ndjson=True)
+
+    assert [result['status'] for result in response.get_json()['results']] == ['created', 'error']
+
+
+def test_chunks_commit_independently(client, monkeypatch):
+    monkeypatch.setattr(user, 'BULK_CHUNK_SIZE', 1)
+    import_chunk = user.import_user_chunk
+    calls = []
+
+    def failing_second_chunk(rows, results):
+        calls.append(rows)
+        if len(calls) == 2:
+            raise RuntimeError('database went away')
+        return import_chunk(rows, results)
+
+    monkeypatch.setattr(user, 'import_user_chunk', failing_second_chunk)
+
+    response = bulk(client, [{'username': f'user{i}', 'email': f'user{i}@example.com'} for i in range(3)])
+
+    assert response.status_code == 200
+    assert [result['status'] for result in response.get_json()['results']] == ['created', 'error', 'created']
+    assert [row['username'] for row in client.get('/api/users').get_json()] == ['user0', 'user2']
+
+
+def test_rejects_bad_bodies(client, monkeypatch):
+    assert client.post('/api/users/bulk', json={'username': 'alice'}).status_code == 400
+    assert bulk(client, []).status_code == 400
+    monkeypatch.setattr(user, 'BULK_MAX_ROWS', 2)
+    assert bulk(client, [{'username': f'user{i}', 'email': f'user{i}@example.com'} for i in range(3)]).status_code == 413
+
+
+def test_import_without_insert_returning(app, client, db, monkeypatch):
+    # As on MySQL, which has no INSERT ... RETURNING
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, 'insert_executemany_returning_sort_by_parameter_order', False)
+    client.post('/api/users', json={'username': 'existing', 'email': 'existing@example.com'})
+
+    response = bulk(client, [
+        {'username': 'zed', 'email': 'zed@example.com'},
+        {'username': 'existing', 'email': 'moved@example.com'},
+        {'username': 'amy', 'email': 'amy@example.com'},
+    ])
+
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == ['created', 'updated', 'created']
+    users = {row['username']: row['id'] for row in client.get('/api/users').get_json()}
+    assert results[0]['id'] == users['zed']
+    assert results[2]['id'] == users['amy']
@@ -0,0 +1,87 @@
+import time
+
+from sqlalchemy import update
+
+from src.models.user import User
+from src.services.user_cache import LocalUserCache, cached_user_body, get_user_cache, invalidate_users
+
+
+def test_read_through_and_invalidation_on_write(client):
+    user_id = client.post('/api/users', json={'username': 'alice', 'email': 'alice@example.com'}).get_json()['id']
+    cache = get_user_cache()
+    hits = cache.hits
+
+    assert client.get(f'/api/users/{user_id}').get_json()['email'] == 'alice@example.com'
+    assert client.get(f'/api/users/{user_id}').get_json()['email'] == 'alice@example.com'
+    assert cache.hits == hits + 1
+
+    client.put(f'/api/users/{user_id}', json={'email': 'new@example.com'})
+    assert client.get(f'/api/users/{user_id}').get_json()['email'] == 'new@example.com'
+    client.delete(f'/api/users/{user_id}')
+    assert client.get(f'/api/users/{user_id}').status_code == 404
+
+
+def test_orm_commits_invalidate(app, client):
+    from src.models.user import db
+
+    user_id = client.post('/api/users', json={'username': 'bob', 'email': 'bob@example.com'}).get_json()['id']
+    client.get(f'/api/users/{user_id}')
+    with app.app_context():
+        db.session.get(User, user_id).email = 'orm@example.com'
+        db.session.commit()
+
+    assert client.get(f'/api/users/{user_id}').get_json()['email'] == 'orm@example.com'
+
+
+def test_core_writes_must_invalidate_themselves(app, client):
+    from src.models.user import db
+
+    user_id = client.post('/api/users', json={'username': 'carol', 'email': 'carol@example.com'}).get_json()['id']
+    client.get(f'/api/users/{user_id}')
+    with app.app_context():
+        db.session.execute(update(User).where(User.id == user_id).values(email='core@example.com'))
+        db.session.commit()
+
+    assert client.get(f'/api/users/{user_id}').get_json()['email'] == 'carol@example.com'
+    invalidate_users([user_id])
+    assert client.get(f'/api/users/{user_id}').get_json()['email'] == 'core@example.com'
+
+
+def test_local_entries_expire():
+    cache = LocalUserCache(10, ttl=0.05)
+    cache.put(1, b'{}', cache.generation)
+
+    assert cache.get(1) == b'{}'
+    time.sleep(0.06)
+    assert cache.get(1) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_local_cache_is_bounded():
+    cache = LocalUserCache(2, ttl=60)
+    for user_id in (1, 2, 3):
+        cache.put(user_id, b'{}', cache.generation)
+
+    assert cache.get(1) is None
+    assert cache.stats()['entries'] == 2
+
+
+def test_a_read_racing_a_write_does_not_cache_the_old_body():
+    cache = LocalUserCache(10, ttl=60)
+    generation = cache.generation
+    cache.invalidate([1])
+    cache.put(1, b'stale', generation)
+
+    assert cache.get(1) is None
+
+
+def test_missing_users_are_not_cached(client):
+    loads = []
+
+    def load(user_id):
+        loads.append(user_id)
+        return None
+
+    assert cached_user_body(42, load) is None
+    assert cached_user_body(42, load) is None
+    assert loads == [42, 42]
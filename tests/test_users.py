@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def users(client):
+    ids = []
+    for i in range(7):
+        response = client.post('/api/users', json={'username': f'user{i}', 'email': f'user{i}@example.com'})
+        assert response.status_code == 201
+        ids.append(response.get_json()['id'])
+    return ids
+
+
+def test_keyset_pages_follow_the_cursor(client, users):
+    seen = []
+    url = '/api/users?limit=3'
+    while True:
+        response = client.get(url)
+        seen += [user['id'] for user in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+        assert response.headers['Link'].endswith(f'after={cursor}&limit=3>; rel="next"')
+        url = f'/api/users?limit=3&after={cursor}'
+
+    assert seen == users
+
+
+def test_field_projection_always_keeps_the_id(client, users):
+    page = client.get('/api/users?fields=username&limit=2').get_json()
+
+    assert page == [{'id': users[0], 'username': 'user0'}, {'id': users[1], 'username': 'user1'}]
+    assert client.get('/api/users?fields=password').status_code == 400
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=501', 'limit=x', 'after=y'])
+def test_bad_paging_arguments(client, query):
+    assert client.get(f'/api/users?{query}').status_code == 400
+
+
+def test_export_streams_every_user(client, users, monkeypatch):
+    from src.routes import user
+
+    monkeypatch.setattr(user, 'EXPORT_BATCH_SIZE', 2)
+
+    response = client.get('/api/users?export=1&fields=email')
+
+    assert response.content_type == 'application/json'
+    assert json.loads(response.get_data()) == [{'id': i, 'email': f'user{n}@example.com'} for n, i in enumerate(users)]
+
+
+def test_export_of_an_empty_table(client):
+    assert json.loads(client.get('/api/users?export=1').get_data()) == []
+
+
+def test_delete(client, users):
+    assert client.delete(f'/api/users/{users[0]}').status_code == 204
+    assert client.get(f'/api/users/{users[0]}').status_code == 404
+    assert client.delete(f'/api/users/{users[0]}').status_code == 404
+    assert client.delete('/api/users/99').status_code == 404
+
+
+def test_unique_constraints_surface_as_conflicts(client, users):
+    taken_name = client.post('/api/users', json={'username': 'user0', 'email': 'fresh@example.com'})
+    taken_email = client.post('/api/users', json={'username': 'fresh', 'email': 'user0@example.com'})
+    renamed = client.put(f'/api/users/{users[1]}', json={'username': 'user0'})
+
+    assert (taken_name.status_code, taken_name.get_json()['error']) == (409, 'Username already exists')
+    assert (taken_email.status_code, taken_email.get_json()['error']) == (409, 'Email already exists')
+    assert (renamed.status_code, renamed.get_json()['error']) == (409, 'Username already exists')
+
+
+def test_update(client, users):
+    response = client.put(f'/api/users/{users[1]}', json={'email': 'changed@example.com'})
+
+    assert response.get_json() == {'id': users[1], 'username': 'user1', 'email': 'changed@example.com'}
+    assert client.put('/api/users/99', json={'email': 'a@example.com'}).status_code == 404
+    assert client.put(f'/api/users/{users[1]}', json={'email': 'nope'}).status_code == 400
+
+
+def test_conflict_messages_from_other_databases():
+    from src.routes.user import unique_conflict_error
+
+    assert unique_conflict_error(Exception('duplicate key value violates unique constraint "user_email_key"')) == \
+        'Email already exists'
+    assert unique_conflict_error(Exception("Duplicate entry 'bob' for key 'user.username'")) == 'Username already exists'
+    assert unique_conflict_error(Exception('constraint failed')) == 'Username or email already exists'
+
+
+def test_conflicts_are_classified_by_constraint_not_message_text():
+    from types import SimpleNamespace
+
+    from src.routes.user import unique_conflict_error
+
+    class PostgresError(Exception):
+        diag = SimpleNamespace(constraint_name='user_email_key')
+
+    postgres = PostgresError('duplicate key value violates unique constraint "user_email_key"\n'
+                             'DETAIL:  Key (email)=(username@example.com) already exists.')
+    assert unique_conflict_error(SimpleNamespace(orig=postgres)) == 'Email already exists'
+    assert unique_conflict_error(Exception('duplicate key value violates unique constraint "user_email_key"\n'
+                                           'DETAIL:  Key (email)=(username@example.com) already exists.')) == \
+        'Email already exists'
+    assert unique_conflict_error(Exception("Duplicate entry 'username@example.com' for key 'user.email'")) == \
+        'Email already exists'
+    assert unique_conflict_error(Exception('UNIQUE constraint failed: user.email')) == 'Email already exists'
+
+
+def test_email_conflict_from_the_database(app, db):
+    from sqlalchemy.exc import IntegrityError
+
+    from src.models.user import User
+    from src.routes.user import unique_conflict_error
+
+    with app.app_context():
+        db.session.add(User(username='username', email='username@example.com'))
+        db.session.commit()
+        db.session.add(User(username='other', email='username@example.com'))
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            error = unique_conflict_error(e)
+        finally:
+            db.session.rollback()
+
+    assert error == 'Email already exists'